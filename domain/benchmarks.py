@@ -0,0 +1,212 @@
+# domain/benchmarks.py
+import os
+import sys
+import json
+import random
+import string
+import tempfile
+import time
+import subprocess
+
+from bibtexparser.customization import homogenize_latex_encoding
+
+from utils import buscar_duplicados, buscar_duplicados_exhaustivo, iterar_bibtex, normalizar_latex
+
+
+#Generación de datos sintéticos
+def generar_titulos_sinteticos(n, proporcion_duplicados=0.2, semilla=0):
+    """Genera n artículos normalizados con una fracción de títulos casi duplicados."""
+    rng = random.Random(semilla)
+    vocabulario = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))) for _ in range(3000)]
+
+    articulos = []
+    for i in range(n):
+        if articulos and rng.random() < proporcion_duplicados:
+            titulo = rng.choice(articulos)['title']
+            # Pequeña alteración: un carácter cambiado o un signo final
+            if rng.random() < 0.5 and len(titulo) > 10:
+                pos = rng.randrange(len(titulo))
+                titulo = titulo[:pos] + rng.choice(string.ascii_lowercase) + titulo[pos + 1:]
+            else:
+                titulo = titulo + '.'
+        else:
+            titulo = ' '.join(rng.choices(vocabulario, k=rng.randint(6, 14)))
+        articulos.append({'title': titulo, 'doi': '', 'raw_data': {}})
+    return articulos
+
+
+#Deduplicación (Req. 1)
+def comparar_deduplicacion(tamanos=(1000, 10000, 100000), limite_exhaustivo=10000):
+    """Compara el tiempo de la deduplicación exhaustiva O(n²) contra la versión con bloqueo."""
+    print("\n=== BENCHMARK DE DEDUPLICACIÓN ===")
+    print(f"{'Títulos':>10} {'Exhaustivo (s)':>16} {'Bloqueo (s)':>13} {'Aceleración':>12} {'Únicos':>14}")
+    resultados = []
+    for n in tamanos:
+        articulos = generar_titulos_sinteticos(n)
+
+        inicio = time.perf_counter()
+        unicos, _ = buscar_duplicados(articulos)
+        t_bloqueo = time.perf_counter() - inicio
+
+        t_exhaustivo = None
+        unicos_exhaustivo = None
+        if n <= limite_exhaustivo:
+            inicio = time.perf_counter()
+            unicos_ref, _ = buscar_duplicados_exhaustivo(articulos)
+            t_exhaustivo = time.perf_counter() - inicio
+            unicos_exhaustivo = len(unicos_ref)
+
+        texto_exh = f"{t_exhaustivo:.3f}" if t_exhaustivo is not None else "omitido"
+        texto_acel = f"{t_exhaustivo / t_bloqueo:.1f}x" if t_exhaustivo is not None else "-"
+        texto_unicos = f"{len(unicos)}/{unicos_exhaustivo}" if unicos_exhaustivo is not None else f"{len(unicos)}"
+        print(f"{n:>10} {texto_exh:>16} {t_bloqueo:>13.3f} {texto_acel:>12} {texto_unicos:>14}")
+        resultados.append({"n": n, "exhaustivo": t_exhaustivo, "bloqueo": t_bloqueo,
+                           "unicos": len(unicos), "unicos_exhaustivo": unicos_exhaustivo})
+    return resultados
+
+
+#Parseo de .bib (Req. 1)
+_LATEX = ["{\\'e}", "{\\'a}", '{\\"u}', "{\\~n}", "\\&", "$\\alpha$", "{\\c{c}}"]
+
+
+def generar_bib_sintetico(carpeta, n_archivos=8, entradas_por_archivo=250, semilla=0):
+    """Escribe n_archivos .bib con entradas de campos largos y acentos en LaTeX, como los exportados."""
+    rng = random.Random(semilla)
+    vocabulario = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))) for _ in range(3000)]
+
+    def texto(k):
+        return ' '.join(rng.choice(vocabulario) + (rng.choice(_LATEX) if rng.random() < 0.05 else '')
+                        for _ in range(k))
+
+    rutas = []
+    for a in range(n_archivos):
+        ruta = os.path.join(carpeta, f"sintetico_{a}.bib")
+        with open(ruta, "w", encoding="utf-8") as f:
+            for e in range(entradas_por_archivo):
+                f.write(f"@ARTICLE{{art{a}_{e},\n  author={{{texto(2)} and {texto(2)}}},\n"
+                        f"  title={{{texto(10)}}},\n  journal={{{texto(3)}}},\n  year={{{rng.randint(2020, 2025)}}},\n"
+                        f"  doi={{10.{rng.randint(1000, 9999)}/{a}.{e}}},\n  abstract={{{texto(150)}}},\n"
+                        f"  keywords={{{texto(5)}}},\n}}\n\n")
+        rutas.append(ruta)
+    return rutas
+
+
+def comparar_parseo_paralelo(n_archivos=8, entradas_por_archivo=250, workers=(1, None)):
+    """Mide el parseo de un corpus sintético con 1 y N procesos y verifica que el resultado sea el mismo."""
+    from ingesta import parsear_archivos
+
+    print("\n=== BENCHMARK DE PARSEO DE .BIB ===")
+    print(f"{n_archivos} archivos x {entradas_por_archivo} entradas")
+    print(f"{'Procesos':>10} {'Tiempo (s)':>12} {'Aceleración':>12} {'Igual a 1':>10}")
+    resultados = []
+    with tempfile.TemporaryDirectory() as carpeta:
+        rutas = generar_bib_sintetico(carpeta, n_archivos, entradas_por_archivo)
+        referencia = None
+        # None es un proceso por CPU: con una sola CPU coincide con 1 y no se repite
+        for n in dict.fromkeys(n or os.cpu_count() or 1 for n in workers):
+            inicio = time.perf_counter()
+            entradas = parsear_archivos(rutas, workers=n)
+            duracion = time.perf_counter() - inicio
+            if referencia is None:
+                referencia = (entradas, duracion)
+            igual = entradas == referencia[0]
+            print(f"{n:>10} {duracion:>12.2f} {referencia[1] / duracion:>11.1f}x {'sí' if igual else 'NO':>10}")
+            resultados.append({"workers": n, "segundos": duracion, "igual": igual})
+    return resultados
+
+
+def verificar_normalizacion_latex(carpeta="downloads"):
+    """
+    Compara, campo por campo, la normalización perezosa (EntradaBib) con
+    homogenize_latex_encoding en los .bib de la carpeta, y mide ambas.
+    Devuelve la lista de diferencias (vacía si son equivalentes).
+    """
+    rutas = sorted(os.path.join(raiz, a) for raiz, _, archivos in os.walk(carpeta)
+                   for a in archivos if a.endswith(".bib"))
+    print("\n=== NORMALIZACIÓN DE LATEX: PEREZOSA vs homogenize_latex_encoding ===")
+    diferencias = []
+    t_original = t_perezosa = 0.0
+    for ruta in rutas:
+        inicio = time.perf_counter()
+        originales = list(iterar_bibtex(ruta, customization=homogenize_latex_encoding))
+        t_original += time.perf_counter() - inicio
+
+        normalizar_latex.cache_clear()
+        inicio = time.perf_counter()
+        perezosas = list(iterar_bibtex(ruta))
+        # Se leen todos los campos: es el peor caso para la versión perezosa
+        leidas = [{campo: e[campo] for campo in e} for e in perezosas]
+        t_perezosa += time.perf_counter() - inicio
+
+        if len(originales) != len(leidas):
+            diferencias.append((ruta, None, "número de entradas", len(originales), len(leidas)))
+            continue
+        for original, leida in zip(originales, leidas):
+            for campo in set(original) | set(leida):
+                if original.get(campo) != leida.get(campo):
+                    diferencias.append((ruta, original.get("ID"), campo, original.get(campo), leida.get(campo)))
+        print(f"  - {ruta}: {len(originales)} entradas")
+
+    print(f"homogenize_latex_encoding: {t_original:.2f} s | perezosa (todos los campos): {t_perezosa:.2f} s")
+    if diferencias:
+        print(f"[ERROR] {len(diferencias)} campos distintos, por ejemplo: {diferencias[0]}")
+    else:
+        print("[OK] Misma salida en todos los campos de todas las entradas")
+    return diferencias
+
+
+#Reducción de dimensionalidad de TF-IDF (Req. 4)
+def generar_abstracts_sinteticos(n, palabras=150, semilla=0):
+    """Abstracts con vocabulario amplio (distribución de Zipf), para que TF-IDF llegue a 5000 términos."""
+    rng = random.Random(semilla)
+    vocabulario = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))) for _ in range(20000)]
+    pesos = [1 / (r + 1) for r in range(len(vocabulario))]
+    return [' '.join(rng.choices(vocabulario, weights=pesos, k=palabras)) for _ in range(n)]
+
+
+# Se ejecuta en un intérprete limpio para que el pico de RSS sea solo el de la reducción
+_CODIGO_REDUCCION = """
+import json, resource, sys, time
+sys.path[:0] = {rutas!r}
+from benchmarks import generar_abstracts_sinteticos
+from requerimiento4 import reducir_tfidf
+abstracts = generar_abstracts_sinteticos({n})
+base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+inicio = time.perf_counter()
+reducir_tfidf(abstracts, {n_componentes}, {reduccion!r})
+print(json.dumps({{"segundos": time.perf_counter() - inicio, "base_kb": base,
+                  "pico_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}}))
+"""
+
+
+def comparar_reduccion_tfidf(tamanos=(1000, 5000, 20000), n_componentes=50):
+    """
+    Compara tiempo y pico de memoria (RSS) de PCA sobre la TF-IDF densa frente a
+    TruncatedSVD sobre la CSR, cada medición en su propio proceso.
+    """
+    rutas = [os.path.dirname(os.path.abspath(__file__))]
+    print("\n=== BENCHMARK DE REDUCCIÓN TF-IDF (Req. 4) ===")
+    print(f"{'Abstracts':>10} {'Método':>8} {'Tiempo (s)':>11} {'Pico RSS (MB)':>14} {'Sobre la base (MB)':>19}")
+    resultados = []
+    for n in tamanos:
+        for reduccion in ("pca", "svd"):
+            codigo = _CODIGO_REDUCCION.format(rutas=rutas, n=n, n_componentes=n_componentes, reduccion=reduccion)
+            proceso = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True)
+            if proceso.returncode != 0:
+                error = (proceso.stderr.strip().splitlines() or ["error desconocido"])[-1]
+                print(f"{n:>10} {reduccion:>8}    error  {error}")
+                continue
+            medicion = json.loads(proceso.stdout.strip().splitlines()[-1])
+            pico = medicion["pico_kb"] / 1024
+            extra = (medicion["pico_kb"] - medicion["base_kb"]) / 1024
+            print(f"{n:>10} {reduccion:>8} {medicion['segundos']:>11.2f} {pico:>14.0f} {extra:>19.0f}")
+            resultados.append({"n": n, "reduccion": reduccion, "segundos": medicion["segundos"],
+                               "pico_mb": pico, "extra_mb": extra})
+    return resultados
+
+
+if __name__ == "__main__":
+    comparar_deduplicacion()
+    comparar_parseo_paralelo()
+    verificar_normalizacion_latex()
+    comparar_reduccion_tfidf()
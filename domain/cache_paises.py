@@ -0,0 +1,149 @@
+# domain/cache_paises.py
+import os
+import csv
+import time
+import sqlite3
+import threading
+from utils import normalizar_doi
+
+RUTA_CACHE = os.path.join("data", "requerimiento5", "cache_paises.sqlite")
+RUTA_CACHE_CSV = os.path.join("data", "requerimiento5", "cache_paises.csv")
+
+# Los resultados positivos no caducan; los negativos y los errores se reintentan pasado su TTL
+TTL_SIN_PAIS = 30 * 24 * 3600
+TTL_ERROR = 24 * 3600
+
+ESTADO_OK = "ok"
+ESTADO_SIN_PAIS = "sin_pais"
+ESTADO_ERROR = "error"
+
+
+class CachePaises:
+    """
+    Caché DOI -> país en SQLite con interfaz de diccionario. Cada escritura se
+    confirma de inmediato (write-through), así que una interrupción no pierde
+    las consultas ya hechas. Las claves se guardan normalizadas.
+    """
+
+    def __init__(self, ruta=RUTA_CACHE, ttl_sin_pais=TTL_SIN_PAIS, ttl_error=TTL_ERROR):
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        self.ruta = ruta
+        self.ttl = {ESTADO_SIN_PAIS: ttl_sin_pais, ESTADO_ERROR: ttl_error}
+        self._candado = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute(
+            "CREATE TABLE IF NOT EXISTS paises (doi TEXT PRIMARY KEY, pais TEXT, estado TEXT NOT NULL, fecha REAL NOT NULL)"
+        )
+        self._conexion.execute("CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT)")
+        self._conexion.commit()
+        self.aciertos = 0
+        self.fallos = 0
+        self.escrituras = {ESTADO_OK: 0, ESTADO_SIN_PAIS: 0, ESTADO_ERROR: 0}
+
+    #Lectura
+    def _vigente(self, doi):
+        fila = self._conexion.execute("SELECT pais, estado, fecha FROM paises WHERE doi = ?", (doi,)).fetchone()
+        if fila is None:
+            return None
+        pais, estado, fecha = fila
+        ttl = self.ttl.get(estado)
+        if ttl is not None and time.time() - fecha > ttl:
+            return None
+        return fila
+
+    def __contains__(self, doi):
+        clave = normalizar_doi(doi)
+        with self._candado:
+            fila = self._vigente(clave) if clave else None
+            if fila is None:
+                self.fallos += 1
+                return False
+            self.aciertos += 1
+            return True
+
+    def __getitem__(self, doi):
+        with self._candado:
+            fila = self._vigente(normalizar_doi(doi))
+        if fila is None:
+            raise KeyError(doi)
+        return fila[0]
+
+    def get(self, doi, default=None):
+        try:
+            return self[doi]
+        except KeyError:
+            return default
+
+    def __len__(self):
+        with self._candado:
+            return self._conexion.execute("SELECT COUNT(*) FROM paises").fetchone()[0]
+
+    #Escritura
+    def _guardar(self, doi, pais, estado):
+        clave = normalizar_doi(doi)
+        if not clave:
+            return
+        with self._candado:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO paises (doi, pais, estado, fecha) VALUES (?, ?, ?, ?)",
+                (clave, pais, estado, time.time()),
+            )
+            self._conexion.commit()
+            self.escrituras[estado] += 1
+
+    def __setitem__(self, doi, pais):
+        """Guarda un resultado: un país, o None si OpenAlex/ROR no lo conocen (con TTL)."""
+        self._guardar(doi, pais, ESTADO_OK if pais else ESTADO_SIN_PAIS)
+
+    def marcar_error(self, doi):
+        """Registra un fallo de consulta (red, HTTP...), que se reintentará pasado TTL_ERROR."""
+        self._guardar(doi, None, ESTADO_ERROR)
+
+    #Migración desde el CSV anterior
+    def migrar_csv(self, ruta_csv=RUTA_CACHE_CSV):
+        """
+        Importa el antiguo cache_paises.csv. Solo se vuelve a importar si el CSV cambió,
+        y nunca sobrescribe entradas que ya estén en la base de datos.
+        """
+        if not os.path.exists(ruta_csv):
+            return 0
+        info = os.stat(ruta_csv)
+        firma = f"{info.st_size}:{info.st_mtime}"
+        with self._candado:
+            previa = self._conexion.execute("SELECT valor FROM meta WHERE clave = 'csv_migrado'").fetchone()
+        if previa and previa[0] == firma:
+            return 0
+
+        filas = []
+        with open(ruta_csv, "r", encoding="utf-8", newline="") as f:
+            for registro in csv.DictReader(f):
+                clave = normalizar_doi(registro.get("doi"))
+                if not clave:
+                    continue
+                pais = (registro.get("pais") or "").strip() or None
+                filas.append((clave, pais, ESTADO_OK if pais else ESTADO_SIN_PAIS, info.st_mtime))
+
+        with self._candado:
+            cursor = self._conexion.executemany(
+                "INSERT OR IGNORE INTO paises (doi, pais, estado, fecha) VALUES (?, ?, ?, ?)", filas
+            )
+            self._conexion.execute("INSERT OR REPLACE INTO meta (clave, valor) VALUES ('csv_migrado', ?)", (firma,))
+            self._conexion.commit()
+        importadas = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else len(filas)
+        print(f"[INFO] Migradas {importadas} entradas de {ruta_csv} a {self.ruta}")
+        return importadas
+
+    #Informe
+    def informe(self):
+        """Imprime aciertos/fallos de la ejecución y lo guardado en la caché."""
+        consultas = self.aciertos + self.fallos
+        tasa = 100.0 * self.aciertos / consultas if consultas else 0.0
+        print(f"[INFO] Caché de países: {self.aciertos} aciertos, {self.fallos} fallos ({tasa:.1f}% de aciertos)")
+        print(f"  - Nuevos resultados: {self.escrituras[ESTADO_OK]} con país, "
+              f"{self.escrituras[ESTADO_SIN_PAIS]} sin país, {self.escrituras[ESTADO_ERROR]} errores")
+        print(f"  - Total de DOIs en caché: {len(self)}")
+
+    def cerrar(self):
+        with self._candado:
+            self._conexion.close()
@@ -0,0 +1,120 @@
+# domain/corpus.py
+import os
+import json
+import hashlib
+import numpy as np
+from utils import iterar_bibtex
+
+# Columnas que guardamos del corpus unificado (el resto de campos no se usan en Req. 2-5)
+COLUMNAS = ["ID", "ENTRYTYPE", "title", "author", "year", "doi",
+            "journal", "booktitle", "abstract", "keywords"]
+
+
+#Huella del archivo fuente
+def hash_archivo(ruta, tamano_bloque=1 << 20):
+    """Calcula el SHA-256 de un archivo leyéndolo por bloques."""
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(tamano_bloque), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def huella_archivo(ruta):
+    """Devuelve hash, fecha de modificación y tamaño de un archivo."""
+    info = os.stat(ruta)
+    return {"sha256": hash_archivo(ruta), "mtime": info.st_mtime, "tamano": info.st_size}
+
+
+def ruta_corpus(ruta_fuente):
+    """Ruta del artefacto columnar asociado a un .bib (junto al propio .bib)."""
+    return os.path.splitext(ruta_fuente)[0] + "_corpus.npz"
+
+
+#Escritura y lectura del artefacto
+def guardar_corpus(entradas, ruta_fuente):
+    """
+    Guarda las entradas en un .npz columnar: por cada columna, los textos en UTF-8
+    concatenados (uint8) y sus offsets (int64), como una columna de texto de Arrow.
+    """
+    valores = {c: [] for c in COLUMNAS}
+    for entrada in entradas:
+        for c in COLUMNAS:
+            valores[c].append(str(entrada.get(c, "") or "").encode("utf-8"))
+
+    arrays = {}
+    for c, codificados in valores.items():
+        offsets = np.zeros(len(codificados) + 1, dtype=np.int64)
+        np.cumsum([len(v) for v in codificados], out=offsets[1:])
+        arrays[f"{c}__datos"] = np.frombuffer(b"".join(codificados), dtype=np.uint8)
+        arrays[f"{c}__offsets"] = offsets
+
+    meta = huella_archivo(ruta_fuente)
+    meta["columnas"] = COLUMNAS
+    arrays["__meta"] = np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8)
+
+    destino = ruta_corpus(ruta_fuente)
+    temporal = destino + ".tmp"
+    with open(temporal, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(temporal, destino)
+    print(f"[OK] Corpus columnar guardado en {destino} ({len(valores['ID'])} artículos)")
+    return destino
+
+
+def _leer_meta(datos):
+    return json.loads(datos["__meta"].tobytes().decode("utf-8"))
+
+
+def corpus_vigente(ruta_fuente):
+    """Indica si el artefacto existe y corresponde al contenido actual del .bib."""
+    destino = ruta_corpus(ruta_fuente)
+    if not os.path.exists(destino):
+        return False
+    try:
+        with np.load(destino) as datos:
+            meta = _leer_meta(datos)
+    except Exception:
+        return False
+
+    info = os.stat(ruta_fuente)
+    if meta.get("mtime") == info.st_mtime and meta.get("tamano") == info.st_size:
+        return True
+    # La fecha cambió (copia, checkout...): solo es obsoleto si cambió el contenido
+    return meta.get("sha256") == hash_archivo(ruta_fuente)
+
+
+def _leer_columnas(destino):
+    filas = []
+    with np.load(destino) as datos:
+        columnas = _leer_meta(datos)["columnas"]
+        textos = {}
+        for c in columnas:
+            bruto = datos[f"{c}__datos"].tobytes()
+            offsets = datos[f"{c}__offsets"]
+            textos[c] = [bruto[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+    n = len(textos[columnas[0]]) if columnas else 0
+    for i in range(n):
+        # Igual que bibtexparser: solo aparecen los campos presentes en la entrada
+        filas.append({c: textos[c][i] for c in columnas if textos[c][i]})
+    return filas
+
+
+def cargar_corpus(ruta_fuente):
+    """
+    Devuelve las entradas del .bib unificado como lista de diccionarios.
+    Usa el artefacto columnar si está vigente; si no, parsea el .bib y lo regenera.
+    """
+    if not os.path.exists(ruta_fuente):
+        print(f"[ERROR] No se encuentra el archivo: {ruta_fuente}")
+        return []
+
+    if corpus_vigente(ruta_fuente):
+        return _leer_columnas(ruta_corpus(ruta_fuente))
+
+    print(f"[INFO] Corpus columnar inexistente u obsoleto, parseando '{ruta_fuente}'...")
+    entradas = list(iterar_bibtex(ruta_fuente))
+    if entradas:
+        guardar_corpus(entradas, ruta_fuente)
+    return entradas
@@ -0,0 +1,102 @@
+# domain/embeddings.py
+import os
+import json
+import hashlib
+import numpy as np
+
+MODELO_SBERT = 'all-MiniLM-L6-v2'
+DIR_EMBEDDINGS = os.path.join("data", "embeddings")
+
+# Modelos ya cargados en este proceso (nombre -> SentenceTransformer)
+_modelos = {}
+
+
+def obtener_modelo(nombre=MODELO_SBERT):
+    """Carga el modelo SentenceTransformer la primera vez que se necesita."""
+    if nombre not in _modelos:
+        from sentence_transformers import SentenceTransformer
+        print(f"[INFO] Cargando modelo SBERT '{nombre}'...")
+        _modelos[nombre] = SentenceTransformer(nombre)
+    return _modelos[nombre]
+
+
+def clave_texto(texto):
+    """Hash del contenido de un texto, usado como clave en el almacén."""
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+def _rutas_almacen(modelo):
+    carpeta = os.path.join(DIR_EMBEDDINGS, modelo.replace("/", "__"))
+    return carpeta, os.path.join(carpeta, "vectores.npy"), os.path.join(carpeta, "indice.json")
+
+
+def _cargar_indice(modelo):
+    """Devuelve {clave: fila} del almacén del modelo (vacío si no existe)."""
+    _, ruta_vectores, ruta_indice = _rutas_almacen(modelo)
+    if not (os.path.exists(ruta_vectores) and os.path.exists(ruta_indice)):
+        return {}
+    with open(ruta_indice, "r", encoding="utf-8") as f:
+        datos = json.load(f)
+    if datos.get("modelo") != modelo:
+        return {}
+    return {clave: fila for fila, clave in enumerate(datos["claves"])}
+
+
+def _anadir_al_almacen(modelo, indice, claves_nuevas, vectores_nuevos):
+    """Reescribe el .npy con las filas nuevas al final, copiando el anterior por memmap."""
+    carpeta, ruta_vectores, ruta_indice = _rutas_almacen(modelo)
+    os.makedirs(carpeta, exist_ok=True)
+
+    n_previos = len(indice)
+    total = n_previos + len(claves_nuevas)
+    dim = vectores_nuevos.shape[1]
+
+    temporal = ruta_vectores + ".tmp.npy"
+    destino = np.lib.format.open_memmap(temporal, mode="w+", dtype=np.float32, shape=(total, dim))
+    if n_previos:
+        anteriores = np.load(ruta_vectores, mmap_mode="r")
+        destino[:n_previos] = anteriores
+        del anteriores
+    destino[n_previos:] = vectores_nuevos
+    destino.flush()
+    del destino
+    os.replace(temporal, ruta_vectores)
+
+    claves = [None] * n_previos
+    for clave, fila in indice.items():
+        claves[fila] = clave
+    claves.extend(claves_nuevas)
+    with open(ruta_indice + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"modelo": modelo, "dim": dim, "claves": claves}, f)
+    os.replace(ruta_indice + ".tmp", ruta_indice)
+
+    return {clave: fila for fila, clave in enumerate(claves)}
+
+
+def obtener_embeddings(textos, modelo=MODELO_SBERT, batch_size=64):
+    """
+    Devuelve una matriz (n, d) float32 con el embedding de cada texto.
+    Solo codifica (por lotes) los textos que no están ya en el almacén en disco.
+    """
+    indice = _cargar_indice(modelo)
+    claves = [clave_texto(t) for t in textos]
+
+    pendientes = {}
+    for clave, texto in zip(claves, textos):
+        if clave not in indice and clave not in pendientes:
+            pendientes[clave] = texto
+
+    if pendientes:
+        print(f"[INFO] Codificando con SBERT {len(pendientes)} de {len(textos)} textos (el resto ya está en el almacén)...")
+        nuevos = obtener_modelo(modelo).encode(list(pendientes.values()), batch_size=batch_size,
+                                               convert_to_numpy=True, show_progress_bar=len(pendientes) > 100)
+        indice = _anadir_al_almacen(modelo, indice, list(pendientes.keys()), nuevos.astype(np.float32))
+    else:
+        print(f"[INFO] Los {len(textos)} embeddings SBERT se reutilizan del almacén.")
+
+    _, ruta_vectores, _ = _rutas_almacen(modelo)
+    vectores = np.load(ruta_vectores, mmap_mode="r")
+    filas = np.array([indice[c] for c in claves], dtype=np.int64)
+    resultado = np.array(vectores[filas]) if len(filas) else np.zeros((0, vectores.shape[1]), dtype=np.float32)
+    del vectores
+    return resultado
@@ -0,0 +1,288 @@
+# domain/ingesta.py
+import os
+import json
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from corpus import hash_archivo
+from utils import fragmentos_bibtex, parsear_fragmentos, EntradaBib
+
+#Configuración de rutas
+DIR_DESCARGAS = "downloads"
+DIR_INGESTA = os.path.join("data", "ingesta")
+DIR_ENTRADAS = os.path.join(DIR_INGESTA, "entradas")
+RUTA_REGISTRO = os.path.join(DIR_INGESTA, "registro.json")
+
+# Carpeta de descargas -> nombre de la fuente (el mismo que usa el orquestador)
+FUENTES_CARPETA = {"IEE": "ieee", "sage": "sage", "science_direct": "sciencedirect"}
+
+# Checkpoint que cada scraper deja en su carpeta (ver scrapers/checkpoint.py)
+NOMBRE_CHECKPOINT = "checkpoint.json"
+
+# Extensiones de descargas a medias (Chrome, Firefox y las escrituras atómicas propias)
+EXTENSIONES_PARCIALES = (".crdownload", ".part", ".tmp")
+# Un archivo sin cambios durante este tiempo se considera terminado
+SEGUNDOS_ESTABLE = 1.0
+INTERVALO_VIGILANCIA = 2.0
+# Entradas por tarea del pool: un .bib con más entradas se reparte entre varios procesos
+ENTRADAS_POR_LOTE = 50
+# Versión del formato del almacén; si cambia, se vuelve a ingerir todo
+FORMATO_REGISTRO = 2
+
+
+#Registro de archivos ingeridos
+def cargar_registro():
+    """
+    El registro guarda, por archivo descargado, su huella (sha256, tamaño, mtime) y,
+    por contenido, las entradas parseadas y su procedencia (fuente, página, fecha).
+    """
+    vacio = {"formato": FORMATO_REGISTRO, "archivos": {}, "contenidos": {}}
+    if not os.path.exists(RUTA_REGISTRO):
+        return vacio
+    try:
+        with open(RUTA_REGISTRO, "r", encoding="utf-8") as f:
+            registro = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Registro de ingesta ilegible ({e}), se vuelve a ingerir todo")
+        return vacio
+    if registro.get("formato") != FORMATO_REGISTRO:
+        print("[INFO] El formato del almacén de ingesta cambió, se vuelve a ingerir todo")
+        return vacio
+    return {**vacio, **registro}
+
+
+def guardar_registro(registro):
+    os.makedirs(DIR_INGESTA, exist_ok=True)
+    with open(RUTA_REGISTRO + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(registro, f, indent=2, ensure_ascii=False)
+    os.replace(RUTA_REGISTRO + ".tmp", RUTA_REGISTRO)
+
+
+def ruta_entradas(sha256):
+    """Las entradas de cada contenido distinto se guardan en su propio JSONL."""
+    return os.path.join(DIR_ENTRADAS, f"{sha256}.jsonl")
+
+
+#Detección de descargas terminadas
+def descarga_completa(ruta, ahora=None, segundos_estable=SEGUNDOS_ESTABLE):
+    """Un .bib está completo si no queda su parcial al lado y no cambió en segundos_estable."""
+    if ruta.endswith(EXTENSIONES_PARCIALES):
+        return False
+    if any(os.path.exists(ruta + ext) for ext in EXTENSIONES_PARCIALES):
+        return False
+    return (ahora or time.time()) - os.path.getmtime(ruta) >= segundos_estable
+
+
+def listar_descargas(carpeta=DIR_DESCARGAS):
+    """Rutas (ordenadas) de los .bib bajo la carpeta de descargas."""
+    rutas = []
+    for raiz, _, archivos in os.walk(carpeta):
+        rutas.extend(os.path.join(raiz, a) for a in archivos if a.endswith(".bib"))
+    return sorted(rutas)
+
+
+def fuente_de_ruta(ruta, carpeta=DIR_DESCARGAS):
+    primera = os.path.relpath(ruta, carpeta).split(os.sep)[0]
+    return FUENTES_CARPETA.get(primera, primera)
+
+
+#Parseo en paralelo
+def _lotes_archivo(ruta, tamano_lote):
+    """Parte un .bib en lotes de tamano_lote entradas completas."""
+    with open(ruta, "r", encoding="utf-8") as f:
+        fragmentos = list(fragmentos_bibtex(f))
+    return [fragmentos[i:i + tamano_lote] for i in range(0, len(fragmentos), tamano_lote)]
+
+
+def paginas_por_archivo(carpeta):
+    """Página de resultados de la que salió cada archivo descargado, según el checkpoint ({} si no hay)."""
+    try:
+        with open(os.path.join(carpeta, NOMBRE_CHECKPOINT), "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {archivo: int(pagina)
+            for pagina, info in checkpoint.get("paginas", {}).items()
+            for archivo in info.get("archivos", [])}
+
+
+def parsear_archivos(rutas, workers=None, tamano_lote=ENTRADAS_POR_LOTE):
+    """
+    Parsea varios .bib en un pool de procesos (el parser de bibtexparser es lento).
+    Los archivos grandes se reparten en lotes de entradas y el resultado, {ruta: entradas},
+    se une en el mismo orden que el parseo en serie. Se omiten los archivos ilegibles.
+    """
+    tareas = []
+    entradas = {}
+    for ruta in rutas:
+        try:
+            lotes = _lotes_archivo(ruta, tamano_lote)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"  - Error al leer '{ruta}': {e}")
+            continue
+        entradas[ruta] = []
+        tareas.extend((ruta, lote) for lote in lotes)
+
+    lotes = [lote for _, lote in tareas]
+    origenes = [ruta for ruta, _ in tareas]
+    workers = min(workers or os.cpu_count() or 1, len(lotes))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            resultados = list(executor.map(parsear_fragmentos, lotes, [EntradaBib] * len(lotes), origenes))
+    else:
+        resultados = [parsear_fragmentos(lote, origen=ruta) for ruta, lote in tareas]
+
+    for (ruta, _), parseadas in zip(tareas, resultados):
+        entradas[ruta].extend(parseadas)
+    for ruta, parseadas in entradas.items():
+        if not parseadas:
+            print(f"Advertencia: no se encontraron entradas en {ruta}.")
+    return entradas
+
+
+#Ingesta
+def _escribir_entradas(sha256, entradas):
+    os.makedirs(DIR_ENTRADAS, exist_ok=True)
+    destino = ruta_entradas(sha256)
+    with open(destino + ".tmp", "w", encoding="utf-8") as f:
+        for entrada in entradas:
+            # Se guardan los valores crudos: el LaTeX se normaliza al leer cada campo
+            f.write(json.dumps(entrada.crudo(), ensure_ascii=False) + "\n")
+    os.replace(destino + ".tmp", destino)
+
+
+def _contenido_ingerido(registro, sha256):
+    """
+    Un contenido cuenta como ingerido solo si su JSONL existe y tiene tantas líneas
+    como entradas se registraron; si se borró o quedó truncado, se vuelve a ingerir.
+    """
+    contenido = registro["contenidos"].get(sha256)
+    if not contenido:
+        return False
+    try:
+        with open(ruta_entradas(sha256), "rb") as f:
+            lineas = sum(1 for _ in f)
+    except OSError:
+        return False
+    return lineas == contenido["entradas"]
+
+
+def _registrar_contenido(registro, sha256, ruta, entradas, pagina, carpeta):
+    _escribir_entradas(sha256, entradas)
+    registro["contenidos"][sha256] = {
+        "archivo": ruta,
+        "fuente": fuente_de_ruta(ruta, carpeta),
+        "pagina": pagina,
+        "fecha": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(os.path.getmtime(ruta))),
+        "entradas": len(entradas),
+    }
+    print(f"  - Ingerido '{ruta}' con {len(entradas)} artículos.")
+
+
+def _sin_cambios(ruta, registro):
+    anterior = registro["archivos"].get(ruta)
+    if not anterior:
+        return False
+    info = os.stat(ruta)
+    return (anterior["tamano"] == info.st_size and anterior["mtime"] == info.st_mtime
+            and _contenido_ingerido(registro, anterior["sha256"]))
+
+
+def _purgar(registro, presentes):
+    """Olvida los archivos borrados y los contenidos que ya no tiene ningún archivo."""
+    for ruta in [r for r in registro["archivos"] if r not in presentes]:
+        del registro["archivos"][ruta]
+    vigentes = {info["sha256"] for info in registro["archivos"].values()}
+    for sha256 in [s for s in registro["contenidos"] if s not in vigentes]:
+        del registro["contenidos"][sha256]
+        if os.path.exists(ruta_entradas(sha256)):
+            os.remove(ruta_entradas(sha256))
+
+    # Si se borró el archivo original de un contenido, pasa a representarlo una de sus copias
+    for sha256, contenido in registro["contenidos"].items():
+        if contenido["archivo"] not in registro["archivos"]:
+            contenido["archivo"] = min(r for r, info in registro["archivos"].items() if info["sha256"] == sha256)
+
+
+def ingerir_descargas(carpeta=DIR_DESCARGAS, segundos_estable=SEGUNDOS_ESTABLE, workers=None):
+    """
+    Ingiere los .bib terminados de la carpeta de descargas que aún no estén en el
+    registro (o que cambiaron). Cada contenido nuevo se parsea una sola vez, en un pool
+    de `workers` procesos; las copias idénticas byte a byte solo se registran.
+    Devuelve el registro actualizado. Fuera del vigilante (p. ej. desde Req. 1) se
+    puede pasar segundos_estable=0.
+    """
+    registro = cargar_registro()
+    rutas = listar_descargas(carpeta)
+    ahora = time.time()
+
+    huellas = {}
+    for ruta in rutas:
+        if _sin_cambios(ruta, registro) or not descarga_completa(ruta, ahora, segundos_estable):
+            continue
+        info = os.stat(ruta)
+        huellas[ruta] = {"sha256": hash_archivo(ruta), "tamano": info.st_size, "mtime": info.st_mtime}
+
+    # Contenido nuevo -> primer archivo (en orden) que lo tiene
+    nuevos = {}
+    for ruta, huella in huellas.items():
+        if not _contenido_ingerido(registro, huella["sha256"]):
+            nuevos.setdefault(huella["sha256"], ruta)
+
+    entradas = parsear_archivos(list(nuevos.values()), workers)
+    paginas = {}
+    for sha256, ruta in nuevos.items():
+        if ruta not in entradas:
+            continue
+        directorio = os.path.dirname(ruta)
+        if directorio not in paginas:
+            paginas[directorio] = paginas_por_archivo(directorio)
+        _registrar_contenido(registro, sha256, ruta, entradas[ruta],
+                             paginas[directorio].get(os.path.basename(ruta)), carpeta)
+
+    for ruta, huella in huellas.items():
+        contenido = registro["contenidos"].get(huella["sha256"])
+        if not contenido:
+            # No se pudo leer: se reintenta en la próxima pasada
+            continue
+        if contenido["archivo"] != ruta:
+            print(f"  - '{ruta}' es idéntico a '{contenido['archivo']}', se omite.")
+        registro["archivos"][ruta] = huella
+
+    # Un archivo borrado o reescrito puede dejar contenidos sin ningún archivo que los tenga
+    if huellas or set(registro["archivos"]) - set(rutas):
+        _purgar(registro, set(rutas))
+        guardar_registro(registro)
+    return registro
+
+
+def vigilar_descargas(carpeta=DIR_DESCARGAS, intervalo=INTERVALO_VIGILANCIA, detener=None):
+    """
+    Revisa la carpeta de descargas cada `intervalo` segundos e ingiere los .bib según
+    terminan de descargarse, hasta que se active el evento `detener` (o Ctrl+C).
+    """
+    detener = detener or threading.Event()
+    print(f"[INFO] Vigilando '{carpeta}' (cada {intervalo:g} s)...")
+    try:
+        while not detener.is_set():
+            # Llegan de a uno: parsear en el propio proceso evita hacer fork desde un hilo
+            ingerir_descargas(carpeta, workers=1)
+            detener.wait(intervalo)
+    except KeyboardInterrupt:
+        pass
+    # Última pasada: lo que terminó de descargarse mientras se detenía
+    return ingerir_descargas(carpeta, workers=1)
+
+
+#Lectura del almacén
+def iterar_entradas_ingeridas(registro=None):
+    """
+    Genera (entrada, procedencia) de todos los contenidos ingeridos, en el orden de
+    su archivo de origen, para que la unificación sea determinista.
+    """
+    registro = registro or cargar_registro()
+    for sha256, contenido in sorted(registro["contenidos"].items(), key=lambda par: par[1]["archivo"]):
+        procedencia = {k: contenido[k] for k in ("archivo", "fuente", "pagina", "fecha")}
+        with open(ruta_entradas(sha256), "r", encoding="utf-8") as f:
+            for linea in f:
+                yield EntradaBib(json.loads(linea)), procedencia
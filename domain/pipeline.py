@@ -0,0 +1,215 @@
+# domain/pipeline.py
+import os
+import glob
+import json
+import time
+import hashlib
+import importlib
+from corpus import hash_archivo
+
+#Configuración de rutas
+RUTA_UNIFICADOS = os.path.join("data", "requerimiento1", "articulos_unificados.bib")
+RUTA_ESTADO = os.path.join("data", "estado_pipeline.json")
+DIR_DOMINIO = os.path.dirname(os.path.abspath(__file__))
+
+
+#Parámetros de cada etapa (se leen de los propios módulos para no duplicarlos)
+def _parametros_req1(ids=None):
+    utils = importlib.import_module("utils")
+    return {"num_permutaciones": utils.NUM_PERMUTACIONES, "bandas_lsh": utils.BANDAS_LSH}
+
+
+def _parametros_req2(ids=None):
+    viz = importlib.import_module("requerimiento2_visual")
+    return {"ids": ids, "metricas": viz.METRICAS}
+
+
+def _parametros_req3(ids=None):
+    return {"palabras_clave": importlib.import_module("requerimiento3").PALABRAS_CLAVE}
+
+
+def _parametros_req4(ids=None, n_componentes=None):
+    req4 = importlib.import_module("requerimiento4")
+    return {"n_componentes": n_componentes or req4.N_COMPONENTES, "reduccion": req4.REDUCCION,
+            "metodos": req4.METODOS, "max_exacto": req4.MAX_ARTICULOS_EXACTO,
+            "n_centroides": req4.N_CENTROIDES, "max_hojas": req4.MAX_HOJAS_DENDROGRAMA}
+
+
+def _parametros_req5(ids=None):
+    return {}
+
+
+#Grafo de etapas: Req. 1 alimenta a Req. 2-5
+ETAPAS = {
+    1: {
+        "depende": [],
+        "entradas": lambda: sorted(glob.glob(os.path.join("downloads", "**", "*.bib"), recursive=True)),
+        "parametros": _parametros_req1,
+        "modulos": ["requerimiento1", "utils", "corpus", "ingesta"],
+        "salidas": lambda: [RUTA_UNIFICADOS,
+                            os.path.join("data", "requerimiento1", "articulos_duplicados.bib")],
+    },
+    2: {
+        "depende": [1],
+        "entradas": lambda: [RUTA_UNIFICADOS],
+        "parametros": _parametros_req2,
+        "modulos": ["requerimiento2", "requerimiento2_visual"],
+        "salidas": lambda: [os.path.join("data", "requerimiento2", f"similitud_{m}.csv")
+                            for m in importlib.import_module("requerimiento2_visual").METRICAS]
+                           + [os.path.join("data", "requerimiento2", "reportes", "matrices_similitud.pdf")],
+    },
+    3: {
+        "depende": [1],
+        "entradas": lambda: [RUTA_UNIFICADOS],
+        "parametros": _parametros_req3,
+        "modulos": ["requerimiento3"],
+        "salidas": lambda: [os.path.join("data", "requerimiento3", nombre) for nombre in (
+            "frecuencia_palabras_clave.csv", "palabras_relevantes_tfidf.csv",
+            "grafico_frecuencia_palabras.png", "grafico_tfidf.png")],
+    },
+    4: {
+        "depende": [1],
+        "entradas": lambda: [RUTA_UNIFICADOS],
+        "parametros": _parametros_req4,
+        "modulos": ["requerimiento4"],
+        "salidas": lambda: [importlib.import_module("requerimiento4").ruta_dendrograma(m)
+                            for m in importlib.import_module("requerimiento4").METODOS]
+                           + [os.path.join("data", "requerimiento4", nombre)
+                              for nombre in ("coherencia_metodos.png", "comparacion_metodos.csv")],
+    },
+    5: {
+        "depende": [1],
+        "entradas": lambda: [RUTA_UNIFICADOS],
+        "parametros": _parametros_req5,
+        "modulos": ["requerimiento5", "cache_paises"],
+        "salidas": lambda: [os.path.join("data", "requerimiento5", "visualizaciones_requerimiento5.pdf")],
+    },
+}
+
+PASOS = sorted(ETAPAS)
+
+
+#Huellas
+def huella_etapa(paso, estado, ids=None, opciones=None):
+    """
+    Hash de todo lo que determina las salidas de una etapa: contenido de sus
+    entradas, parámetros (con las opciones pedidas), código de sus módulos y
+    huellas de las etapas previas.
+    """
+    etapa = ETAPAS[paso]
+    h = hashlib.sha256()
+    for ruta in etapa["entradas"]():
+        h.update(ruta.encode("utf-8"))
+        h.update(hash_archivo(ruta).encode("utf-8") if os.path.exists(ruta) else b"-")
+    h.update(json.dumps(etapa["parametros"](ids, **(opciones or {})), sort_keys=True).encode("utf-8"))
+    for modulo in etapa["modulos"]:
+        h.update(hash_archivo(os.path.join(DIR_DOMINIO, f"{modulo}.py")).encode("utf-8"))
+    for previa in etapa["depende"]:
+        h.update(str(estado.get(str(previa), {}).get("huella", "")).encode("utf-8"))
+    return h.hexdigest()
+
+
+def cargar_estado():
+    if not os.path.exists(RUTA_ESTADO):
+        return {}
+    with open(RUTA_ESTADO, "r", encoding="utf-8") as f:
+        estado = json.load(f)
+    # Las entradas sin formato de diccionario son de una versión anterior: se ignoran
+    return {paso: info for paso, info in estado.items() if isinstance(info, dict)}
+
+
+def guardar_estado(estado):
+    os.makedirs(os.path.dirname(RUTA_ESTADO), exist_ok=True)
+    with open(RUTA_ESTADO + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(estado, f, indent=2)
+    os.replace(RUTA_ESTADO + ".tmp", RUTA_ESTADO)
+
+
+def orden_ejecucion(pasos):
+    """Añade las dependencias de los pasos pedidos y los devuelve en orden topológico."""
+    orden = []
+
+    def visitar(paso):
+        if paso in orden:
+            return
+        for previa in ETAPAS[paso]["depende"]:
+            visitar(previa)
+        orden.append(paso)
+
+    for paso in sorted(set(pasos)):
+        visitar(paso)
+    return orden
+
+
+#Ejecución
+def opciones_paso(paso, workers=None, n_componentes=None):
+    """
+    Opciones de la línea de comandos que cambian las salidas de cada paso y por eso
+    entran en su huella. workers no: solo cambia cuánto tarda, no el resultado.
+    """
+    if paso == 4:
+        return {"n_componentes": n_componentes}
+    return {}
+
+
+def ejecutar_paso(paso, ids=None, workers=None, n_componentes=None):
+    """Ejecuta un paso sin interacción. Devuelve True si terminó bien."""
+    if paso == 1:
+        return bool(importlib.import_module("requerimiento1").ejecutar_req1(workers=workers))
+    if paso == 2:
+        req2 = importlib.import_module("requerimiento2")
+        viz = importlib.import_module("requerimiento2_visual")
+        ok = req2.ejecutar_req2(todos=not ids, indices=ids)
+        return bool(ok) and bool(viz.ejecutar_req2_viz())
+    if paso == 4:
+        req4 = importlib.import_module("requerimiento4")
+        return bool(req4.ejecutar_req4(n_componentes=n_componentes or req4.N_COMPONENTES, workers=workers))
+
+    modulo = importlib.import_module(f"requerimiento{paso}")
+    return bool(getattr(modulo, f"ejecutar_req{paso}")())
+
+
+def ejecutar_pipeline(pasos, forzar=False, ids=None, workers=None, n_componentes=None):
+    """
+    Ejecuta los pasos pedidos (y las etapas de las que dependen) en orden. Una etapa
+    se omite si su huella no cambió y sus salidas siguen existiendo. Se detiene en el
+    primer fallo.
+    """
+    desconocidos = [p for p in pasos if p not in ETAPAS]
+    if desconocidos:
+        print(f"[ERROR] Paso desconocido: {', '.join(map(str, desconocidos))}")
+        return False
+
+    estado = cargar_estado()
+    pedidos = set(pasos)
+    for paso in orden_ejecucion(pasos):
+        etapa = ETAPAS[paso]
+        salidas = etapa["salidas"]()
+        salidas_completas = all(os.path.exists(s) for s in salidas)
+
+        if not etapa["entradas"]() and salidas_completas:
+            # Sin entradas no se puede reconstruir (p. ej. no hay downloads/): se usan las salidas existentes
+            print(f"\n[INFO] Req. {paso}: sin archivos de entrada, se usan las salidas existentes.")
+            continue
+
+        huella = huella_etapa(paso, estado, ids if paso == 2 else None,
+                              opciones_paso(paso, workers, n_componentes))
+        forzado = forzar and paso in pedidos
+        if not forzado and salidas_completas and estado.get(str(paso), {}).get("huella") == huella:
+            print(f"\n[INFO] Req. {paso}: sin cambios desde la última ejecución, se omite.")
+            continue
+
+        print(f"\n[INFO] Ejecutando Requerimiento {paso}...")
+        inicio = time.perf_counter()
+        if not ejecutar_paso(paso, ids, workers, n_componentes):
+            print(f"[ERROR] El Requerimiento {paso} no terminó correctamente.")
+            return False
+
+        estado[str(paso)] = {
+            "huella": huella,
+            "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "duracion_s": round(time.perf_counter() - inicio, 2),
+            "salidas": salidas,
+        }
+        guardar_estado(estado)
+    return True
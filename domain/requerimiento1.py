@@ -1,12 +1,16 @@
 # domain/requerimiento1.py
 import os
 
-from utils import leer_bibtex, normalize_data, save_bibtex, buscar_duplicados
+from utils import normalize_data, save_bibtex, buscar_duplicados
+from corpus import guardar_corpus
+from ingesta import ingerir_descargas, iterar_entradas_ingeridas
 
-def ejecutar_req1():
+def ejecutar_req1(workers=None):
     """
     Ejecuta el proceso completo del Requerimiento 1:
     Unifica todos los archivos .bib de la carpeta 'downloads' y elimina duplicados.
+    Los .bib se leen del almacén de ingesta, que solo parsea los archivos nuevos (en
+    `workers` procesos) y omite las copias idénticas de una misma descarga.
     """
     # 1. Definir la carpeta principal de descargas
     downloads_folder = 'downloads'
@@ -14,28 +18,23 @@ def ejecutar_req1():
     if not os.path.isdir(downloads_folder):
         print(f"Error: La carpeta '{downloads_folder}' no existe.")
         print("   Por favor, primero ejecuta los scrapers para descargar los archivos.")
-        return
+        return False
+
+    # 2. Ingerir los .bib nuevos y leer todas las entradas del almacén
+    print(f"\n[INFO] Ingiriendo archivos nuevos de la carpeta '{downloads_folder}' y subcarpetas...")
+    registro = ingerir_descargas(downloads_folder, segundos_estable=0, workers=workers)
 
-    # 2. Leer y procesar todos los archivos .bib recursivamente
     all_articles = []
-    print(f"\n[INFO] Leyendo archivos de la carpeta '{downloads_folder}' y subcarpetas...")
-    
-    # os.walk nos permite explorar todas las subcarpetas
-    for root, dirs, files in os.walk(downloads_folder):
-        for file in files:
-            if file.endswith('.bib'):
-                file_path = os.path.join(root, file)
-                try:
-                    entries = leer_bibtex(file_path) 
-                    normalized_entries = normalize_data(entries) 
-                    all_articles.extend(normalized_entries)
-                    print(f"  - Procesado archivo '{file_path}' con {len(normalized_entries)} artículos.")
-                except Exception as e:
-                    print(f"  -Error al procesar el archivo '{file_path}': {e}")
-    
+    for entrada, procedencia in iterar_entradas_ingeridas(registro):
+        articulo = normalize_data([entrada])[0]
+        articulo['procedencia'] = procedencia
+        all_articles.append(articulo)
+    for contenido in sorted(registro["contenidos"].values(), key=lambda c: c["archivo"]):
+        print(f"  - Archivo '{contenido['archivo']}' ({contenido['fuente']}) con {contenido['entradas']} artículos.")
+
     if not all_articles:
         print("No se encontraron artículos válidos en la carpeta 'downloads'.")
-        return
+        return False
 
     print(f"\n[INFO] Se encontraron un total de {len(all_articles)} artículos (antes de deduplicar).")
 
@@ -54,8 +53,12 @@ def ejecutar_req1():
     save_bibtex(ruta_unificados, articulos_unicos)
     save_bibtex(ruta_duplicados, articulos_duplicados) 
 
+    # Artefacto columnar para que Req. 2-5 no vuelvan a parsear el .bib
+    guardar_corpus([a['raw_data'] for a in articulos_unicos], ruta_unificados)
+
     print("\n" + "="*40)
     print("PROCESO DE UNIFICACIÓN COMPLETADO")
     print(f"  - {len(articulos_unicos)} artículos únicos guardados en '{ruta_unificados}'")
     print(f"  - {len(articulos_duplicados)} artículos duplicados guardados en '{ruta_duplicados}'")
-    print("="*40)
\ No newline at end of file
+    print("="*40)
+    return True
@@ -1,26 +1,88 @@
 # domain/requerimiento2.py
 import os
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
-from utils import leer_bibtex, normalize_data
-from sklearn.feature_extraction.text import TfidfVectorizer
+from utils import normalize_data
+from corpus import cargar_corpus
+from embeddings import obtener_embeddings, obtener_modelo
+from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from difflib import SequenceMatcher
 from Levenshtein import distance as levenshtein_distance
-from sentence_transformers import SentenceTransformer, util
-from gensim.models import KeyedVectors
+from rapidfuzz import process as rf_process
+from rapidfuzz.distance import Levenshtein as rf_levenshtein
 
 RUTA_UNIFICADOS = os.path.join('data', 'requerimiento1', 'articulos_unificados.bib')
 
-modelo_sbert = SentenceTransformer('all-MiniLM-L6-v2')
-modelo_word2vec = None
+# Por encima de este tamaño las matrices solo se guardan en CSV, no se imprimen
+MAX_ARTICULOS_CONSOLA = 30
 
-try:
-    print("[INFO] Cargando modelo Word2Vec (puede tardar 1-2 minutos la primera vez)...")
-    modelo_word2vec = KeyedVectors.load_word2vec_format('GoogleNews-vectors-negative300.bin', binary=True)
-    print("[OK] Modelo Word2Vec cargado correctamente.")
-except Exception as e:
-    print(f"[WARN] No se pudo cargar el modelo Word2Vec: {e}")
+RUTA_WORD2VEC = 'GoogleNews-vectors-negative300.bin'
+# Copia en formato nativo de gensim: los vectores quedan en un .npy aparte que se
+# abre con mmap, así varios procesos comparten las mismas páginas de memoria
+RUTA_WORD2VEC_NATIVO = os.path.join('data', 'modelos', 'word2vec.kv')
+
+# Los modelos (torch, gensim) se cargan en el primer uso, no al importar el módulo
+_modelo_word2vec = None
+_word2vec_cargado = False
+
+
+def vocabulario_corpus():
+    """Palabras (en minúsculas, como las busca similitud_word2vec) de los abstracts del corpus."""
+    articulos = normalize_data(cargar_corpus(RUTA_UNIFICADOS)) if os.path.exists(RUTA_UNIFICADOS) else []
+    return {palabra for art in articulos for palabra in art['abstract'].split()}
+
+
+def convertir_word2vec(ruta_bin=RUTA_WORD2VEC, ruta_kv=RUTA_WORD2VEC_NATIVO, vocabulario=None):
+    """
+    Conversión única del binario de GoogleNews al formato nativo de gensim.
+    Si se pasa un vocabulario, solo se conservan esas palabras.
+    """
+    from gensim.models import KeyedVectors
+
+    print(f"[INFO] Convirtiendo '{ruta_bin}' a formato nativo (solo se hace una vez)...")
+    modelo = KeyedVectors.load_word2vec_format(ruta_bin, binary=True)
+    if vocabulario is not None:
+        palabras = [w for w in modelo.index_to_key if w in vocabulario]
+        podado = KeyedVectors(modelo.vector_size)
+        podado.add_vectors(palabras, modelo[palabras])
+        print(f"[INFO] Vocabulario podado de {len(modelo.index_to_key)} a {len(palabras)} palabras.")
+        modelo = podado
+
+    os.makedirs(os.path.dirname(ruta_kv), exist_ok=True)
+    modelo.save(ruta_kv, separately=['vectors'])
+    with open(ruta_kv + '.json', 'w', encoding='utf-8') as f:
+        json.dump({"podado": vocabulario is not None,
+                   "vocabulario": sorted(vocabulario) if vocabulario is not None else None}, f)
+    print(f"[OK] Modelo Word2Vec nativo guardado en {ruta_kv}")
+    return ruta_kv
+
+
+def obtener_modelo_word2vec():
+    """Carga el modelo Word2Vec la primera vez que se necesita (None si no está disponible)."""
+    global _modelo_word2vec, _word2vec_cargado
+    if not _word2vec_cargado:
+        _word2vec_cargado = True
+        try:
+            from gensim.models import KeyedVectors
+            if not os.path.exists(RUTA_WORD2VEC_NATIVO):
+                convertir_word2vec()
+            _modelo_word2vec = KeyedVectors.load(RUTA_WORD2VEC_NATIVO, mmap='r')
+            print("[OK] Modelo Word2Vec cargado correctamente (mmap).")
+
+            with open(RUTA_WORD2VEC_NATIVO + '.json', 'r', encoding='utf-8') as f:
+                info = json.load(f)
+            if info.get("podado"):
+                faltantes = vocabulario_corpus() - set(info["vocabulario"])
+                if faltantes:
+                    print(f"[WARN] El modelo podado no cubre {len(faltantes)} palabras nuevas del corpus. "
+                          "Vuelva a ejecutar la conversión con --podar.")
+        except Exception as e:
+            print(f"[WARN] No se pudo cargar el modelo Word2Vec: {e}")
+    return _modelo_word2vec
 
 def mostrar_lista_articulos(articulos):
     """Muestra una lista numerada de artículos con título y año."""
@@ -34,38 +96,42 @@ def mostrar_lista_articulos(articulos):
         ano = articulo.get('year', 'Sin Año')
         print(f"[{i+1}] {titulo} ({ano})")
 
+def seleccionar_por_indices(articulos, indices_1based):
+    """Devuelve los abstracts e índices (base 1) de los artículos pedidos, sin interacción."""
+    indices_validos = []
+    for indice in indices_1based:
+        if 1 <= indice <= len(articulos):
+            indices_validos.append(indice)
+        else:
+            print(f"Número fuera de rango: {indice}")
+
+    if len(indices_validos) < 2:
+        print("Debe seleccionar al menos dos artículos para comparar.")
+        return [], []
+
+    abstracts_seleccionados = [articulos[i - 1].get('abstract', '') for i in indices_validos]
+
+    print("\nArtículos seleccionados para comparar:")
+    for i in indices_validos:
+        t = articulos[i - 1].get('title', 'Sin Título')
+        print(f"  [{i}] {t}")
+
+    if any(not abstract for abstract in abstracts_seleccionados):
+        print("\nAdvertencia: Uno o más de los artículos seleccionados no tienen abstract.")
+
+    return abstracts_seleccionados, indices_validos
+
+
 def seleccionar_articulos(articulos):
     
-    articulos_seleccionados = []
     while True:
         seleccion = input("\nIngrese los números de los artículos a comparar, separados por comas (ej: 1, 5, 10): ")
-        indices_seleccionados = []
         
         try:
-            numeros_str = [s.strip() for s in seleccion.split(',') if s.strip() != '']
-            for num_str in numeros_str:
-                indice = int(num_str) - 1 
-                if 0 <= indice < len(articulos):
-                    indices_seleccionados.append(indice)
-                else:
-                    print(f"Número fuera de rango: {num_str}")
-            
-            if len(indices_seleccionados) < 2:
-                print("Debe seleccionar al menos dos artículos para comparar.")
+            indices = [int(s.strip()) for s in seleccion.split(',') if s.strip() != '']
+            abstracts_seleccionados, indices_reales_1based = seleccionar_por_indices(articulos, indices)
+            if not abstracts_seleccionados:
                 continue
-            
-            articulos_seleccionados = [articulos[i] for i in indices_seleccionados]
-            abstracts_seleccionados = [art.get('abstract', '') for art in articulos_seleccionados]
-            
-            print("\nArtículos seleccionados para comparar:")
-            for i in indices_seleccionados:
-                t = articulos[i].get('title', 'Sin Título')
-                print(f"  [{i+1}] {t}")
-                
-            if any(not abstract for abstract in abstracts_seleccionados):
-                print("\nAdvertencia: Uno o más de los artículos seleccionados no tienen abstract.")
-            
-            indices_reales_1based = [i+1 for i in indices_seleccionados]
             return abstracts_seleccionados, indices_reales_1based
 
         except ValueError:
@@ -109,13 +175,13 @@ def similitud_damerau(texto1, texto2):
 
 def similitud_sbert(texto1, texto2):
     """Similitud usando Sentence-BERT (representaciones semánticas)."""
-    emb1 = modelo_sbert.encode(texto1, convert_to_tensor=True)
-    emb2 = modelo_sbert.encode(texto2, convert_to_tensor=True)
-    return float(util.cos_sim(emb1, emb2)[0][0])
+    emb1, emb2 = obtener_modelo().encode([texto1, texto2])
+    return float(np.dot(emb1, emb2) / (np.linalg.norm(emb1) * np.linalg.norm(emb2)))
 
 
 def similitud_word2vec(texto1, texto2):
     """Similitud promedio con Word2Vec (usa el modelo cargado globalmente)."""
+    modelo_word2vec = obtener_modelo_word2vec()
     if modelo_word2vec is None:
         return similitud_coseno(texto1, texto2)
     
@@ -130,30 +196,173 @@ def similitud_word2vec(texto1, texto2):
 
 
 
-def ejecutar_req2():
+
+#Matrices de similitud por lotes (todas las parejas a la vez)
+
+def matriz_jaccard(abstracts):
+    """Jaccard de todas las parejas a partir de una matriz binaria dispersa de términos."""
+    n = len(abstracts)
+    try:
+        vectorizer = CountVectorizer(binary=True, lowercase=True, tokenizer=str.split, token_pattern=None)
+        X = vectorizer.fit_transform(abstracts)
+    except ValueError:
+        # Ningún abstract tiene palabras
+        return np.eye(n)
+    interseccion = (X @ X.T).toarray().astype(np.float64)
+    tamanos = np.asarray(X.sum(axis=1), dtype=np.float64).ravel()
+    union = tamanos[:, None] + tamanos[None, :] - interseccion
+    matriz = np.divide(interseccion, union, out=np.zeros_like(interseccion), where=union != 0)
+    np.fill_diagonal(matriz, 1.0)
+    return matriz
+
+
+def matriz_coseno(abstracts):
+    """Coseno TF-IDF de todas las parejas: un solo ajuste del vectorizador y un producto disperso."""
+    n = len(abstracts)
+    try:
+        tfidf = TfidfVectorizer(stop_words='english').fit_transform(abstracts)
+    except ValueError:
+        return np.eye(n)
+    matriz = cosine_similarity(tfidf)
+    np.fill_diagonal(matriz, 1.0)
+    return matriz
+
+
+def matriz_levenshtein(abstracts):
+    """Levenshtein normalizado de todas las parejas (rapidfuzz, en C y multihilo)."""
+    matriz = rf_process.cdist(abstracts, abstracts, scorer=rf_levenshtein.normalized_similarity,
+                              dtype=np.float64, workers=-1)
+    np.fill_diagonal(matriz, 1.0)
+    return matriz
+
+
+def _columnas_damerau(abstracts, columnas):
+    """
+    Valores del triángulo superior de las columnas pedidas: para la columna j, el ratio
+    de cada abstract i < j contra el j. El abstract de la columna va como b, cuyo
+    análisis cachea SequenceMatcher y se reutiliza para toda la columna.
+    """
+    matcher = SequenceMatcher(None)
+    valores = []
+    for j in columnas:
+        matcher.set_seq2(abstracts[j])
+        fila = []
+        for i in range(j):
+            matcher.set_seq1(abstracts[i])
+            fila.append(matcher.ratio())
+        valores.append((j, fila))
+    return valores
+
+
+def matriz_damerau(abstracts, workers=None):
+    """
+    similitud_damerau de todas las parejas, una vez por pareja (triángulo superior,
+    con el texto de la fila como a) y reflejada. Las columnas se reparten entre procesos.
+    """
+    n = len(abstracts)
+    matriz = np.eye(n)
+    workers = min(workers or os.cpu_count() or 1, max(n - 1, 1))
+    # Columnas alternadas entre procesos: a cada uno le tocan columnas cortas y largas
+    repartos = [list(range(k + 1, n, workers)) for k in range(workers)]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            resultados = list(executor.map(_columnas_damerau, [abstracts] * workers, repartos))
+    else:
+        resultados = [_columnas_damerau(abstracts, columnas) for columnas in repartos]
+
+    for valores in resultados:
+        for j, fila in valores:
+            matriz[:j, j] = fila
+            matriz[j, :j] = fila
+    return matriz
+
+
+def matriz_sbert(abstracts):
+    """Similitud SBERT de todas las parejas con embeddings del almacén en disco."""
+    embeddings = obtener_embeddings(abstracts).astype(np.float64)
+    normas = np.linalg.norm(embeddings, axis=1)
+    normas[normas == 0] = 1.0
+    unitarios = embeddings / normas[:, None]
+    matriz = unitarios @ unitarios.T
+    np.fill_diagonal(matriz, 1.0)
+    return matriz
+
+
+def matriz_word2vec(abstracts):
+    """Similitud Word2Vec de todas las parejas a partir de los vectores promedio."""
+    modelo_word2vec = obtener_modelo_word2vec()
+    if modelo_word2vec is None:
+        return matriz_coseno(abstracts)
+
+    vectores = np.zeros((len(abstracts), modelo_word2vec.vector_size))
+    for i, texto in enumerate(abstracts):
+        palabras = [w for w in texto.lower().split() if w in modelo_word2vec]
+        if palabras:
+            vectores[i] = np.mean([modelo_word2vec[w] for w in palabras], axis=0)
+
+    normas = np.linalg.norm(vectores, axis=1)
+    normas[normas == 0] = 1.0
+    unitarios = vectores / normas[:, None]
+    matriz = unitarios @ unitarios.T
+    np.fill_diagonal(matriz, 1.0)
+    return matriz
+
+
+def calcular_matrices_similitud(abstracts):
+    """Calcula las seis matrices n×n de similitud en modo por lotes."""
+    calculos = {
+        "Jaccard": matriz_jaccard,
+        "Coseno_TFIDF": matriz_coseno,
+        "Levenshtein": matriz_levenshtein,
+        "Damerau": matriz_damerau,
+        "SBERT": matriz_sbert,
+        "Word2Vec": matriz_word2vec,
+    }
+    resultados = {}
+    for nombre, funcion in calculos.items():
+        inicio = time.perf_counter()
+        resultados[nombre] = funcion(abstracts)
+        print(f"  - {nombre}: {time.perf_counter() - inicio:.2f} s")
+    return resultados
+
+
+def ejecutar_req2(todos=False, indices=None):
+    """
+    Calcula las seis matrices de similitud. Con todos=True compara todos los
+    artículos del corpus que tienen abstract; con indices (base 1) compara esos
+    artículos. En ambos casos no se pide selección al usuario.
+    """
     
     if not os.path.exists(RUTA_UNIFICADOS):
         print(f"Error: No se encuentra el archivo '{RUTA_UNIFICADOS}'.")
         print("   Por favor, ejecute la Opción 1 del menú principal primero.")
-        return
+        return False
 
     # 1. Cargar los artículos unificados
     print(f"[INFO] Cargando artículos desde '{RUTA_UNIFICADOS}'...")
-    articulos = normalize_data(leer_bibtex(RUTA_UNIFICADOS))
+    articulos = normalize_data(cargar_corpus(RUTA_UNIFICADOS))
     
     if not articulos:
         print("El archivo de artículos unificados está vacío.")
-        return
+        return False
 
-    # 2. Mostrar la lista para que el usuario elija
-    mostrar_lista_articulos(articulos)
-    
-    # 3. Obtener los abstracts seleccionados
-    abstracts, indices_reales = seleccionar_articulos(articulos)
+    if todos:
+        # 2-3. Todo el corpus: solo los artículos con abstract
+        indices_reales = [i + 1 for i, art in enumerate(articulos) if art.get('abstract')]
+        abstracts = [articulos[i - 1]['abstract'] for i in indices_reales]
+        print(f"[INFO] Comparando los {len(abstracts)} artículos con abstract del corpus.")
+    elif indices:
+        abstracts, indices_reales = seleccionar_por_indices(articulos, indices)
+    else:
+        # 2. Mostrar la lista para que el usuario elija
+        mostrar_lista_articulos(articulos)
+        
+        # 3. Obtener los abstracts seleccionados
+        abstracts, indices_reales = seleccionar_articulos(articulos)
     
     if not abstracts:
         print("No se pudieron obtener los abstracts para la comparación.")
-        return
+        return False
 
     # titulos y titulos_cortos deben corresponder al orden seleccionado
     titulos = []
@@ -163,31 +372,9 @@ def ejecutar_req2():
 
     n = len(abstracts)
 
-    # Diccionario para matrices de cada algoritmo
-    resultados = {
-        "Jaccard": np.zeros((n, n)),
-        "Coseno_TFIDF": np.zeros((n, n)),
-        "Levenshtein": np.zeros((n, n)),
-        "Damerau": np.zeros((n, n)),
-        "SBERT": np.zeros((n, n)),
-        "Word2Vec": np.zeros((n, n))
-    }
-        
+    # Matrices de cada algoritmo, calculadas por lotes
     print("\n[INFO] Calculando similitudes entre abstracts...\n")
-    for i in range(n):
-        for j in range(n):
-            if i == j:
-                for key in resultados.keys():
-                    resultados[key][i, j] = 1.0
-                continue
-            
-            a1, a2 = abstracts[i], abstracts[j]
-            resultados["Jaccard"][i, j] = similitud_jaccard(a1, a2)
-            resultados["Coseno_TFIDF"][i, j] = similitud_coseno(a1, a2)
-            resultados["Levenshtein"][i, j] = similitud_levenshtein(a1, a2)
-            resultados["Damerau"][i, j] = similitud_damerau(a1, a2)
-            resultados["SBERT"][i, j] = similitud_sbert(a1, a2)
-            resultados["Word2Vec"][i, j] = similitud_word2vec(a1, a2)
+    resultados = calcular_matrices_similitud(abstracts)
 
     os.makedirs("data/requerimiento2", exist_ok=True)
     pd.set_option('display.max_columns', None)
@@ -206,8 +393,10 @@ def ejecutar_req2():
         # aquí usamos indices_reales para conservar los números originales
         numeros_originales = [f"[{indices_reales[i]}] {titulos_cortos[i]}" for i in range(len(titulos_cortos))]
         df = pd.DataFrame(matriz, index=numeros_originales, columns=numeros_originales)
-        print(f"\n=== MATRIZ DE SIMILITUD ({nombre}) ===")
-        print(df.round(3).to_string())
+        if n <= MAX_ARTICULOS_CONSOLA:
+            print(f"\n=== MATRIZ DE SIMILITUD ({nombre}) ===")
+            print(df.round(3).to_string())
         ruta_csv = os.path.join("data/requerimiento2", f"similitud_{nombre}.csv")
         df.to_csv(ruta_csv, index=True, encoding='utf-8-sig')
-        print(f"[OK] Resultados guardados en: {ruta_csv}")
\ No newline at end of file
+        print(f"[OK] Resultados guardados en: {ruta_csv}")
+    return True
@@ -1,10 +1,10 @@
 import os
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from fpdf import FPDF
 import unicodedata
-from itertools import combinations
 
 # ---------------- CONFIGURACIÓN ----------------
 INPUT_DIR = os.path.join("data", "requerimiento2")
@@ -24,8 +24,11 @@ def generar_heatmap(ruta_csv, metrica):
     """Genera un heatmap a partir del CSV de similitud (con números en los títulos)."""
     df = pd.read_csv(ruta_csv, index_col=0)
 
+    # Con el corpus completo las anotaciones y bordes por celda son ilegibles
+    pequena = len(df) <= 30
     plt.figure(figsize=(10, 8))
-    sns.heatmap(df, cmap="YlGnBu", annot=True, fmt=".2f", linewidths=0.3, cbar_kws={'label': 'Similitud'})
+    sns.heatmap(df, cmap="YlGnBu", annot=pequena, fmt=".2f", linewidths=0.3 if pequena else 0,
+                xticklabels=pequena, yticklabels=pequena, cbar_kws={'label': 'Similitud'})
     plt.title(f"Matriz de Similitud ({metrica})", fontsize=12)
     plt.xticks(rotation=45, ha='right', fontsize=8)
     plt.yticks(fontsize=8)
@@ -40,11 +43,12 @@ def generar_heatmap(ruta_csv, metrica):
 
 def obtener_top_similares(df, top_n=5):
     """Devuelve los pares de artículos más similares."""
-    pares = []
-    for i, j in combinations(df.columns, 2):
-        valor = float(df.at[i, j]) if not pd.isna(df.at[i, j]) else 0
-        pares.append((i, j, valor))
-    top = sorted(pares, key=lambda x: x[2], reverse=True)[:top_n]
+    valores = np.nan_to_num(df.to_numpy(dtype=float), nan=0.0)
+    filas, columnas = np.triu_indices(len(df.columns), k=1)
+    triangulo = valores[filas, columnas]
+    # Orden estable para conservar el desempate por posición de la versión con combinations
+    orden = np.argsort(-triangulo, kind="stable")[:top_n]
+    top = [(df.columns[filas[k]], df.columns[columnas[k]], float(triangulo[k])) for k in orden]
     return pd.DataFrame(top, columns=["Artículo 1", "Artículo 2", "Similitud"])
 
 
@@ -130,6 +134,7 @@ def ejecutar_req2_viz():
 
     exportar_pdf(resultados)
     print("\nRequerimiento 2 (visualización + ranking) completado exitosamente.")
+    return True
 
 
 if __name__ == "__main__":
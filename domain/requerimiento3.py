@@ -6,7 +6,8 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.feature_extraction.text import TfidfVectorizer
 from collections import Counter
-from utils import leer_bibtex, normalize_data
+from utils import normalize_data
+from corpus import cargar_corpus
 
 #Configuración de las rutas
 RUTA_BIB = os.path.join("data", "requerimiento1", "articulos_unificados.bib")
@@ -52,7 +53,7 @@ def leer_abstracts(file_path):
         print(f"[ERROR] No se encuentra el archivo: {file_path}")
         return []
     try:
-        articulos = normalize_data(leer_bibtex(file_path))
+        articulos = normalize_data(cargar_corpus(file_path))
         abstracts = [limpiar_texto(art['abstract']) for art in articulos if art.get('abstract')]
         return abstracts
     except Exception as e:
@@ -135,7 +136,7 @@ def ejecutar_req3():
     abstracts = leer_abstracts(RUTA_BIB)
     if not abstracts:
         print("[ERROR] No se encontraron abstracts válidos.")
-        return
+        return False
 
     # Frecuencia de palabras clave predefinidas
     frecuencia = contar_frecuencia_claves(abstracts)
@@ -146,6 +147,7 @@ def ejecutar_req3():
     # Mostrar y guardar
     mostrar_resultados(frecuencia, nuevas_palabras)
     print("\n[INFO] Requerimiento 3 completado exitosamente")
+    return True
 
 
 if __name__ == "__main__":
@@ -1,13 +1,21 @@
 import os
 import re
+import csv
+import json
+import time
 import string
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
 import numpy as np
 import matplotlib.pyplot as plt
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.decomposition import PCA
+from sklearn.decomposition import PCA, TruncatedSVD
+from sklearn.cluster import MiniBatchKMeans
 from scipy.cluster.hierarchy import linkage, dendrogram
-from scipy.spatial.distance import pdist, squareform
+from scipy.spatial.distance import pdist
 from scipy.cluster.hierarchy import cophenet
+from corpus import cargar_corpus
 
 
 #Configuración de rutas
@@ -15,6 +23,23 @@ RUTA_BIB = os.path.join("data", "requerimiento1", "articulos_unificados.bib")
 OUTPUT_DIR = os.path.join("data", "requerimiento4")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# Parámetros del clustering (forman parte de la huella del paso en el pipeline)
+N_COMPONENTES = 50
+# "svd": TruncatedSVD sobre la matriz TF-IDF dispersa; "pca": PCA sobre la matriz densa
+# (n×5000 float64, solo para comparar en benchmarks.comparar_reduccion_tfidf)
+REDUCCION = "svd"
+METODOS = ["single", "complete", "average", "weighted", "centroid", "median", "ward"]
+# Estos métodos suponen distancias euclídeas: sobre vectores unitarios se usa
+# sqrt(2·d_coseno), que es la distancia euclídea entre ellos
+METODOS_EUCLIDEOS = {"centroid", "median", "ward"}
+# Hasta este tamaño el linkage se calcula sobre todos los abstracts (distancias
+# condensadas: n(n-1)/2 float64, ~400 MB con 10.000); por encima se agrupan antes
+# en N_CENTROIDES con MiniBatchKMeans y el árbol se construye sobre los centroides
+MAX_ARTICULOS_EXACTO = 10000
+N_CENTROIDES = 1000
+# Grupos que se dibujan del árbol completo (truncate_mode='lastp')
+MAX_HOJAS_DENDROGRAMA = 50
+
 
 #Funciones auxiliares
 def limpiar_texto(texto):
@@ -32,84 +57,264 @@ def leer_abstracts(file_path):
     if not os.path.exists(file_path):
         print(f"[ERROR] No se encuentra el archivo: {file_path}")
         return []
-    with open(file_path, "r", encoding="utf-8") as f:
-        contenido = f.read()
-    abstracts = re.findall(r"abstract\s*=\s*[{](.*?)[}]", contenido, re.DOTALL)
+    abstracts = (entrada.get("abstract", "") for entrada in cargar_corpus(file_path))
     abstracts = [limpiar_texto(a) for a in abstracts if a.strip()]
     return abstracts
 
 
-# TF-IDF + PCA + MATRIZ DE DISTANCIAS
-def calcular_distancias_con_pca(abstracts, n_componentes=50):
-    """Genera TF-IDF, reduce dimensionalidad con PCA y calcula matriz de distancias."""
+# TF-IDF + REDUCCIÓN + DISTANCIAS CONDENSADAS
+def preagrupar(vectores, n_centroides=N_CENTROIDES):
+    """Resume los vectores en centroides con MiniBatchKMeans. Devuelve (centroides, artículos por centroide)."""
+    n_centroides = min(n_centroides, len(vectores))
+    print(f"[INFO] {len(vectores)} abstracts: pre-agrupando en {n_centroides} centroides con MiniBatchKMeans...")
+    kmeans = MiniBatchKMeans(n_clusters=n_centroides, batch_size=4096, n_init=3, random_state=42)
+    etiquetas = kmeans.fit_predict(vectores)
+    tamanos = np.bincount(etiquetas, minlength=n_centroides)
+    return kmeans.cluster_centers_[tamanos > 0], tamanos[tamanos > 0]
+
+
+def reducir_tfidf(abstracts, n_componentes=50, reduccion=REDUCCION):
+    """
+    TF-IDF (CSR float32) y reducción a n_componentes. Con "svd" la matriz nunca se
+    densifica: TruncatedSVD aleatorizado trabaja sobre la CSR (es LSA: no centra los datos).
+    """
     print(f"[INFO] Vectorizando {len(abstracts)} abstracts con TF-IDF...")
-    vectorizer = TfidfVectorizer(stop_words='english', max_features=5000)
-    tfidf = vectorizer.fit_transform(abstracts).toarray()
+    # La ruta "pca" conserva el float64 de la versión densa original
+    tipo = np.float64 if reduccion == "pca" else np.float32
+    vectorizer = TfidfVectorizer(stop_words='english', max_features=5000, dtype=tipo)
+    tfidf = vectorizer.fit_transform(abstracts)
+
+    if reduccion == "pca":
+        print(f"[INFO] Reducción de dimensionalidad a {n_componentes} componentes con PCA (densa)...")
+        tfidf = tfidf.toarray()
+        return PCA(n_components=min(n_componentes, tfidf.shape[1])).fit_transform(tfidf)
+
+    print(f"[INFO] Reducción de dimensionalidad a {n_componentes} componentes con TruncatedSVD...")
+    # TruncatedSVD exige menos componentes que columnas
+    n_componentes = max(1, min(n_componentes, tfidf.shape[1] - 1))
+    svd = TruncatedSVD(n_components=n_componentes, algorithm="randomized", random_state=42)
+    return svd.fit_transform(tfidf)
+
+
+def calcular_distancias_con_pca(abstracts, n_componentes=50, max_exacto=MAX_ARTICULOS_EXACTO,
+                                reduccion=REDUCCION):
+    """
+    Genera TF-IDF, reduce dimensionalidad (TruncatedSVD o PCA) y calcula las distancias
+    coseno de todo el corpus en forma condensada (sin matriz n×n). Con más de max_exacto
+    abstracts las distancias son entre centroides. Devuelve (distancias, artículos por hoja).
+    """
+    reducidos = reducir_tfidf(abstracts, n_componentes, reduccion)
+
+    tamanos = np.ones(len(reducidos), dtype=np.int64)
+    if len(reducidos) > max_exacto:
+        reducidos, tamanos = preagrupar(reducidos)
+
+    # Vectores unitarios en float32: la distancia coseno queda bien definida y los
+    # vectores ocupan la mitad. pdist devuelve el vector condensado en float64,
+    # n(n-1)/2 valores: la mitad que la matriz n×n (1,6 GB frente a 3,2 GB con 20.000)
+    reducidos = np.asarray(reducidos, dtype=np.float32)
+    reducidos /= np.maximum(np.linalg.norm(reducidos, axis=1, keepdims=True), np.float32(1e-12))
+    return pdist(reducidos, metric="cosine"), tamanos
+
+
+def calcular_linkage(distancias, metodo):
+    """Usa fastcluster si está instalado (mismo árbol, más rápido y con menos memoria); si no, SciPy."""
+    try:
+        import fastcluster
+    except ImportError:
+        return linkage(distancias, method=metodo)
+    return fastcluster.linkage(distancias, method=metodo)
+
+
+def articulos_por_nodo(linkage_matrix, tamanos):
+    """Número de artículos bajo cada nodo del árbol (hojas y uniones, en el orden de SciPy)."""
+    conteos = np.concatenate([tamanos, np.zeros(len(linkage_matrix), dtype=np.int64)])
+    n = len(tamanos)
+    for i, (a, b) in enumerate(linkage_matrix[:, :2].astype(np.int64)):
+        conteos[n + i] = conteos[a] + conteos[b]
+    return conteos
+
+
+#Linkages persistidos (para volver a graficar o puntuar sin recalcular)
+def huella_clustering(abstracts, n_componentes=N_COMPONENTES):
+    """Hash de los abstracts y de los parámetros que determinan los árboles."""
+    h = hashlib.sha256()
+    for abstract in abstracts:
+        h.update(abstract.encode("utf-8"))
+        h.update(b"\0")
+    h.update(json.dumps([n_componentes, REDUCCION, MAX_ARTICULOS_EXACTO, N_CENTROIDES]).encode("utf-8"))
+    return h.hexdigest()
+
+
+def ruta_linkage(metodo):
+    return os.path.join(OUTPUT_DIR, f"linkage_{metodo}.npz")
+
+
+def guardar_linkage(metodo, huella, linkage_matrix, tamanos, coph_corr):
+    destino = ruta_linkage(metodo)
+    with open(destino + ".tmp", "wb") as f:
+        np.savez(f, linkage=linkage_matrix, tamanos=tamanos, cofenetica=coph_corr, huella=huella)
+    os.replace(destino + ".tmp", destino)
 
-    print(f"[INFO] Reducción de dimensionalidad a {n_componentes} componentes con PCA...")
-    pca = PCA(n_components=min(n_componentes, tfidf.shape[1]))
-    reducidos = pca.fit_transform(tfidf)
 
-    # Cálculo de distancia basada en coseno
-    dist = 1 - np.dot(reducidos, reducidos.T) / (
-        np.linalg.norm(reducidos, axis=1)[:, None] * np.linalg.norm(reducidos, axis=1)
-    )
+def cargar_linkage(metodo, huella):
+    """Devuelve (linkage, tamanos, correlación cofenética) si hay uno guardado para esta huella."""
+    try:
+        with np.load(ruta_linkage(metodo)) as datos:
+            if str(datos["huella"]) != huella:
+                return None
+            return datos["linkage"], datos["tamanos"], float(datos["cofenetica"])
+    except (OSError, KeyError, ValueError):
+        return None
 
-    return dist
+
+def agrupar(distancias, metodo):
+    """Linkage sobre las distancias condensadas y su correlación cofenética."""
+    print(f"[INFO] Calculando linkage con método: {metodo}")
+    linkage_matrix = calcular_linkage(distancias, metodo)
+    coph_corr, _ = cophenet(linkage_matrix, distancias)
+    return linkage_matrix, coph_corr
 
 
 # Función para graficar el dendograma
-def graficar_dendrograma(distancias, metodo, nombres=None, max_muestras=100):
-    """Genera un dendrograma legible incluso con miles de abstracts."""
-    print(f"[INFO] Generando dendrograma con método: {metodo}")
+def ruta_dendrograma(metodo):
+    """PNG del dendrograma de un método; el nombre lleva la reducción usada (p. ej. dendrograma_ward_svd.png)."""
+    return os.path.join(OUTPUT_DIR, f"dendrograma_{metodo}_{REDUCCION}.png")
 
-    # Si hay muchos abstracts, tomamos una muestra representativa para visualizar
-    if distancias.shape[0] > max_muestras:
-        print(f"[WARN] Hay {distancias.shape[0]} abstracts. Mostrando solo los primeros {max_muestras} para visualización.")
-        distancias = distancias[:max_muestras, :max_muestras]
-        nombres = nombres[:max_muestras] if nombres else [f"Art{i+1}" for i in range(max_muestras)]
 
-    condensed_dist = squareform(distancias, checks=False)
-    linkage_matrix = linkage(condensed_dist, method=metodo)
+def graficar_dendrograma(linkage_matrix, metodo, tamanos, max_hojas=MAX_HOJAS_DENDROGRAMA):
+    """
+    Dibuja el árbol de todos los abstracts mostrando solo sus últimos max_hojas
+    grupos (truncate_mode='lastp'), etiquetados con cuántos artículos contienen.
+    """
+    print(f"[INFO] Generando dendrograma con método: {metodo}")
 
-    coph_corr, _ = cophenet(linkage_matrix, condensed_dist)
+    conteos = articulos_por_nodo(linkage_matrix, tamanos)
+    exacto = bool((tamanos == 1).all())
+
+    def etiqueta(nodo):
+        return f"Art{nodo + 1}" if exacto and nodo < len(tamanos) else f"({conteos[nodo]})"
 
     plt.figure(figsize=(12, 6))
-    dendrogram(linkage_matrix, labels=nombres, leaf_rotation=90, leaf_font_size=8, color_threshold=0.7)
-    plt.title(f"Dendrograma de Clustering Jerárquico ({metodo.capitalize()} linkage, PCA)")
-    plt.xlabel("Abstracts agrupados (muestra)")
+    dendrogram(linkage_matrix, truncate_mode="lastp", p=max_hojas, leaf_label_func=etiqueta,
+               leaf_rotation=90, leaf_font_size=8, color_threshold=0.7)
+    plt.title(f"Dendrograma de Clustering Jerárquico ({metodo.capitalize()} linkage, {REDUCCION.upper()})")
+    plt.xlabel(f"Grupos de abstracts ({max_hojas} grupos superiores del árbol de {int(conteos[-1])} artículos)")
     plt.ylabel("Distancia")
     plt.tight_layout()
 
-    output_path = os.path.join(OUTPUT_DIR, f"dendrograma_{metodo}_pca.png")
+    output_path = ruta_dendrograma(metodo)
     plt.savefig(output_path, dpi=300)
     plt.close()
     print(f"[OK] Dendrograma guardado en: {output_path}")
 
-    return coph_corr
 
-    
-    
+#Evaluación de métodos en paralelo (distancias compartidas por memoria compartida)
+def _abrir_memoria(nombre):
+    """
+    Se conecta al bloque creado por el proceso principal, que es quien lo libera.
+    Los workers del pool comparten su resource tracker, así que registrarlo de nuevo
+    (antes de Python 3.13, que permite track=False) no lo libera antes de tiempo.
+    """
+    try:
+        return shared_memory.SharedMemory(name=nombre, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=nombre)
 
-def ejecutar_req4():
-    print("[INFO] Ejecutando Requerimiento 4 (Clustering Jerárquico con PCA)...")
 
-    abstracts = leer_abstracts(RUTA_BIB)
-    if not abstracts:
-        print("[ERROR] No se encontraron abstracts válidos.")
-        return
+def evaluar_metodo(metodo, huella, tamanos, nombre_memoria=None, n_distancias=0):
+    """
+    Worker: carga el linkage guardado o lo calcula desde las distancias condensadas
+    compartidas, lo guarda y dibuja su dendrograma. Devuelve su fila de la comparación.
+    """
+    plt.switch_backend("Agg")
+    inicio = time.perf_counter()
+    arbol = cargar_linkage(metodo, huella)
+    reutilizado = arbol is not None
+    if arbol is None:
+        memoria = _abrir_memoria(nombre_memoria)
+        try:
+            distancias = np.ndarray((n_distancias,), dtype=np.float64, buffer=memoria.buf)
+            if metodo in METODOS_EUCLIDEOS:
+                distancias = np.sqrt(2 * np.clip(distancias, 0, None))
+            linkage_matrix, coph_corr = agrupar(distancias, metodo)
+            del distancias
+        finally:
+            memoria.close()
+        guardar_linkage(metodo, huella, linkage_matrix, tamanos, coph_corr)
+        arbol = (linkage_matrix, tamanos, coph_corr)
+
+    linkage_matrix, tamanos, coph_corr = arbol
+    graficar_dendrograma(linkage_matrix, metodo, tamanos)
+    return {"metodo": metodo, "cofenetica": coph_corr, "altura_max": float(linkage_matrix[-1, 2]),
+            "reutilizado": reutilizado, "duracion_s": round(time.perf_counter() - inicio, 2)}
+
+
+def evaluar_metodos(abstracts, metodos=METODOS, n_componentes=N_COMPONENTES, workers=None):
+    """
+    Evalúa los métodos de enlace a la vez, uno por proceso. El vector de distancias
+    condensadas se calcula una vez y se comparte por memoria compartida (sin copias
+    por worker). Devuelve las filas de la comparación en el orden de metodos.
+    """
+    huella = huella_clustering(abstracts, n_componentes)
+    pendientes = [m for m in metodos if cargar_linkage(m, huella) is None]
+    if len(pendientes) < len(metodos):
+        print(f"[INFO] Linkages reutilizados de {OUTPUT_DIR}: "
+              f"{', '.join(m for m in metodos if m not in pendientes)}")
 
-    distancias = calcular_distancias_con_pca(abstracts, n_componentes=50)
-    nombres = [f"Art{i+1}" for i in range(len(abstracts))]
+    memoria = None
+    n_distancias = 0
+    tamanos = None
+    try:
+        if pendientes:
+            distancias, tamanos = calcular_distancias_con_pca(abstracts, n_componentes=n_componentes)
+            if len(tamanos) < len(abstracts):
+                print("[INFO] La correlación cofenética se mide sobre las distancias entre centroides.")
+            n_distancias = len(distancias)
+            memoria = shared_memory.SharedMemory(create=True, size=max(distancias.nbytes, 1))
+            np.ndarray(distancias.shape, dtype=np.float64, buffer=memoria.buf)[:] = distancias
+            del distancias
 
-    coherencias = {}
+        workers = min(workers or os.cpu_count() or 1, len(metodos))
+        print(f"[INFO] Evaluando {len(metodos)} métodos de enlace en {workers} procesos...")
+        filas = {}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futuros = {executor.submit(evaluar_metodo, metodo, huella, tamanos,
+                                       memoria.name if memoria else None, n_distancias): metodo
+                       for metodo in metodos}
+            for futuro in as_completed(futuros):
+                fila = futuro.result()
+                filas[fila["metodo"]] = fila
+                print(f"[OK] {fila['metodo']}: cofenética {fila['cofenetica']:.3f} ({fila['duracion_s']:.1f} s)")
+    finally:
+        if memoria:
+            memoria.close()
+            memoria.unlink()
+    return [filas[m] for m in metodos]
 
-    for metodo in ["single", "complete", "average"]:
-        coph_corr = graficar_dendrograma(distancias, metodo, nombres)
-        coherencias[metodo] = coph_corr
 
-    plt.figure(figsize=(7, 4))
-    plt.bar(coherencias.keys(), coherencias.values())
+def guardar_comparacion(filas):
+    """Tabla de comparación (CSV) y gráfico de coherencia; devuelve el mejor método."""
+    mejor = max(filas, key=lambda f: f["cofenetica"])["metodo"]
+    output_path = os.path.join(OUTPUT_DIR, "comparacion_metodos.csv")
+    with open(output_path, "w", newline="", encoding="utf-8") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(["metodo", "correlacion_cofenetica", "altura_maxima", "segundos", "mejor"])
+        for fila in sorted(filas, key=lambda f: -f["cofenetica"]):
+            escritor.writerow([fila["metodo"], f"{fila['cofenetica']:.4f}", f"{fila['altura_max']:.4f}",
+                               fila["duracion_s"], fila["metodo"] == mejor])
+    print(f"[OK] Tabla de comparación guardada en: {output_path}")
+
+    print(f"\n{'Método':<10} {'Cofenética':>11} {'Altura máx.':>12} {'Tiempo (s)':>11}")
+    for fila in sorted(filas, key=lambda f: -f["cofenetica"]):
+        marca = "  <- mejor" if fila["metodo"] == mejor else ""
+        print(f"{fila['metodo']:<10} {fila['cofenetica']:>11.3f} {fila['altura_max']:>12.3f} "
+              f"{fila['duracion_s']:>11.1f}{marca}")
+
+    coherencias = {fila["metodo"]: fila["cofenetica"] for fila in filas}
+    plt.figure(figsize=(9, 4))
+    plt.bar(coherencias.keys(), coherencias.values(),
+            color=["tab:green" if m == mejor else "tab:blue" for m in coherencias])
     plt.title("Comparación de coherencia entre métodos de clustering")
     plt.xlabel("Método de enlace")
     plt.ylabel("Correlación cofenética")
@@ -122,12 +327,28 @@ def ejecutar_req4():
     plt.savefig(output_path, dpi=300)
     plt.close()
     print(f"[OK] Gráfico de coherencia guardado en: {output_path}\n")
+    return mejor
+
+
+def ejecutar_req4(n_componentes=N_COMPONENTES, workers=None):
+    print("[INFO] Ejecutando Requerimiento 4 (Clustering Jerárquico con reducción TF-IDF)...")
+
+    abstracts = leer_abstracts(RUTA_BIB)
+    if not abstracts:
+        print("[ERROR] No se encontraron abstracts válidos.")
+        return False
+
+    filas = evaluar_metodos(abstracts, METODOS, n_componentes, workers)
+    mejor = guardar_comparacion(filas)
 
     # Mostrar cuál fue el mejor método
-    mejor = max(coherencias, key=coherencias.get)
-    print(f"[RESULTADO] El método con mayor coherencia fue: {mejor.upper()} ({coherencias[mejor]:.3f})")
-    print("\n[INFO] Requerimiento 4 completado exitosamente") 
+    cofenetica = next(f["cofenetica"] for f in filas if f["metodo"] == mejor)
+    print(f"[RESULTADO] El método con mayor coherencia fue: {mejor.upper()} ({cofenetica:.3f})")
+    if mejor in METODOS_EUCLIDEOS:
+        print("   (su correlación se mide sobre la distancia euclídea entre vectores unitarios)")
+    print("\n[INFO] Requerimiento 4 completado exitosamente")
     print(f"[OK] Dendrogramas generados en: {OUTPUT_DIR}")
+    return True
 
 
 if __name__ == "__main__":
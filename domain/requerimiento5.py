@@ -2,36 +2,44 @@ import os
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-from wordcloud import WordCloud
-from pybtex.database import parse_file
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
 import requests
 import time
 from fpdf import FPDF
-import plotly.express as px
 from iso3166 import countries
+from corpus import cargar_corpus
+from cache_paises import CachePaises
+from utils import normalizar_doi
 
 #Configuración de rutas
 RUTA_BIB = os.path.join("data", "requerimiento1", "articulos_unificados.bib")
 OUTPUT_DIR = os.path.join("data", "requerimiento5")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# APIs externas (se pueden apuntar a un servidor local de pruebas)
+OPENALEX_URL = "https://api.openalex.org"
+ROR_URL = "https://ror.org"
+MAX_CONCURRENCIA = 8
+SOLICITUDES_POR_SEGUNDO = 10
+TAMANO_LOTE_OPENALEX = 50
+
 #Función aux
 def leer_bibtex(archivo):
     try:
-        bib_data = parse_file(archivo)
-        articulos = []
-        for entry in bib_data.entries.values():
-            campos = entry.fields
-            articulos.append({
+        articulos = (
+            {
                 "title": campos.get("title", "").strip(),
                 "year": campos.get("year", "").strip(),
                 "doi": campos.get("doi", "").strip(),
-                "author": " and ".join(str(p) for p in entry.persons.get("author", [])),
+                "author": campos.get("author", "").strip(),
                 "abstract": campos.get("abstract", "").strip(),
                 "booktitle": campos.get("booktitle", "").strip(),  
                 "journal": campos.get("journal", "").strip(),       
-            })
+            }
+            for campos in cargar_corpus(archivo)
+        )
         df = pd.DataFrame(articulos)
 
         # Fusión: preferir 'journal' si 'booktitle' está vacío
@@ -47,73 +55,227 @@ def leer_bibtex(archivo):
 
 
 
+#CLIENTE HTTP COMPARTIDO: POOL DE CONEXIONES, LÍMITE DE TASA Y REINTENTOS
+def crear_sesion_http(max_conexiones=MAX_CONCURRENCIA):
+    """Sesión HTTP compartida por todos los hilos, con un pool de conexiones reutilizables."""
+    sesion = requests.Session()
+    adaptador = requests.adapters.HTTPAdapter(pool_connections=max_conexiones, pool_maxsize=max_conexiones)
+    sesion.mount("https://", adaptador)
+    sesion.mount("http://", adaptador)
+    return sesion
+
+
+def crear_limitador(solicitudes_por_segundo=SOLICITUDES_POR_SEGUNDO):
+    """Devuelve una función que espera lo necesario para no superar la tasa indicada entre todos los hilos."""
+    intervalo = 1.0 / solicitudes_por_segundo if solicitudes_por_segundo else 0.0
+    candado = threading.Lock()
+    siguiente = [0.0]
+
+    def esperar():
+        with candado:
+            ahora = time.monotonic()
+            espera = siguiente[0] - ahora
+            siguiente[0] = max(ahora, siguiente[0]) + intervalo
+        if espera > 0:
+            time.sleep(espera)
+
+    return esperar
+
+
+def get_con_reintentos(sesion, url, timeout=20, limitador=None, reintentos=3, espera_base=1.0, **kwargs):
+    """GET con backoff exponencial ante errores de red, 429 y 5xx. Devuelve la última respuesta."""
+    respuesta = None
+    for intento in range(reintentos):
+        if limitador:
+            limitador()
+        try:
+            respuesta = sesion.get(url, timeout=timeout, **kwargs)
+            if respuesta.status_code != 429 and respuesta.status_code < 500:
+                return respuesta
+        except requests.exceptions.RequestException:
+            if intento == reintentos - 1:
+                raise
+        if intento < reintentos - 1:
+            time.sleep(espera_base * 2 ** intento)
+    return respuesta
+
+
 #FUNCIÓN PARA OBTENER PAÍS DEL PRIMER AUTOR (OpenAlex + ROR)
-def obtener_pais_por_doi(doi, cache):
+def codigo_iso3(country):
+    """Convierte un código de país ISO alpha-2 a alpha-3 (si no se reconoce, se deja igual)."""
+    try:
+        return countries.get(country.upper()).alpha3
+    except Exception:
+        return country.upper()
+
+
+def pais_desde_autorias(authorships, doi, cache, sesion=None, limitador=None, ror_url=ROR_URL):
+    """Extrae el país del primer autor de las autorías de OpenAlex (con ROR como respaldo)."""
+    if not authorships:
+        cache[doi] = None
+        return None
+
+    first_author = authorships[0]
+    institutions = first_author.get("institutions", [])
+
+    # Caso 1: OpenAlex ya trae el país
+    if institutions:
+        country = institutions[0].get("country_code")
+        if country:
+            pais = codigo_iso3(country)
+            cache[doi] = pais
+            return pais
+
+        ror_id = institutions[0].get("ror")
+        if ror_id:
+            ror_resp = get_con_reintentos(sesion or requests, f"{ror_url}/{ror_id.rstrip('/').rsplit('/', 1)[-1]}.json",
+                                          timeout=10, limitador=limitador)
+            if ror_resp.status_code == 200:
+                ror_data = ror_resp.json()
+                country = ror_data.get("country", {}).get("country_code")
+                if country:
+                    pais = codigo_iso3(country)
+                    cache[doi] = pais
+                    return pais
+            elif ror_resp.status_code != 404:
+                cache.marcar_error(doi)
+                return None
+    cache[doi] = None
+    return None
+
+
+def obtener_pais_por_doi(doi, cache, sesion=None, limitador=None,
+                         openalex_url=OPENALEX_URL, ror_url=ROR_URL):
     
     """Obtiene el país del primer autor usando OpenAlex y ROR."""
     if not doi:
         return None
-    
+
+    doi = doi.replace("https://doi.org/", "").strip()
     if doi in cache:
         return cache[doi]
 
+    sesion = sesion or requests
     try:
-        url = f"https://api.openalex.org/works/https://doi.org/{doi}"
-        doi = doi.replace("https://doi.org/", "").strip()
-        for intento in range(3):
-            try:
-                r = requests.get(url, timeout=20)
-                if r.status_code == 200:
-                    break
-            except requests.exceptions.RequestException:
-                if intento == 2:
-                    raise
-                time.sleep(3)
+        url = f"{openalex_url}/works/https://doi.org/{doi}"
+        r = get_con_reintentos(sesion, url, timeout=20, limitador=limitador)
+        if r.status_code == 404:
+            cache[doi] = None
+            return None
         if r.status_code != 200:
+            cache.marcar_error(doi)
             return None
 
         data = r.json()
-        authorships = data.get("authorships", [])
-        if not authorships:
-            return None
-
-        first_author = authorships[0]
-        institutions = first_author.get("institutions", [])
-
-        # Caso 1: OpenAlex ya trae el país
-        if institutions:
-            country = institutions[0].get("country_code")
-            if country:
-                try:
-                    country_iso3 = countries.get(country.upper()).alpha3
-                    cache[doi] = country_iso3
-                    return country_iso3
-                except Exception:
-                    cache[doi] = country.upper()
-                    return country.upper()
-           
-            ror_id = institutions[0].get("ror")
-            if ror_id:
-                ror_resp = requests.get(f"{ror_id}.json", timeout=10)
-                if ror_resp.status_code == 200:
-                    ror_data = ror_resp.json()
-                    country = ror_data.get("country", {}).get("country_code")
-                    if country:
-                        return country.upper()
-            cache[doi] = None
-            return None
-
-            
+        return pais_desde_autorias(data.get("authorships", []), doi, cache, sesion, limitador, ror_url)
 
     except Exception as e:
         print(f"[WARN] No se pudo obtener país para DOI {doi}: {e}")
-        cache[doi] = None
+        cache.marcar_error(doi)
         return None
 
 
+def obtener_paises_lote(dois, cache, sesion=None, limitador=None,
+                        openalex_url=OPENALEX_URL, ror_url=ROR_URL):
+    """
+    Resuelve varios DOIs con una sola consulta a OpenAlex (filter=doi:a|b|c) y
+    asocia cada obra devuelta a su DOI por la forma normalizada. Un lote de un
+    solo DOI, o una consulta fallida, se resuelve DOI por DOI.
+    Devuelve {doi: país} con los DOIs tal como se recibieron.
+    """
+    sesion = sesion or requests
+    if len(dois) == 1:
+        return {dois[0]: obtener_pais_por_doi(dois[0], cache, sesion, limitador, openalex_url, ror_url)}
+
+    limpios = {doi: doi.replace("https://doi.org/", "").strip() for doi in dois}
+    resultados = {doi: cache[limpio] for doi, limpio in limpios.items() if limpio in cache}
+    pendientes = {doi: limpio for doi, limpio in limpios.items() if doi not in resultados}
+    if not pendientes:
+        return resultados
+
+    params = {
+        "filter": "doi:" + "|".join(normalizar_doi(limpio) for limpio in pendientes.values()),
+        "select": "doi,authorships",
+        "per-page": len(pendientes),
+    }
+    try:
+        r = get_con_reintentos(sesion, f"{openalex_url}/works", timeout=30, limitador=limitador, params=params)
+        if r.status_code != 200:
+            raise requests.exceptions.HTTPError(f"HTTP {r.status_code}")
+        autorias = {normalizar_doi(obra.get("doi")): obra.get("authorships", [])
+                    for obra in r.json().get("results", [])}
+    except Exception as e:
+        print(f"[WARN] Falló la consulta por lotes ({len(pendientes)} DOIs), se consultan uno a uno: {e}")
+        for doi in pendientes:
+            resultados[doi] = obtener_pais_por_doi(doi, cache, sesion, limitador, openalex_url, ror_url)
+        return resultados
+
+    for doi, limpio in pendientes.items():
+        try:
+            # Los DOIs que OpenAlex no conoce quedan sin país (igual que un 404 en la consulta individual)
+            resultados[doi] = pais_desde_autorias(autorias.get(normalizar_doi(limpio)), limpio, cache,
+                                                  sesion, limitador, ror_url)
+        except Exception as e:
+            print(f"[WARN] No se pudo obtener país para DOI {limpio}: {e}")
+            cache.marcar_error(limpio)
+            resultados[doi] = None
+    return resultados
+
+
+def resolver_paises(dois, cache, max_concurrencia=MAX_CONCURRENCIA,
+                    solicitudes_por_segundo=SOLICITUDES_POR_SEGUNDO,
+                    tamano_lote=TAMANO_LOTE_OPENALEX,
+                    openalex_url=OPENALEX_URL, ror_url=ROR_URL):
+    """
+    Resuelve en paralelo el país de una lista de DOIs con un pool de hilos,
+    una sesión HTTP compartida y un límite global de solicitudes por segundo.
+    Los DOIs se agrupan en lotes de `tamano_lote` por consulta a OpenAlex.
+    Devuelve un diccionario {doi: país}.
+    """
+    unicos = list(dict.fromkeys(d for d in dois if isinstance(d, str) and d.strip()))
+    total = len(unicos)
+    resultados = {}
+    if not total:
+        return resultados
+
+    # '|' y ',' son separadores en el filtro de OpenAlex: esos DOIs van en lotes de uno (consulta individual)
+    agrupables = [d for d in unicos if "|" not in d and "," not in d]
+    tamano_lote = max(1, tamano_lote)
+    lotes = [agrupables[k:k + tamano_lote] for k in range(0, len(agrupables), tamano_lote)]
+    lotes += [[d] for d in unicos if "|" in d or "," in d]
+
+    sesion = crear_sesion_http(max_concurrencia)
+    limitador = crear_limitador(solicitudes_por_segundo)
+    paso_progreso = max(1, total // 10)
+    siguiente_aviso = paso_progreso
+    completados = 0
+    inicio = time.perf_counter()
+    print(f"[INFO] {total} DOIs en {len(lotes)} consultas a OpenAlex (lotes de hasta {tamano_lote})")
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_concurrencia) as executor:
+            futuros = [
+                executor.submit(obtener_paises_lote, lote, cache, sesion, limitador, openalex_url, ror_url)
+                for lote in lotes
+            ]
+            for futuro in as_completed(futuros):
+                paises_lote = futuro.result()
+                resultados.update(paises_lote)
+                completados += len(paises_lote)
+                if completados >= siguiente_aviso or completados == total:
+                    siguiente_aviso = completados + paso_progreso
+                    print(f"  - DOIs consultados: {completados}/{total} ({time.perf_counter() - inicio:.1f} s)")
+    finally:
+        sesion.close()
+
+    return resultados
+
+
 #FUNCIÓN PARA GENERAR EL MAPA DE CALOR
 def generar_mapa_calor(df):
     """Genera un mapa mundial de calor con Plotly."""
+    import plotly.express as px
+
     df_validos = df.dropna(subset=["pais"])
     if df_validos.empty:
         print("[WARN] No hay países válidos para graficar el mapa.")
@@ -160,6 +322,8 @@ def generar_mapa_calor(df):
 
 #FUNCIÓN PARA GENERAR LA NUBE DE PALABRAS A PARTIR DE LOS ABSTRACTS
 def generar_nube_palabras(df):
+    from wordcloud import WordCloud
+
     texto_abstracts = " ".join(df["abstract"].dropna().tolist())
     texto_keywords = " ".join(df["keywords"].dropna().tolist()) if "keywords" in df.columns else ""
     texto_total = (texto_abstracts + " " + texto_keywords).strip()
@@ -315,7 +479,7 @@ def ejecutar_req5():
     df = leer_bibtex(RUTA_BIB)
     if df.empty:
         print("[ERROR] No se encontraron artículos.")
-        return
+        return False
     
     if "fuente" in df.columns:
         top_fuentes = df["fuente"].value_counts().nlargest(15).index
@@ -326,20 +490,15 @@ def ejecutar_req5():
         df["booktitle"] = df["booktitle"].apply(lambda x: x if x in top_books else "Otros")
 
     
-    ruta_cache = os.path.join(OUTPUT_DIR, "cache_paises.csv")
-    cache = {}
-
-    if os.path.exists(ruta_cache):
-        cache_df = pd.read_csv(ruta_cache)
-        cache = dict(zip(cache_df["doi"], cache_df["pais"]))
-
-    print("[INFO] Consultando países por DOI...")
-    df["pais"] = df["doi"].apply(lambda d: obtener_pais_por_doi(d, cache))
-    time.sleep(1)
-
-    cache_df = pd.DataFrame(list(cache.items()), columns=["doi", "pais"])
-    cache_df.to_csv(ruta_cache, index=False)
-    print(f"[OK] Cache de países guardado en {ruta_cache}")
+    cache = CachePaises()
+    try:
+        cache.migrar_csv()
+        print("[INFO] Consultando países por DOI...")
+        paises = resolver_paises(df["doi"].tolist(), cache)
+        df["pais"] = df["doi"].map(paises)
+        cache.informe()
+    finally:
+        cache.cerrar()
 
     print("\n[INFO] Generando visualizaciones...")
     mapa = generar_mapa_calor(df)
@@ -351,6 +510,7 @@ def ejecutar_req5():
 
     print("\nRequerimiento 5 completado exitosamente.")
     print(f"[OK] Resultados en: {OUTPUT_DIR}")
+    return True
 
 
 if __name__ == "__main__":
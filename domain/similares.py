@@ -0,0 +1,265 @@
+# domain/similares.py
+import os
+import json
+import time
+import importlib.util
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.decomposition import TruncatedSVD
+from sklearn.cluster import MiniBatchKMeans
+from corpus import cargar_corpus, huella_archivo, hash_archivo
+from embeddings import obtener_embeddings, obtener_modelo, MODELO_SBERT
+
+#Configuración
+RUTA_BIB = os.path.join("data", "requerimiento1", "articulos_unificados.bib")
+DIR_INDICE = os.path.join("data", "similares")
+
+# "sbert" si sentence-transformers está instalado; si no, TF-IDF reducido con SVD
+VECTORES = "auto"
+N_COMPONENTES_TFIDF = 128
+# Listas del IVF (por defecto ~sqrt(n)) y cuántas se revisan por consulta
+N_SONDEOS = 8
+TOP_K = 10
+# Versión del formato en disco; si cambia, el índice se reconstruye
+FORMATO_INDICE = 1
+
+
+#Textos y vectores
+def texto_articulo(entrada):
+    """Título y abstract: los artículos sin abstract también se pueden buscar por título."""
+    return f"{entrada.get('title', '').strip()}. {entrada.get('abstract', '').strip()}".strip(". ")
+
+
+def resolver_vectores(vectores=VECTORES):
+    if vectores != "auto":
+        return vectores
+    if importlib.util.find_spec("sentence_transformers"):
+        return "sbert"
+    print("[WARN] sentence-transformers no está instalado, el índice usará TF-IDF.")
+    return "tfidf"
+
+
+def _vectorizar_tfidf(textos, n_componentes=N_COMPONENTES_TFIDF):
+    """TF-IDF + TruncatedSVD. Devuelve los vectores y lo necesario para proyectar consultas."""
+    vectorizer = TfidfVectorizer(stop_words="english", max_features=20000, dtype=np.float32)
+    tfidf = vectorizer.fit_transform(textos)
+    n_componentes = max(1, min(n_componentes, tfidf.shape[1] - 1, len(textos) - 1))
+    svd = TruncatedSVD(n_components=n_componentes, algorithm="randomized", random_state=42)
+    vectores = svd.fit_transform(tfidf)
+    modelo = {
+        "vocabulario": {t: int(i) for t, i in vectorizer.vocabulary_.items()},
+        "idf": vectorizer.idf_.astype(np.float32),
+        "componentes": svd.components_.astype(np.float32),
+    }
+    return vectores, modelo
+
+
+def _normalizar(vectores):
+    vectores = np.asarray(vectores, dtype=np.float32)
+    normas = np.linalg.norm(vectores, axis=1, keepdims=True)
+    return vectores / np.where(normas == 0, 1, normas)
+
+
+#Índice IVF
+class IndiceIVF:
+    """
+    Índice de listas invertidas sobre vectores unitarios (similitud = producto punto).
+    Los vectores se guardan ordenados por lista, así cada lista es un bloque contiguo.
+    """
+
+    def __init__(self, centroides, vectores, inicios, filas, meta, modelo_tfidf=None):
+        self.centroides = centroides
+        self.vectores = vectores
+        self.inicios = inicios
+        self.filas = filas
+        self.meta = meta
+        self.modelo_tfidf = modelo_tfidf
+        # Artículo (posición en el corpus) -> fila en self.vectores
+        self.posicion = {int(f): i for i, f in enumerate(filas)}
+
+    @classmethod
+    def construir(cls, vectores, filas, n_listas=None, meta=None, modelo_tfidf=None):
+        vectores = _normalizar(vectores)
+        n_listas = min(n_listas or int(np.sqrt(len(vectores))) or 1, len(vectores))
+        kmeans = MiniBatchKMeans(n_clusters=n_listas, batch_size=4096, n_init=3, random_state=42)
+        etiquetas = kmeans.fit_predict(vectores)
+
+        orden = np.argsort(etiquetas, kind="stable")
+        inicios = np.zeros(n_listas + 1, dtype=np.int64)
+        np.cumsum(np.bincount(etiquetas, minlength=n_listas), out=inicios[1:])
+        meta = {**(meta or {}), "n_listas": n_listas, "n_vectores": len(vectores), "dim": vectores.shape[1]}
+        return cls(_normalizar(kmeans.cluster_centers_), vectores[orden], inicios,
+                   np.asarray(filas, dtype=np.int64)[orden], meta, modelo_tfidf)
+
+    def buscar(self, consulta, k=TOP_K, n_sondeos=N_SONDEOS, excluir=None):
+        """
+        Los k vectores más parecidos a la consulta entre las n_sondeos listas cuyos
+        centroides están más cerca. Devuelve [(fila del corpus, similitud coseno)].
+        """
+        consulta = _normalizar(np.atleast_2d(consulta))[0]
+        n_sondeos = min(n_sondeos, len(self.centroides))
+        listas = np.argpartition(-(self.centroides @ consulta), n_sondeos - 1)[:n_sondeos]
+        candidatos = np.concatenate([np.arange(self.inicios[l], self.inicios[l + 1]) for l in listas])
+        if excluir is not None:
+            candidatos = candidatos[self.filas[candidatos] != excluir]
+        if not len(candidatos):
+            return []
+
+        similitudes = np.asarray(self.vectores[candidatos]) @ consulta
+        k = min(k, len(candidatos))
+        mejores = np.argpartition(-similitudes, k - 1)[:k]
+        mejores = mejores[np.argsort(-similitudes[mejores])]
+        return [(int(self.filas[candidatos[i]]), float(similitudes[i])) for i in mejores]
+
+    def vector_articulo(self, fila):
+        return self.vectores[self.posicion[fila]]
+
+    def vector_texto(self, texto):
+        """Proyecta un texto libre al mismo espacio que los artículos del índice."""
+        if self.meta["vectores"] == "sbert":
+            return obtener_modelo(self.meta["modelo"]).encode([texto], convert_to_numpy=True)
+        vectorizer = TfidfVectorizer(stop_words="english", vocabulary=self.modelo_tfidf["vocabulario"],
+                                     dtype=np.float32)
+        vectorizer.idf_ = self.modelo_tfidf["idf"]
+        return vectorizer.transform([texto]) @ self.modelo_tfidf["componentes"].T
+
+    #Persistencia
+    def guardar(self, carpeta):
+        os.makedirs(carpeta, exist_ok=True)
+        ruta_meta = os.path.join(carpeta, "meta.json")
+        if os.path.exists(ruta_meta):
+            os.remove(ruta_meta)
+        arrays = {"centroides": self.centroides, "vectores": self.vectores,
+                  "inicios": self.inicios, "filas": self.filas}
+        if self.modelo_tfidf:
+            arrays.update(idf=self.modelo_tfidf["idf"], componentes=self.modelo_tfidf["componentes"])
+        for nombre, valores in arrays.items():
+            ruta = os.path.join(carpeta, f"{nombre}.npy")
+            with open(ruta + ".tmp", "wb") as f:
+                np.save(f, valores)
+            os.replace(ruta + ".tmp", ruta)
+
+        # meta.json se escribe al final: sin él el índice no se considera completo
+        meta = dict(self.meta)
+        if self.modelo_tfidf:
+            meta["vocabulario"] = self.modelo_tfidf["vocabulario"]
+        with open(ruta_meta + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(ruta_meta + ".tmp", ruta_meta)
+
+    @classmethod
+    def cargar(cls, carpeta):
+        """Carga el índice (los vectores por mmap). Devuelve None si no existe o está incompleto."""
+        try:
+            with open(os.path.join(carpeta, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+
+            def cargar(nombre, **kwargs):
+                return np.load(os.path.join(carpeta, f"{nombre}.npy"), **kwargs)
+
+            modelo_tfidf = None
+            if "vocabulario" in meta:
+                modelo_tfidf = {"vocabulario": meta.pop("vocabulario"), "idf": cargar("idf"),
+                                "componentes": cargar("componentes")}
+            return cls(cargar("centroides"), cargar("vectores", mmap_mode="r"), cargar("inicios"),
+                       cargar("filas"), meta, modelo_tfidf)
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+#Construcción y carga
+def carpeta_indice(vectores):
+    return os.path.join(DIR_INDICE, vectores)
+
+
+def _indice_vigente(indice, ruta_bib, n_listas):
+    """Vigente si es del mismo formato, parámetros y contenido del .bib (como corpus_vigente)."""
+    meta = indice.meta
+    if meta.get("formato") != FORMATO_INDICE or (n_listas and meta.get("n_listas") != n_listas):
+        return False
+    info = os.stat(ruta_bib)
+    if meta.get("mtime") == info.st_mtime and meta.get("tamano") == info.st_size:
+        return True
+    return meta.get("sha256") == hash_archivo(ruta_bib)
+
+
+def construir_indice(ruta_bib=RUTA_BIB, vectores=VECTORES, n_listas=None, forzar=False):
+    """
+    Devuelve el índice de los artículos del .bib unificado. Lo reutiliza desde disco
+    si sigue vigente; si no, vectoriza los artículos (SBERT o TF-IDF), lo construye y lo guarda.
+    """
+    if not os.path.exists(ruta_bib):
+        print(f"[ERROR] No se encuentra el archivo: {ruta_bib}")
+        print("   Por favor, ejecute el Requerimiento 1 primero.")
+        return None
+    vectores = resolver_vectores(vectores)
+    carpeta = carpeta_indice(vectores)
+
+    if not forzar:
+        indice = IndiceIVF.cargar(carpeta)
+        if indice and _indice_vigente(indice, ruta_bib, n_listas):
+            return indice
+
+    inicio = time.perf_counter()
+    entradas = cargar_corpus(ruta_bib)
+    filas, textos = [], []
+    for i, entrada in enumerate(entradas):
+        texto = texto_articulo(entrada)
+        if texto:
+            filas.append(i)
+            textos.append(texto)
+    if len(textos) < 2:
+        print("[ERROR] No hay suficientes artículos con título o abstract para indexar.")
+        return None
+
+    print(f"[INFO] Construyendo índice de similares ({vectores}) con {len(textos)} artículos...")
+    meta = {"formato": FORMATO_INDICE, "vectores": vectores, **huella_archivo(ruta_bib)}
+    modelo_tfidf = None
+    if vectores == "sbert":
+        matriz = obtener_embeddings(textos)
+        meta["modelo"] = MODELO_SBERT
+    else:
+        matriz, modelo_tfidf = _vectorizar_tfidf(textos)
+
+    indice = IndiceIVF.construir(matriz, filas, n_listas, meta, modelo_tfidf)
+    indice.guardar(carpeta)
+    print(f"[OK] Índice guardado en {carpeta} ({indice.meta['n_listas']} listas, "
+          f"{time.perf_counter() - inicio:.1f} s)")
+    return indice
+
+
+#Consultas
+def buscar_similares(id_articulo=None, texto=None, k=TOP_K, n_sondeos=N_SONDEOS, vectores=VECTORES,
+                     reconstruir=False):
+    """
+    Top-k artículos más parecidos a un artículo del corpus (id_articulo, base 1 como en
+    Req. 2) o a un texto libre. Devuelve una lista de dicts con articulo, similitud,
+    titulo y año, o None si no se pudo consultar.
+    """
+    indice = construir_indice(vectores=vectores, forzar=reconstruir)
+    if indice is None:
+        return None
+    entradas = cargar_corpus(RUTA_BIB)
+
+    inicio = time.perf_counter()
+    if id_articulo is not None:
+        fila = id_articulo - 1
+        if fila not in indice.posicion:
+            print(f"[ERROR] El artículo {id_articulo} no existe o no tiene título ni abstract.")
+            return None
+        print(f"[INFO] Similares a [{id_articulo}] {entradas[fila].get('title', 'Sin Título')}")
+        consulta, excluir = indice.vector_articulo(fila), fila
+    else:
+        consulta, excluir = indice.vector_texto(texto), None
+    resultados = indice.buscar(consulta, k, n_sondeos, excluir)
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+
+    similares = [{"articulo": f + 1, "similitud": round(s, 4),
+                  "titulo": entradas[f].get("title", "Sin Título"), "year": entradas[f].get("year", "")}
+                 for f, s in resultados]
+    print(f"\n{'#':>3} {'Artículo':>9} {'Similitud':>10}  Título")
+    for posicion, s in enumerate(similares, 1):
+        print(f"{posicion:>3} {s['articulo']:>9} {s['similitud']:>10.3f}  {s['titulo']} ({s['year'] or 'Sin Año'})")
+    print(f"[OK] {len(similares)} resultados en {duracion_ms:.1f} ms "
+          f"({indice.meta['vectores']}, {min(n_sondeos, indice.meta['n_listas'])} de {indice.meta['n_listas']} listas)")
+    return similares
@@ -1,51 +1,180 @@
 # domain/utils.py
 import os
+import re
+import zlib
+from collections import defaultdict
+from functools import lru_cache
 import bibtexparser
 from bibtexparser.bparser import BibTexParser
-from bibtexparser.customization import homogenize_latex_encoding
-import seaborn as sns
+from bibtexparser.customization import protect_uppercase
+from bibtexparser.latexenc import latex_to_unicode, unicode_to_latex_map
 from bibtexparser.bwriter import BibTexWriter
 from fuzzywuzzy import fuzz
-from scipy.cluster.hierarchy import dendrogram, linkage
-from scipy.spatial.distance import squareform
-import matplotlib.pyplot as plt
 import numpy as np
 
-def leer_bibtex(file_path):
+_RE_DELIMITADORES = re.compile(r'(?<!\\)[{}@]')
+
+
+#Normalización de LaTeX (equivalente a homogenize_latex_encoding, pero perezosa)
+# Misma tabla que string_to_latex, que no convierte espacios ni llaves
+_TABLA_LATEX = str.maketrans({c: latex for c, latex in unicode_to_latex_map.items()
+                              if len(c) == 1 and c not in ' {}'})
+
+
+@lru_cache(maxsize=16384)
+def normalizar_latex(valor, campo=None):
     """
-    Lee un archivo .bib y devuelve una lista de diccionarios con los datos de los artículos.
-    --- VERSIÓN CON PRE-LIMPIEZA PARA SAGE ---
+    Normaliza un valor como homogenize_latex_encoding: LaTeX -> unicode -> LaTeX
+    homogéneo. El ID solo pasa a unicode y el título además protege las mayúsculas.
+    Los valores se repiten mucho (revistas, años, palabras clave), por eso se memoiza.
+    """
+    texto = latex_to_unicode(valor)
+    if campo == 'ID':
+        return texto
+    texto = texto.translate(_TABLA_LATEX)
+    return protect_uppercase(texto) if campo == 'title' else texto
+
+
+class EntradaBib(dict):
+    """
+    Entrada de bibtexparser que guarda los valores tal como vienen en el .bib y normaliza
+    el LaTeX de un campo solo cuando se lee con e[campo] o e.get(campo). Se usa como
+    customization del parser: así solo se paga la conversión de los campos que se usan.
+    items() y values() devuelven los valores crudos (ver crudo()).
+    """
+
+    def __getitem__(self, campo):
+        valor = dict.__getitem__(self, campo)
+        if isinstance(valor, list):
+            return [normalizar_latex(v, campo) for v in valor]
+        return normalizar_latex(valor, campo)
+
+    def get(self, campo, defecto=None):
+        return self[campo] if campo in self else defecto
+
+    def crudo(self):
+        """Copia como dict con los valores sin normalizar (para guardarla o enviarla a otro proceso)."""
+        return {campo: dict.__getitem__(self, campo) for campo in self}
+
+
+def crear_parser_bibtex(customization=EntradaBib):
+    """Crea el parser de bibtexparser con la configuración usada en todo el proyecto."""
+    parser = BibTexParser()
+    parser.ignore_errors = True
+    parser.allow_duplicate_fields = True
+    parser.common_strings = True
+    parser.customization = customization
+    parser.expect_multiple_parse = True
+    return parser
+
+
+def fragmentos_bibtex(lineas):
+    """
+    Agrupa las líneas de un .bib en fragmentos de una entrada cada uno.
+    Corta en cada '@' que aparece fuera de llaves (IEEE pega '}@INPROCEEDINGS{'
+    en la misma línea) y descarta las líneas 'doi:...' sueltas que exporta SAGE.
+    """
+    actual = []
+    profundidad = 0
+    for linea in lineas:
+        linea_stripped = linea.strip()
+        if linea_stripped.startswith("doi:") and "=" not in linea:
+            continue
+        corte = 0
+        for m in _RE_DELIMITADORES.finditer(linea):
+            caracter = m.group()
+            if caracter == '{':
+                profundidad += 1
+            elif caracter == '}':
+                profundidad = max(profundidad - 1, 0)
+            elif profundidad == 0:
+                actual.append(linea[corte:m.start()])
+                fragmento = ''.join(actual)
+                if fragmento.strip():
+                    yield fragmento
+                actual = []
+                corte = m.start()
+        actual.append(linea[corte:])
+
+    fragmento = ''.join(actual)
+    if fragmento.strip():
+        yield fragmento
+
+
+def _entradas_fragmento(parser, fragmento):
+    """
+    Parsea un fragmento y vacía la base del parser (que acumula entre llamadas),
+    también si el parseo falla, para que el siguiente fragmento empiece limpio.
     """
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-
-        cleaned_content = ""
-        for line in lines:
-            line_stripped = line.strip()
-            if line_stripped.startswith("doi:") and "=" not in line:
-                continue  
-            cleaned_content += line
-
-        parser = BibTexParser()
-        parser.ignore_errors = True
-        parser.allow_duplicate_fields = True
-        parser.common_strings = True
-        parser.customization = homogenize_latex_encoding
-        
-        bib_database = bibtexparser.loads(cleaned_content, parser=parser)
-        
-        if not bib_database.entries:
-            print(f"Advertencia: 'leer_bibtex' no encontró entradas en {file_path} (después de limpiar).")
-            
-        return bib_database.entries
-            
+        return list(parser.parse(fragmento, partial=True).entries)
+    finally:
+        parser.bib_database.entries.clear()
+        parser.bib_database.comments.clear()
+
+
+def _avisar_fragmentos_fallidos(origen, fallidos, error):
+    if fallidos:
+        print(f"Advertencia: se omitieron {fallidos} entradas que no se pudieron parsear en {origen} "
+              f"(la primera: {error})")
+
+
+def parsear_fragmentos(fragmentos, customization=EntradaBib, origen="el lote"):
+    """
+    Parsea una lista de fragmentos de fragmentos_bibtex (p. ej. en un proceso del pool).
+    Un fragmento que no se puede parsear se omite y se cuenta, sin perder el resto.
+    """
+    parser = crear_parser_bibtex(customization)
+    entradas = []
+    fallidos, primer_error = 0, None
+    for fragmento in fragmentos:
+        try:
+            entradas.extend(_entradas_fragmento(parser, fragmento))
+        except Exception as e:
+            fallidos += 1
+            primer_error = primer_error or e
+    _avisar_fragmentos_fallidos(origen, fallidos, primer_error)
+    return entradas
+
+
+def iterar_bibtex(file_path, customization=EntradaBib):
+    """
+    Genera las entradas de un archivo .bib una a una.
+    La memoria usada está acotada por el tamaño de una sola entrada. Un fragmento que
+    no se puede parsear se omite y se cuenta (se avisa al final) sin cortar el archivo.
+    """
+    parser = crear_parser_bibtex(customization)
+    encontradas = 0
+    fallidos, primer_error = 0, None
+    try:
+        file = open(file_path, 'r', encoding='utf-8')
     except FileNotFoundError:
         print(f"Advertencia: No se encontró el archivo {file_path}")
-        return []
-    except Exception as e:
-        print(f"Error crítico leyendo el archivo {file_path}: {e}")
-        return []
+        return
+
+    with file:
+        for fragmento in fragmentos_bibtex(file):
+            try:
+                entradas = _entradas_fragmento(parser, fragmento)
+            except Exception as e:
+                fallidos += 1
+                primer_error = primer_error or e
+                continue
+            for entrada in entradas:
+                encontradas += 1
+                yield entrada
+
+    _avisar_fragmentos_fallidos(file_path, fallidos, primer_error)
+    if not encontradas:
+        print(f"Advertencia: 'leer_bibtex' no encontró entradas en {file_path} (después de limpiar).")
+
+
+def leer_bibtex(file_path):
+    """
+    Lee un archivo .bib y devuelve una lista de diccionarios con los datos de los artículos.
+    --- VERSIÓN CON PRE-LIMPIEZA PARA SAGE ---
+    """
+    return list(iterar_bibtex(file_path))
 
 def normalize_data(entries):
     """Normaliza los datos de los artículos a un formato estándar."""
@@ -60,6 +189,7 @@ def normalize_data(entries):
             'author': e.get('author', 'No Author').strip().lower(),
             'year': e.get('year', '').strip(),
             'abstract': e.get('abstract', '').strip().lower(),
+            'doi': normalizar_doi(e.get('doi', '')),
             'raw_data': e
         })
     return normalized_articles
@@ -75,8 +205,96 @@ def save_bibtex(filename, articles):
     with open(filename, 'w', encoding='utf-8') as file:
         file.write(writer.write(db))
 
+def normalizar_doi(doi):
+    """Normaliza un DOI (minúsculas, sin prefijo de resolvedor ni 'doi:')."""
+    if not doi:
+        return ''
+    doi = str(doi).strip().lower()
+    doi = re.sub(r'^(https?://)?(dx\.)?doi\.org/', '', doi)
+    doi = re.sub(r'^doi:\s*', '', doi)
+    return doi.strip()
+
+
+# Parámetros del bloqueo MinHash LSH: 16 bandas de 4 filas hacen candidatos,
+# con probabilidad > 98 %, a los pares con Jaccard de trigramas >= 0.7.
+NUM_PERMUTACIONES = 64
+BANDAS_LSH = 16
+TAMANO_NGRAMA = 3
+
+_rng_minhash = np.random.RandomState(2024)
+_COEF_A = _rng_minhash.randint(1, 2**62, size=NUM_PERMUTACIONES, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+_COEF_B = _rng_minhash.randint(0, 2**62, size=NUM_PERMUTACIONES, dtype=np.int64).astype(np.uint64)
+
+
+def ngramas_titulo(titulo, k=TAMANO_NGRAMA):
+    """Devuelve el conjunto de n-gramas de caracteres del título normalizado."""
+    texto = re.sub(r'\s+', ' ', titulo).strip()
+    if len(texto) <= k:
+        return {texto}
+    return {texto[i:i + k] for i in range(len(texto) - k + 1)}
+
+
+def firma_minhash(ngramas):
+    """Calcula la firma MinHash (multiply-shift sobre CRC32) de un conjunto de n-gramas."""
+    hashes = np.fromiter((zlib.crc32(g.encode('utf-8')) for g in ngramas),
+                         dtype=np.uint64, count=len(ngramas))
+    productos = _COEF_A[:, None] * hashes[None, :] + _COEF_B[:, None]
+    return (productos >> np.uint64(32)).min(axis=1)
+
+
+def claves_bloqueo(article):
+    """Claves de bloqueo de un artículo: DOI normalizado y cubetas LSH del título."""
+    claves = []
+    doi = article.get('doi') or normalizar_doi(article.get('raw_data', {}).get('doi', ''))
+    if doi:
+        claves.append(('doi', doi))
+    firma = firma_minhash(ngramas_titulo(article['title']))
+    filas = NUM_PERMUTACIONES // BANDAS_LSH
+    for banda in range(BANDAS_LSH):
+        claves.append((banda, firma[banda * filas:(banda + 1) * filas].tobytes()))
+    return claves
+
+
 def buscar_duplicados(articles):
-    """Identifica artículos duplicados por título usando fuzzy matching."""
+    """
+    Identifica artículos duplicados por título usando fuzzy matching.
+    Solo compara contra los títulos que comparten alguna clave de bloqueo
+    (DOI o cubeta MinHash LSH), en lugar de contra todos los títulos vistos.
+    """
+    unicos = []
+    duplicados = []
+    vistos = {}
+    cubetas = defaultdict(list)
+
+    for article in articles:
+        titulo_actual = article['title']
+        if titulo_actual == 'no title':
+            continue
+        claves = claves_bloqueo(article)
+        es_duplicado = bool(titulo_actual) and titulo_actual in vistos
+        comparados = set()
+        for clave in claves:
+            if es_duplicado:
+                break
+            for titulo_visto in cubetas.get(clave, ()):
+                if titulo_visto in comparados:
+                    continue
+                comparados.add(titulo_visto)
+                if fuzz.ratio(titulo_actual, titulo_visto) > 90:
+                    es_duplicado = True
+                    break
+        if es_duplicado:
+            duplicados.append(article)
+        else:
+            vistos[titulo_actual] = article
+            unicos.append(article)
+            for clave in claves:
+                cubetas[clave].append(titulo_actual)
+    return unicos, duplicados
+
+
+def buscar_duplicados_exhaustivo(articles):
+    """Versión O(n²) original: compara cada título contra todos los vistos. Se conserva como referencia."""
     unicos = []
     duplicados = []
     vistos = {}
@@ -99,6 +317,7 @@ def buscar_duplicados(articles):
 
 def graficar_tiempos(mediciones, num_articles):
     """Genera gráfico de comparación de tiempos"""
+    import matplotlib.pyplot as plt
     metodos = list(mediciones.keys())
     tiempos = list(mediciones.values())
     plt.figure(figsize=(12, 6))
@@ -117,32 +336,9 @@ def graficar_tiempos(mediciones, num_articles):
 
 def extraer_abstracts_bibtex(ruta):
     """Extrae abstracts y etiquetas de un archivo .bib, versión robusta."""
-    try:
-        with open(ruta, 'r', encoding='utf-8') as bibtex_file:
-            lines = bibtex_file.readlines()
-        
-        cleaned_content = ""
-        for line in lines:
-            line_stripped = line.strip()
-            if line_stripped.startswith("doi:") and "=" not in line:
-                continue
-            cleaned_content += line
-
-        parser = BibTexParser()
-        parser.ignore_errors = True
-        parser.allow_duplicate_fields = True
-        parser.common_strings = True
-        parser.customization = homogenize_latex_encoding
-        
-        bib_database = bibtexparser.loads(cleaned_content, parser=parser)
-    
-    except Exception as e:
-        print(f"Error crítico leyendo {ruta} en extraer_abstracts: {e}")
-        return [], []
-
     abstracts = []
     etiquetas = []
-    for entry in bib_database.entries:
+    for entry in iterar_bibtex(ruta):
         if not isinstance(entry, dict):
             continue
         if 'abstract' in entry:
@@ -155,6 +351,9 @@ def extraer_abstracts_bibtex(ruta):
     return abstracts, etiquetas
 
 def graficar_dendrograma_rq5(dist_matrix, labels, metodo='ward', titulo='Dendrograma'):
+    import matplotlib.pyplot as plt
+    from scipy.cluster.hierarchy import dendrogram, linkage
+    from scipy.spatial.distance import squareform
     condensed = squareform(dist_matrix, checks=False)
     linkage_matrix = linkage(condensed, method=metodo)
     plt.figure(figsize=(12, 6))
@@ -164,6 +363,7 @@ def graficar_dendrograma_rq5(dist_matrix, labels, metodo='ward', titulo='Dendrog
     plt.show()
 
 def graficar_similitud(dist_matrix, etiquetas, titulo="Similitud de Abstracts - SBERT"):
+    import matplotlib.pyplot as plt
     n = len(dist_matrix)
     nombres = etiquetas
     plt.figure(figsize=(12, 6))
@@ -174,6 +374,8 @@ def graficar_similitud(dist_matrix, etiquetas, titulo="Similitud de Abstracts -
     plt.show()
 
 def graficar_heatmap_similitud(dist_matrix):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
     max_dist = np.max(dist_matrix)
     simil_matrix = 100 * (1 - dist_matrix / max_dist)
     etiquetas = [f"A{i+1}" for i in range(len(dist_matrix))]
@@ -1,28 +1,241 @@
 # main.py
 import sys
 import os
+import time
+import argparse
+import threading
+import importlib
+import subprocess
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(os.path.join(script_dir, 'domain'))
 sys.path.append(os.path.join(script_dir, 'scrapers'))
 
-try:
-    from requerimiento1 import ejecutar_req1
-    from requerimiento2 import ejecutar_req2
-    from requerimiento2_visual import ejecutar_req2_viz
-    from requerimiento3 import ejecutar_req3
-    from requerimiento4 import ejecutar_req4
-    from requerimiento5 import ejecutar_req5
+# Módulos del proyecto. Se importan solo cuando una opción los necesita, porque
+# algunos arrastran torch, gensim, plotly o selenium.
+MODULOS_PROYECTO = [
+    "requerimiento1",
+    "requerimiento2",
+    "requerimiento2_visual",
+    "requerimiento3",
+    "requerimiento4",
+    "requerimiento5",
+    "scraper_sciencedirect",
+    "scraper_ieee",
+    "scraper_sage",
+    "orquestador",
+    "ingesta",
+    "similares",
+]
 
-    
-    from scraper_sciencedirect import science_test_debug
-    from scraper_ieee import scrape_IEE
-    from scraper_sage import scrape_sage
 
-except ImportError as e:
-    print(f"Error fatal: No se pudo importar un módulo. Asegúrate de que los archivos están en las carpetas correctas.")
-    print(f"   Detalle: {e}")
-    sys.exit(1)
+def cargar_funcion(modulo, funcion):
+    """Importa un módulo del proyecto en el primer uso y devuelve la función pedida."""
+    try:
+        return getattr(importlib.import_module(modulo), funcion)
+    except ImportError as e:
+        print(f"Error: No se pudo importar el módulo '{modulo}'. Asegúrate de que los archivos están en las carpetas correctas.")
+        print(f"   Detalle: {e}")
+        return None
+
+
+def medir_tiempos_importacion():
+    """Mide el costo de importar cada módulo, cada uno en un intérprete limpio."""
+    print("\n" + "="*40)
+    print("   TIEMPO DE IMPORTACIÓN POR MÓDULO")
+    print("="*40)
+    rutas = [os.path.join(script_dir, 'domain'), os.path.join(script_dir, 'scrapers')]
+    for modulo in MODULOS_PROYECTO:
+        codigo = (
+            "import sys, time; sys.path[:0] = %r; t = time.perf_counter(); "
+            "import %s; print(time.perf_counter() - t)" % (rutas, modulo)
+        )
+        inicio = time.perf_counter()
+        proceso = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, cwd=script_dir)
+        total = time.perf_counter() - inicio
+        if proceso.returncode == 0:
+            importacion = float(proceso.stdout.strip().splitlines()[-1])
+            print(f"  {modulo:<24} {importacion:8.2f} s  (proceso completo: {total:.2f} s)")
+        else:
+            error = (proceso.stderr.strip().splitlines() or ["error desconocido"])[-1]
+            print(f"  {modulo:<24}    error  {error}")
+    print("-" * 40)
+
+
+def lista_enteros(texto):
+    """Convierte '1,5,10' en [1, 5, 10] para argparse."""
+    try:
+        return [int(parte) for parte in texto.split(',') if parte.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"se esperaba una lista de números separados por comas: '{texto}'")
+
+
+def rango_paginas_cli(texto):
+    """Convierte '1-5' en (1, 5) para argparse."""
+    try:
+        inicio, _, fin = texto.partition('-')
+        inicio, fin = int(inicio), int(fin or inicio)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"se esperaba un rango de páginas como '1-5': '{texto}'")
+    if inicio < 1 or fin < inicio:
+        raise argparse.ArgumentTypeError(f"rango de páginas inválido: '{texto}'")
+    return inicio, fin
+
+
+def entero_positivo(texto):
+    """Convierte '10' en 10 para argparse, rechazando cero y negativos."""
+    try:
+        valor = int(texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"se esperaba un número entero: '{texto}'")
+    if valor < 1:
+        raise argparse.ArgumentTypeError(f"debe ser al menos 1: '{texto}'")
+    return valor
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        description="Análisis bibliométrico. Sin argumentos abre el menú interactivo.")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    pipeline = subcomandos.add_parser("pipeline", help="Ejecuta varios requerimientos en orden")
+    acciones = pipeline.add_subparsers(dest="accion", required=True)
+    run = acciones.add_parser("run", help="Ejecuta los pasos indicados, omitiendo los que no cambiaron")
+    run.add_argument("--steps", type=lista_enteros, default=[1, 2, 3, 4, 5], help="Pasos a ejecutar, ej: 1,3,4,5")
+    run.add_argument("--ids", type=lista_enteros, help="Artículos (base 1) a comparar en el paso 2; por defecto todos")
+    run.add_argument("--force", action="store_true", help="Ejecuta los pasos aunque sus entradas no hayan cambiado")
+    run.add_argument("--workers", type=int,
+                     help="Procesos para parsear los .bib (paso 1) y evaluar los métodos de enlace (paso 4)")
+    run.add_argument("--componentes", type=int, help="Dimensiones de la reducción TF-IDF del paso 4 (por defecto 50)")
+
+    scrape = subcomandos.add_parser("scrape", help="Ejecuta los scrapers en paralelo")
+    scrape.add_argument("--fuentes", type=lambda t: [f.strip() for f in t.split(',') if f.strip()],
+                        help="Fuentes a descargar, ej: ieee,sage (por defecto todas)")
+    scrape.add_argument("--visible", action="store_true", help="Muestra las ventanas de Chrome (sin headless)")
+    scrape.add_argument("--paginas", type=rango_paginas_cli, help="Páginas de resultados a descargar, ej: 1-5")
+    scrape.add_argument("--reiniciar", action="store_true", help="Ignora el checkpoint y descarga de nuevo el rango")
+    scrape.add_argument("--solo-navegador", action="store_true",
+                        help="No usa la exportación directa por HTTP, solo el diálogo Export del navegador")
+    ingesta = subcomandos.add_parser("ingesta", help="Ingiere los .bib nuevos de downloads/ al almacén del corpus")
+    ingesta.add_argument("--vigilar", action="store_true", help="Sigue vigilando la carpeta hasta Ctrl+C")
+    ingesta.add_argument("--workers", type=int, help="Procesos para parsear los .bib (por defecto, uno por CPU)")
+    req1 = subcomandos.add_parser("req1", help="Unifica y limpia los archivos BibTeX")
+    req1.add_argument("--workers", type=int, help="Procesos para parsear los .bib (por defecto, uno por CPU)")
+    req2 = subcomandos.add_parser("req2", help="Similitud de abstracts")
+    seleccion = req2.add_mutually_exclusive_group(required=True)
+    seleccion.add_argument("--all", action="store_true", help="Compara todos los artículos con abstract")
+    seleccion.add_argument("--ids", type=lista_enteros, help="Artículos (base 1) a comparar, ej: 1,5,10")
+    subcomandos.add_parser("req3", help="Frecuencia de términos")
+    req4 = subcomandos.add_parser("req4", help="Dendrogramas de agrupamiento")
+    req4.add_argument("--componentes", type=int, help="Dimensiones de la reducción TF-IDF (por defecto 50)")
+    req4.add_argument("--workers", type=int, help="Procesos para evaluar los métodos de enlace (por defecto, uno por CPU)")
+    subcomandos.add_parser("req5", help="Visualizaciones")
+    similares = subcomandos.add_parser("similares", help="Artículos más parecidos a un artículo o a un texto")
+    consulta = similares.add_mutually_exclusive_group(required=True)
+    consulta.add_argument("--id", type=int, help="Artículo (base 1, como en req2) del que buscar similares")
+    consulta.add_argument("--texto", help="Texto libre a buscar")
+    similares.add_argument("-k", type=entero_positivo, default=10, help="Número de resultados (por defecto 10)")
+    similares.add_argument("--sondeos", type=entero_positivo, default=8, help="Listas del índice a revisar (más = más exacto)")
+    similares.add_argument("--vectores", choices=["auto", "sbert", "tfidf"], default="auto",
+                           help="Vectores del índice (auto: SBERT si está instalado, si no TF-IDF)")
+    similares.add_argument("--reconstruir", action="store_true", help="Reconstruye el índice aunque siga vigente")
+
+    subcomandos.add_parser("tiempos-importacion", help="Mide el costo de importar cada módulo")
+    word2vec = subcomandos.add_parser("convertir-word2vec", help="Convierte Word2Vec a formato nativo (mmap)")
+    word2vec.add_argument("--podar", action="store_true", help="Conserva solo el vocabulario del corpus")
+    return parser
+
+
+def ejecutar_scrapers(fuentes=None, headless=True, paginas=None, reiniciar=False, exportacion_directa=True):
+    ejecutar_scrapers_en_paralelo = cargar_funcion("orquestador", "ejecutar_scrapers_en_paralelo")
+    if not ejecutar_scrapers_en_paralelo:
+        return False
+
+    print("\n[INFO] Iniciando descarga automática de las bases de datos...")
+    print("   Cada fuente corre en su propio navegador; esto puede tardar varios minutos.")
+    # Mientras los scrapers descargan, los .bib se ingieren según van llegando
+    vigilar_descargas = cargar_funcion("ingesta", "vigilar_descargas")
+    detener = threading.Event()
+    vigilante = None
+    if vigilar_descargas:
+        vigilante = threading.Thread(target=vigilar_descargas, kwargs={"detener": detener}, daemon=True)
+        vigilante.start()
+    try:
+        resumenes = ejecutar_scrapers_en_paralelo(fuentes, headless=headless, paginas=paginas, reiniciar=reiniciar,
+                                                  exportacion_directa=exportacion_directa)
+    finally:
+        detener.set()
+        if vigilante:
+            vigilante.join()
+    if resumenes and all(r["ok"] for r in resumenes):
+        print("\nProceso de descarga completado.")
+        return True
+
+    print("ERROR durante la ejecución de los scrapers.")
+    print("   Asegúrate de que el archivo .env está configurado y el VPN/Proxy (CRAI) está activo.")
+    return False
+
+
+def ejecutar_cli(argumentos):
+    """Modo no interactivo. Devuelve el código de salida del proceso."""
+    args = crear_parser().parse_args(argumentos)
+    # Las rutas del proyecto son relativas a la raíz (cron no arranca aquí)
+    os.chdir(script_dir)
+
+    try:
+        if args.comando == "pipeline":
+            ejecutar_pipeline = cargar_funcion("pipeline", "ejecutar_pipeline")
+            ok = bool(ejecutar_pipeline) and ejecutar_pipeline(args.steps, forzar=args.force, ids=args.ids,
+                                                                   workers=args.workers, n_componentes=args.componentes)
+        elif args.comando == "scrape":
+            ok = ejecutar_scrapers(args.fuentes, headless=not args.visible, paginas=args.paginas,
+                                   reiniciar=args.reiniciar, exportacion_directa=not args.solo_navegador)
+        elif args.comando == "ingesta":
+            if args.vigilar:
+                funcion = cargar_funcion("ingesta", "vigilar_descargas")
+                ok = bool(funcion) and funcion() is not None
+            else:
+                funcion = cargar_funcion("ingesta", "ingerir_descargas")
+                ok = bool(funcion) and funcion(segundos_estable=0, workers=args.workers) is not None
+        elif args.comando == "req2":
+            ejecutar_req2 = cargar_funcion("requerimiento2", "ejecutar_req2")
+            ejecutar_req2_viz = cargar_funcion("requerimiento2_visual", "ejecutar_req2_viz")
+            ok = bool(ejecutar_req2 and ejecutar_req2_viz)
+            ok = ok and bool(ejecutar_req2(todos=args.all, indices=args.ids)) and bool(ejecutar_req2_viz())
+        elif args.comando == "req1":
+            ejecutar_req1 = cargar_funcion("requerimiento1", "ejecutar_req1")
+            ok = bool(ejecutar_req1) and bool(ejecutar_req1(workers=args.workers))
+        elif args.comando == "req4":
+            ejecutar_req4 = cargar_funcion("requerimiento4", "ejecutar_req4")
+            argumentos_req4 = {"n_componentes": args.componentes} if args.componentes else {}
+            ok = bool(ejecutar_req4) and bool(ejecutar_req4(workers=args.workers, **argumentos_req4))
+        elif args.comando == "similares":
+            buscar_similares = cargar_funcion("similares", "buscar_similares")
+            ok = bool(buscar_similares) and buscar_similares(
+                id_articulo=args.id, texto=args.texto, k=args.k, n_sondeos=args.sondeos,
+                vectores=args.vectores, reconstruir=args.reconstruir) is not None
+        elif args.comando in ("req3", "req5"):
+            numero = args.comando[-1]
+            funcion = cargar_funcion(f"requerimiento{numero}", f"ejecutar_req{numero}")
+            ok = bool(funcion) and bool(funcion())
+        elif args.comando == "tiempos-importacion":
+            medir_tiempos_importacion()
+            ok = True
+        elif args.comando == "convertir-word2vec":
+            # Conversión única a formato nativo; con --podar solo se guarda el vocabulario del corpus
+            requerimiento2 = importlib.import_module("requerimiento2")
+            vocabulario = requerimiento2.vocabulario_corpus() if args.podar else None
+            requerimiento2.convertir_word2vec(vocabulario=vocabulario)
+            ok = True
+    except KeyboardInterrupt:
+        print("\n[WARN] Ejecución interrumpida.")
+        return 130
+    except Exception as e:
+        print(f"[ERROR] {e}")
+        return 1
+
+    return 0 if ok else 1
+
 
 def mostrar_menu():
 
@@ -45,44 +258,41 @@ def main():
         opcion = input("Seleccione una opción: ")
 
         if opcion == '0':
-            print("\n[INFO] Iniciando descarga automática de todas las bases de datos...")
-            print("   Esto puede tardar varios minutos.")
-            try:
-                print("\n--- [1/3] Ejecutando Scraper de ScienceDirect ---")
-                science_test_debug()
-                
-                print("\n--- [2/3] Ejecutando Scraper de IEEE Xplore ---")
-                scrape_IEE()
-                
-                print("\n--- [3/3] Ejecutando Scraper de SAGE ---")
-                scrape_sage()
-                
-                print("\nProceso de descarga completado.")
-            except Exception as e:
-                print(f"ERROR durante la ejecución de los scrapers: {e}")
-                print("   Asegúrate de que el archivo .env está configurado y el VPN/Proxy (CRAI) está activo.")
+            ejecutar_scrapers()
 
         elif opcion == '1':
-            print("\n[INFO] Ejecutando Requerimiento 1 (Unificación)...")
-            ejecutar_req1()
-            print("Unificación completada.")
+            ejecutar_pipeline = cargar_funcion("pipeline", "ejecutar_pipeline")
+            if ejecutar_pipeline:
+                print("\n[INFO] Requerimiento 1 (Unificación)...")
+                if ejecutar_pipeline([1]):
+                    print("Unificación completada.")
 
         elif opcion == '2':
-            print("\n[INFO] Ejecutando Requerimiento 2...")
-            ejecutar_req2()
-            ejecutar_req2_viz()
+            ejecutar_req2 = cargar_funcion("requerimiento2", "ejecutar_req2")
+            ejecutar_req2_viz = cargar_funcion("requerimiento2_visual", "ejecutar_req2_viz")
+            if ejecutar_req2 and ejecutar_req2_viz:
+                print("\n[INFO] Ejecutando Requerimiento 2...")
+                todos = input("¿Comparar todos los artículos del corpus? (s/N): ").strip().lower() == 's'
+                ejecutar_req2(todos=todos)
+                ejecutar_req2_viz()
 
         elif opcion == '3':
-            print("\n[INFO] Ejecutando Requerimiento 3...")
-            ejecutar_req3()
+            # Solo se recalcula si cambiaron las entradas o los parámetros
+            ejecutar_pipeline = cargar_funcion("pipeline", "ejecutar_pipeline")
+            if ejecutar_pipeline:
+                ejecutar_pipeline([3])
 
         elif opcion == '4':
-            print("\n[INFO] Ejecutando Requerimiento 4...")
-            ejecutar_req4()
+            # Solo se recalcula si cambiaron las entradas o los parámetros
+            ejecutar_pipeline = cargar_funcion("pipeline", "ejecutar_pipeline")
+            if ejecutar_pipeline:
+                ejecutar_pipeline([4])
 
         elif opcion == '5':
-            print("\n[INFO] Ejecutando Requerimiento 5...")
-            ejecutar_req5()
+            # Solo se recalcula si cambiaron las entradas o los parámetros
+            ejecutar_pipeline = cargar_funcion("pipeline", "ejecutar_pipeline")
+            if ejecutar_pipeline:
+                ejecutar_pipeline([5])
 
         elif opcion == '9': 
             print("\nSaliendo del programa.")
@@ -92,4 +302,6 @@ def main():
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(ejecutar_cli(sys.argv[1:]))
     main()
\ No newline at end of file
@@ -0,0 +1,64 @@
+import os
+import json
+import time
+
+NOMBRE_CHECKPOINT = "checkpoint.json"
+
+
+def ruta_checkpoint(download_folder):
+    """El checkpoint de cada fuente vive en su carpeta de descargas."""
+    return os.path.join(download_folder, NOMBRE_CHECKPOINT)
+
+
+def cargar_checkpoint(download_folder, fuente, consulta, reiniciar=False):
+    """
+    Devuelve el checkpoint de la fuente para esta consulta. Si la consulta cambió
+    (otro término o rango de años) o se pide reiniciar, empieza uno nuevo.
+    """
+    nuevo = {"fuente": fuente, "consulta": consulta, "paginas": {}, "ultima_pagina": 0, "fin_resultados": None}
+    ruta = ruta_checkpoint(download_folder)
+    if reiniciar or not os.path.exists(ruta):
+        return nuevo
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Checkpoint ilegible ({e}), se empieza desde cero")
+        return nuevo
+    if checkpoint.get("consulta") != consulta:
+        print("[INFO] La consulta cambió desde el último checkpoint, se empieza desde cero")
+        return nuevo
+    return checkpoint
+
+
+def guardar_checkpoint(download_folder, checkpoint):
+    ruta = ruta_checkpoint(download_folder)
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=2, ensure_ascii=False)
+    os.replace(ruta + ".tmp", ruta)
+
+
+def registrar_pagina(download_folder, checkpoint, pagina, archivos, resultados):
+    """Marca una página como exportada (con sus archivos y número de resultados) y guarda."""
+    checkpoint["paginas"][str(pagina)] = {
+        "archivos": list(archivos),
+        "resultados": resultados,
+        "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    checkpoint["ultima_pagina"] = max(checkpoint.get("ultima_pagina", 0), pagina)
+    guardar_checkpoint(download_folder, checkpoint)
+
+
+def registrar_fin(download_folder, checkpoint, pagina):
+    """Anota la última página con resultados, para no volver a pedir las siguientes."""
+    checkpoint["fin_resultados"] = pagina
+    guardar_checkpoint(download_folder, checkpoint)
+
+
+def paginas_pendientes(checkpoint, pagina_inicio, pagina_fin):
+    """Páginas del rango que aún no se exportaron (sin pasar del final de resultados conocido)."""
+    fin = pagina_fin
+    if checkpoint.get("fin_resultados"):
+        fin = min(fin, checkpoint["fin_resultados"])
+    return [p for p in range(pagina_inicio, fin + 1) if str(p) not in checkpoint["paginas"]]
+
@@ -0,0 +1,117 @@
+import os
+import re
+import time
+import requests
+import bibtexparser
+from selenium.webdriver.common.by import By
+from navegador import DOMINIO_SESION
+
+# Tamaño del pool de conexiones de la sesión HTTP (una por proceso de scraper)
+MAX_CONEXIONES = 4
+TIMEOUT_EXPORTACION = 60
+
+
+#Sesión HTTP con las cookies del navegador
+def crear_sesion_desde_driver(driver, max_conexiones=MAX_CONEXIONES):
+    """
+    Crea una sesión requests con pool de conexiones que reutiliza las cookies del proxy
+    CRAI y el User-Agent del Chrome ya autenticado.
+    """
+    sesion = requests.Session()
+    adaptador = requests.adapters.HTTPAdapter(pool_connections=max_conexiones, pool_maxsize=max_conexiones)
+    sesion.mount("https://", adaptador)
+    sesion.mount("http://", adaptador)
+    sesion.headers["User-Agent"] = driver.execute_script("return navigator.userAgent")
+
+    # Fuera del proxy (p. ej. páginas de prueba locales) se copian todas las cookies
+    todas = DOMINIO_SESION not in driver.current_url
+    for c in driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]:
+        dominio = c.get("domain", "")
+        if todas or DOMINIO_SESION in dominio:
+            sesion.cookies.set(c["name"], c["value"], domain=dominio, path=c.get("path", "/"))
+    return sesion
+
+
+def guardar_bibtex(contenido, download_folder, nombre):
+    """Escribe el BibTeX descargado (de forma atómica, para que el vigilante no lo lea a medias)."""
+    ruta = os.path.join(download_folder, nombre)
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        f.write(contenido)
+    os.replace(ruta + ".tmp", ruta)
+    return nombre
+
+
+def es_bibtex(r):
+    """
+    True si la respuesta es BibTeX de verdad: HTTP 200, no HTML (el proxy responde su
+    página de login con 200), empieza por '@' y tiene al menos una entrada que se parsea.
+    """
+    tipo = r.headers.get("Content-Type", "").lower()
+    texto = r.text
+    if r.status_code != 200 or "html" in tipo or not texto.lstrip().startswith("@"):
+        return False
+    try:
+        return len(bibtexparser.loads(texto).entries) > 0
+    except Exception:
+        return False
+
+
+def _exportar(sesion, metodo, url, download_folder, nombre, **kwargs):
+    """Hace la petición de exportación y guarda la respuesta solo si es BibTeX. Devuelve [archivo] o []."""
+    try:
+        r = sesion.request(metodo, url, timeout=TIMEOUT_EXPORTACION, **kwargs)
+    except requests.exceptions.RequestException as e:
+        print(f"Exportación directa falló ({e}), se usará el navegador")
+        return []
+    if not es_bibtex(r):
+        tipo = r.headers.get("Content-Type") or "sin Content-Type"
+        print(f"Exportación directa sin BibTeX (HTTP {r.status_code}, {tipo}), se usará el navegador")
+        return []
+    return [guardar_bibtex(r.text, download_folder, nombre)]
+
+
+def _enlaces(driver, selector, patron):
+    """Identificadores únicos (en orden) extraídos de los href de los enlaces de resultados."""
+    ids = []
+    for enlace in driver.find_elements(By.CSS_SELECTOR, selector):
+        coincidencia = re.search(patron, enlace.get_attribute("href") or "")
+        if coincidencia and coincidencia.group(1) not in ids:
+            ids.append(coincidencia.group(1))
+    return ids
+
+
+#Exportación por fuente
+def exportar_ieee(sesion, driver, base_url, download_folder, pagina):
+    """IEEE Xplore: POST a /xpl/downloadCitations con los arnumber de la página (cita y abstract)."""
+    ids = _enlaces(driver, "a[href*='/document/']", r"/document/(\d+)")
+    if not ids:
+        return []
+    datos = {
+        "recordIds": ",".join(ids),
+        "download-format": "download-bibtex",
+        "citations-format": "citation-abstract",
+        "fromPage": "",
+    }
+    nombre = f"IEEE_pagina{pagina}_{int(time.time())}.bib"
+    return _exportar(sesion, "POST", f"{base_url}/xpl/downloadCitations", download_folder, nombre, data=datos)
+
+
+def exportar_sage(sesion, driver, base_url, download_folder, pagina):
+    """SAGE: POST a /action/downloadCitation con los DOI de la página en formato BibTeX."""
+    dois = [c.get_attribute("value") for c in driver.find_elements(By.CSS_SELECTOR, "input[name='doi']")]
+    dois = list(dict.fromkeys(d for d in dois if d))
+    if not dois:
+        return []
+    datos = [("doi", d) for d in dois] + [("format", "bibtex"), ("include", "abs"), ("direct", "true")]
+    nombre = f"sage_pagina{pagina}_{int(time.time())}.bib"
+    return _exportar(sesion, "POST", f"{base_url}/action/downloadCitation", download_folder, nombre, data=datos)
+
+
+def exportar_sciencedirect(sesion, driver, base_url, download_folder, pagina):
+    """ScienceDirect: GET a /sdfe/arp/cite con los PII de la página, en BibTeX con abstract."""
+    piis = _enlaces(driver, "a[href*='/pii/']", r"/pii/([A-Z0-9]+)")
+    if not piis:
+        return []
+    params = {"pii": ",".join(piis), "format": "text/x-bibtex", "withabstract": "true"}
+    nombre = f"ScienceDirect_pagina{pagina}_{int(time.time())}.bib"
+    return _exportar(sesion, "GET", f"{base_url}/sdfe/arp/cite", download_folder, nombre, params=params)
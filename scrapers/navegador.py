@@ -0,0 +1,216 @@
+import os
+import json
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+
+# Cookies del proxy CRAI compartidas por los tres scrapers. Se usan cookies y no un
+# user-data-dir porque Chrome no permite abrir el mismo perfil desde varios procesos.
+RUTA_SESION = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "sesion", "cookies_crai.json")
+DOMINIO_SESION = "referencistas.com"
+# Carpeta raíz de las descargas (una subcarpeta por fuente); se puede cambiar para las pruebas locales
+DIR_DESCARGAS = os.getenv("DESCARGAS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "downloads"))
+
+
+def crear_opciones_chrome(download_folder, headless=False, extra_args=None):
+    """Opciones de Chrome comunes a los scrapers: descargas sin diálogo en download_folder."""
+    os.makedirs(download_folder, exist_ok=True)
+    chrome_options = Options()
+    chrome_options.add_experimental_option("prefs", {
+        "download.default_directory": os.path.abspath(download_folder),
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+        "safebrowsing.enabled": True
+    })
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    if headless:
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--window-size=1920,1080")
+    for arg in extra_args or []:
+        chrome_options.add_argument(arg)
+    return chrome_options
+
+
+#Esperas por condición (en lugar de time.sleep fijos)
+@contextmanager
+def medir_paso(nombre):
+    """Registra cuánto tarda un paso del scraper, para ver dónde se va el tiempo."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        print(f"[tiempo] {nombre}: {time.perf_counter() - inicio:.1f} s")
+
+
+def esperar_pagina_cargada(driver, timeout=15):
+    """Espera a que document.readyState sea 'complete'. Devuelve False si se agota el tiempo."""
+    try:
+        WebDriverWait(driver, timeout).until(
+            lambda d: d.execute_script("return document.readyState") == "complete"
+        )
+        return True
+    except TimeoutException:
+        print("Timeout esperando la carga de la página")
+        return False
+
+
+def esperar_condicion(driver, condicion, timeout=10):
+    """Espera una condición de Selenium sin lanzar excepción; devuelve su resultado o None."""
+    try:
+        return WebDriverWait(driver, timeout).until(condicion)
+    except TimeoutException:
+        return None
+
+
+def esperar_nueva_ventana(driver, ventanas_previas, timeout=15):
+    """Espera a que se abra una ventana (p. ej. el popup de Google) y devuelve su handle."""
+    nuevas = esperar_condicion(driver, lambda d: [h for h in d.window_handles if h not in ventanas_previas], timeout)
+    return nuevas[0] if nuevas else None
+
+
+def esperar_cambio_pagina(driver, elemento_anterior, timeout=20):
+    """Espera a que un elemento de la página anterior desaparezca del DOM y la nueva termine de cargar."""
+    esperar_condicion(driver, EC.staleness_of(elemento_anterior), timeout)
+    return esperar_pagina_cargada(driver, timeout)
+
+
+def _descargas_en_curso(carpeta):
+    return [f for f in os.listdir(carpeta) if f.endswith((".crdownload", ".tmp", ".part"))]
+
+
+def esperar_descarga(carpeta, archivos_previos, timeout=60, intervalo=0.25):
+    """
+    Espera a que aparezca en la carpeta al menos un archivo nuevo y a que no quede
+    ningún .crdownload. Devuelve la lista de archivos nuevos ([] si se agota el tiempo).
+    """
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        actuales = set(os.listdir(carpeta))
+        nuevos = sorted(f for f in actuales - set(archivos_previos)
+                        if not f.endswith((".crdownload", ".tmp", ".part")))
+        if nuevos and not _descargas_en_curso(carpeta):
+            return nuevos
+        time.sleep(intervalo)
+    print(f"Timeout ({timeout} s) esperando la descarga en {carpeta}")
+    return []
+
+
+def esperar_cierre_ventana(driver, ventana, timeout=30):
+    """Espera a que se cierre una ventana (p. ej. el popup de Google tras el login)."""
+    return bool(esperar_condicion(driver, lambda d: ventana not in d.window_handles, timeout))
+
+
+#Sesión CRAI: login con Google y reutilización de cookies
+def guardar_cookies(driver, ruta=RUTA_SESION):
+    """Guarda las cookies del proxy CRAI (todos sus subdominios) para reutilizarlas en otras ejecuciones."""
+    cookies = [c for c in driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+               if DOMINIO_SESION in c.get("domain", "")]
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    # Varios scrapers pueden guardar a la vez: cada uno escribe su temporal y lo reemplaza
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump({"fecha": time.time(), "cookies": cookies}, f)
+    os.replace(temporal, ruta)
+    print(f"Sesión guardada ({len(cookies)} cookies)")
+
+
+def cargar_cookies(driver, ruta=RUTA_SESION):
+    """Carga en el navegador las cookies guardadas. Devuelve cuántas se cargaron."""
+    if not os.path.exists(ruta):
+        return 0
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            cookies = json.load(f).get("cookies", [])
+    except (OSError, ValueError):
+        return 0
+
+    ahora = time.time()
+    vigentes = []
+    for c in cookies:
+        expira = c.get("expires", -1)
+        if expira not in (None, -1) and expira < ahora:
+            continue
+        cookie = {k: c[k] for k in ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite") if k in c}
+        if expira not in (None, -1):
+            cookie["expires"] = expira
+        vigentes.append(cookie)
+    if vigentes:
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": vigentes})
+    return len(vigentes)
+
+
+def sesion_activa(driver, url, marcador, timeout=15):
+    """
+    Hay sesión solo si el navegador quedó en el host de url (el del proxy) y muestra
+    marcador, un elemento propio de la página de resultados. Que falte el botón de
+    Google no basta: una página de error, a medio cargar, el aviso de consentimiento
+    de Google o el login del propio editor tampoco lo tienen. Espera hasta timeout a
+    que aparezca el marcador o el botón de Google, lo que llegue antes.
+    """
+    host = urlsplit(url).netloc
+    esperar_condicion(driver, lambda d: d.find_elements(*marcador) or d.find_elements(By.ID, "btn-google"), timeout)
+    return urlsplit(driver.current_url).netloc == host and bool(driver.find_elements(*marcador))
+
+
+def login_google(driver, email, password, url, marcador, timeout=30):
+    """
+    Inicia sesión en el proxy CRAI con la cuenta de Google y espera a volver a la
+    página de resultados de url (marcador visible). Lanza excepción si falla.
+    """
+    if not email or not password:
+        raise RuntimeError("las variables de entorno EMAIL y PASSWORD no están configuradas")
+
+    google_login_button = WebDriverWait(driver, 15).until(
+        EC.element_to_be_clickable((By.ID, "btn-google"))
+    )
+    main_window = driver.current_window_handle
+    ventanas_previas = driver.window_handles
+    google_login_button.click()
+
+    popup = esperar_nueva_ventana(driver, ventanas_previas)
+    if popup:
+        driver.switch_to.window(popup)
+
+    email_input = WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.ID, "identifierId")))
+    email_input.send_keys(email)
+    email_input.send_keys(Keys.RETURN)
+
+    password_input = WebDriverWait(driver, 15).until(EC.element_to_be_clickable((By.NAME, "Passwd")))
+    password_input.send_keys(password)
+    password_input.send_keys(Keys.RETURN)
+
+    # El popup se cierra solo cuando Google devuelve la sesión al proxy
+    if popup:
+        esperar_cierre_ventana(driver, popup, timeout)
+    driver.switch_to.window(main_window)
+    esperar_pagina_cargada(driver, timeout)
+    if not sesion_activa(driver, url, marcador, timeout):
+        raise TimeoutException("el proxy CRAI no confirmó la sesión")
+
+
+def iniciar_sesion(driver, url, email, password, marcador, ruta=RUTA_SESION):
+    """
+    Abre url reutilizando la sesión guardada. Solo hace el login con Google si la
+    sesión no existe o caducó (ver sesion_activa; marcador es el localizador de un
+    elemento de la página de resultados), y en ese caso guarda las cookies nuevas.
+    """
+    # Las cookies se pueden cargar antes de navegar (CDP no exige estar en el dominio)
+    cargadas = cargar_cookies(driver, ruta)
+    driver.get(url)
+    esperar_pagina_cargada(driver)
+
+    if sesion_activa(driver, url, marcador):
+        print("Sesión CRAI reutilizada" if cargadas else "No hace falta iniciar sesión")
+        return
+    if cargadas:
+        print("La sesión guardada caducó, iniciando sesión de nuevo...")
+
+    login_google(driver, email, password, url, marcador)
+    guardar_cookies(driver, ruta)
@@ -0,0 +1,124 @@
+import os
+import sys
+import time
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from checkpoint import NOMBRE_CHECKPOINT
+
+# Fuente -> (módulo, función del scraper)
+FUENTES = {
+    "sciencedirect": ("scraper_sciencedirect", "science_test_debug"),
+    "ieee": ("scraper_ieee", "scrape_IEE"),
+    "sage": ("scraper_sage", "scrape_sage"),
+}
+
+
+class _SalidaConPrefijo:
+    """Antepone el nombre de la fuente a cada línea impresa por el scraper."""
+
+    def __init__(self, destino, prefijo):
+        self.destino = destino
+        self.prefijo = prefijo
+        self.inicio_linea = True
+
+    def write(self, texto):
+        for parte in texto.splitlines(keepends=True):
+            if self.inicio_linea:
+                self.destino.write(self.prefijo)
+            self.destino.write(parte)
+            self.inicio_linea = parte.endswith("\n")
+        return len(texto)
+
+    def flush(self):
+        self.destino.flush()
+
+
+def _archivos(carpeta):
+    return set(os.listdir(carpeta)) if os.path.isdir(carpeta) else set()
+
+
+def ejecutar_fuente(fuente, headless=True, paginas=None, reiniciar=False, exportacion_directa=True):
+    """
+    Ejecuta el scraper de una fuente (pensado para correr en su propio proceso, con
+    su propio Chrome y carpeta de descargas). Devuelve un resumen con estado y tiempos.
+    """
+    nombre_modulo, nombre_funcion = FUENTES[fuente]
+    sys.stdout = _SalidaConPrefijo(sys.__stdout__, f"[{fuente}] ")
+    inicio = time.perf_counter()
+    resumen = {"fuente": fuente, "ok": False, "duracion_s": 0.0, "archivos_nuevos": [], "error": None}
+    carpeta = None
+    antes = set()
+    try:
+        modulo = importlib.import_module(nombre_modulo)
+        carpeta = modulo.DOWNLOAD_FOLDER
+        antes = _archivos(carpeta)
+        scraper = getattr(modulo, nombre_funcion)
+        resumen["ok"] = bool(scraper(headless=headless, paginas=paginas, reiniciar=reiniciar,
+                                       exportacion_directa=exportacion_directa))
+    except Exception as e:
+        resumen["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        resumen["duracion_s"] = round(time.perf_counter() - inicio, 1)
+        if carpeta:
+            resumen["archivos_nuevos"] = sorted(f for f in _archivos(carpeta) - antes
+                                                if not f.endswith((".crdownload", ".tmp")) and f != NOMBRE_CHECKPOINT)
+        sys.stdout.flush()
+        sys.stdout = sys.__stdout__
+    return resumen
+
+
+def imprimir_resumen(resumenes, duracion_total):
+    print("\n=== RESUMEN DE DESCARGAS ===")
+    print(f"{'Fuente':<15} {'Estado':<8} {'Tiempo (s)':>11} {'Archivos nuevos':>16}")
+    for r in resumenes:
+        estado = "OK" if r["ok"] else "FALLO"
+        print(f"{r['fuente']:<15} {estado:<8} {r['duracion_s']:>11.1f} {len(r['archivos_nuevos']):>16}")
+        for archivo in r["archivos_nuevos"]:
+            print(f"   - {archivo}")
+        if r["error"]:
+            print(f"   [ERROR] {r['error']}")
+    secuencial = sum(r["duracion_s"] for r in resumenes)
+    print(f"Tiempo total: {duracion_total:.1f} s (suma de las fuentes: {secuencial:.1f} s)")
+
+
+def ejecutar_scrapers_en_paralelo(fuentes=None, headless=True, max_procesos=None, paginas=None, reiniciar=False,
+                                  exportacion_directa=True):
+    """
+    Lanza los scrapers pedidos a la vez, cada uno en un proceso con su propio Chrome.
+    paginas=(inicio, fin) se aplica a todas las fuentes; cada una retoma desde su checkpoint.
+    Devuelve la lista de resúmenes por fuente (en el orden de FUENTES).
+    """
+    fuentes = [f for f in FUENTES if f in fuentes] if fuentes else list(FUENTES)
+    if not fuentes:
+        print("[ERROR] No se indicó ninguna fuente válida.")
+        return []
+
+    print(f"[INFO] Lanzando {len(fuentes)} scrapers en paralelo ({', '.join(fuentes)})"
+          f"{' en modo headless' if headless else ''}...")
+    inicio = time.perf_counter()
+    resumenes = {}
+    # spawn y no fork: main.py ya tiene corriendo el hilo que vigila las descargas, y un
+    # fork con otros hilos vivos puede heredar candados tomados (p. ej. el de stdout)
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_procesos or len(fuentes), mp_context=contexto) as executor:
+        futuros = {executor.submit(ejecutar_fuente, fuente, headless, paginas, reiniciar, exportacion_directa): fuente
+                   for fuente in fuentes}
+        for futuro in as_completed(futuros):
+            fuente = futuros[futuro]
+            try:
+                resumenes[fuente] = futuro.result()
+            except Exception as e:
+                # El proceso murió (p. ej. Chrome tumbó al intérprete)
+                resumenes[fuente] = {"fuente": fuente, "ok": False, "duracion_s": 0.0,
+                                     "archivos_nuevos": [], "error": f"{type(e).__name__}: {e}"}
+            estado = "terminó" if resumenes[fuente]["ok"] else "falló"
+            print(f"[INFO] {fuente} {estado} en {resumenes[fuente]['duracion_s']:.1f} s")
+
+    resultado = [resumenes[f] for f in fuentes]
+    imprimir_resumen(resultado, time.perf_counter() - inicio)
+    return resultado
+
+
+if __name__ == "__main__":
+    ejecutar_scrapers_en_paralelo()
@@ -4,40 +4,32 @@ from dotenv import load_dotenv
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementClickInterceptedException
+from navegador import (crear_opciones_chrome, medir_paso, esperar_pagina_cargada, esperar_condicion,
+                       esperar_descarga, iniciar_sesion, DIR_DESCARGAS)
+from checkpoint import cargar_checkpoint, registrar_pagina, registrar_fin, paginas_pendientes
+from exportacion_directa import crear_sesion_desde_driver, exportar_ieee
 
 load_dotenv()
 
 # Configurar carpeta de descargas
-DOWNLOAD_FOLDER = os.path.join(os.path.dirname(__file__), "..", "downloads/IEE")
+DOWNLOAD_FOLDER = os.path.join(DIR_DESCARGAS, "IEE")
 if not os.path.exists(DOWNLOAD_FOLDER):
     os.makedirs(DOWNLOAD_FOLDER)
 
-# Configurar Chrome
-chrome_options = Options()
-chrome_options.add_experimental_option("prefs", {
-    "download.default_directory": os.path.abspath(DOWNLOAD_FOLDER),
-    "download.prompt_for_download": False,
-    "download.directory_upgrade": True,
-    "safebrowsing.enabled": True
-})
-chrome_options.add_argument("--disable-gpu")
-chrome_options.add_argument("--no-sandbox")
+# URL base (a través del proxy CRAI); se puede cambiar para apuntar a páginas de prueba locales
+BASE_URL = os.getenv("IEEE_BASE_URL", "https://ieeexplore-ieee-org.crai.referencistas.com")
+
+# Páginas de 100 resultados que se descargan si no se indica otro rango
+MAX_PAGES_TO_DOWNLOAD = 1
 
 
 def wait_for_page_load(driver, timeout=10):
-    """Espera a que la página se cargue completamente"""
-    try:
-        WebDriverWait(driver, timeout).until(
-            lambda d: d.execute_script("return document.readyState") == "complete"
-        )
-        time.sleep(2)  # Tiempo adicional para elementos dinámicos
-    except TimeoutException:
-        print("Timeout esperando la carga de la página")
+    """Espera a que la página se cargue completamente (los elementos dinámicos se esperan uno a uno)"""
+    return esperar_pagina_cargada(driver, timeout)
 
 
 def close_modal_safely(driver):
@@ -56,8 +48,9 @@ def close_modal_safely(driver):
             )
             actions = ActionChains(driver)
             actions.move_to_element(close_button).click().perform()
+            esperar_condicion(driver, EC.invisibility_of_element_located(
+                (By.XPATH, "//div[contains(@class, 'modal-dialog')]")), 5)
             print("Modal cerrado")
-            time.sleep(2)
             return True
         except (TimeoutException, ElementClickInterceptedException):
             continue
@@ -65,7 +58,8 @@ def close_modal_safely(driver):
     # Si no se puede cerrar con click, intenta ESC
     try:
         driver.find_element(By.TAG_NAME, 'body').send_keys(Keys.ESCAPE)
-        time.sleep(2)
+        esperar_condicion(driver, EC.invisibility_of_element_located(
+            (By.XPATH, "//div[contains(@class, 'modal-dialog')]")), 5)
         print("Modal cerrado con ESC")
         return True
     except Exception:
@@ -111,49 +105,44 @@ def has_next_page(driver):
         return False, None
 
 
-def scrape_IEE():
+def scrape_IEE(headless=False, download_folder=DOWNLOAD_FOLDER, paginas=None, reiniciar=False,
+               exportacion_directa=True):
+    """
+    Descarga de IEEE Xplore los resultados en BibTeX (cita y abstract) de las páginas
+    indicadas (inicio, fin). Las páginas ya exportadas según el checkpoint se omiten,
+    salvo con reiniciar=True. Con exportacion_directa se pide el BibTeX por HTTP con las
+    cookies del navegador y solo si falla se usa el diálogo Export. Devuelve True si terminó.
+    """
     EMAIL = os.getenv("EMAIL")
     PASSWORD = os.getenv("PASSWORD")
 
     SEARCH_TERM = "generative artificial intelligence"
     current_year = int(time.strftime("%Y"))
     start_year = current_year - 4 
-    LOGIN_URL = f"https://ieeexplore-ieee-org.crai.referencistas.com/search/searchresult.jsp?newsearch=true&queryText={SEARCH_TERM.replace(' ', '%20')}&ranges={start_year}_{current_year}_Year"
-
-    driver = webdriver.Chrome(options=chrome_options)
-    driver.get(LOGIN_URL)
-    wait_for_page_load(driver)
+    SEARCH_URL = f"{BASE_URL}/search/searchresult.jsp?newsearch=true&queryText={SEARCH_TERM.replace(' ', '%20')}&ranges={start_year}_{current_year}_Year"
+
+    def url_pagina(numero):
+        # La página y los 100 resultados por página van en la URL: se salta directo a cualquier página
+        return f"{SEARCH_URL}&pageNumber={numero}&rowsPerPage=100"
+
+    pagina_inicio, pagina_fin = paginas or (1, MAX_PAGES_TO_DOWNLOAD)
+    consulta = {"termino": SEARCH_TERM, "desde": start_year, "hasta": current_year}
+    checkpoint = cargar_checkpoint(download_folder, "ieee", consulta, reiniciar)
+    pendientes = paginas_pendientes(checkpoint, pagina_inicio, pagina_fin)
+    if not pendientes:
+        print(f"Las páginas {pagina_inicio}-{pagina_fin} ya están descargadas (checkpoint).")
+        return True
+    print(f"Páginas pendientes: {', '.join(map(str, pendientes))}")
 
+    driver = webdriver.Chrome(options=crear_opciones_chrome(download_folder, headless))
     # ------------------ LOGIN ------------------
     try:
-        google_login_button = driver.find_element(By.ID, "btn-google")
-        google_login_button.click()
-        time.sleep(6)
-
-        main_window = driver.current_window_handle
-        for handle in driver.window_handles:
-            if handle != main_window:
-                driver.switch_to.window(handle)
-                break
-
-        email_input = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.ID, "identifierId"))
-        )
-        email_input.send_keys(EMAIL)
-        email_input.send_keys(Keys.RETURN)
-        time.sleep(6)
-
-        password_input = driver.find_element(By.NAME, "Passwd")
-        password_input.send_keys(PASSWORD)
-        password_input.send_keys(Keys.RETURN)
-        time.sleep(15)
-
-        driver.switch_to.window(main_window)
-
+        with medir_paso("IEEE: carga inicial y sesión"):
+            iniciar_sesion(driver, url_pagina(pendientes[0]), EMAIL, PASSWORD, (By.CLASS_NAME, "List-results-items"))
     except Exception as e:
         print("Error durante el login:", e)
         driver.quit()
-        return
+        return False
 
     # ------------------ ACEPTAR COOKIES ------------------
     try:
@@ -165,86 +154,92 @@ def scrape_IEE():
     except TimeoutException:
         print("Botón de cookies no encontrado (quizás ya aceptado).")
 
-    # ------------------ SELECCIONAR 100 ------------------
-    try:
-        itemsPerPage = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.ID, "dropdownPerPageLabel"))
-        )
-        itemsPerPage.click()
-        option_100 = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), '100')]"))
-        )
-        option_100.click()
-        print("Seleccionaste 100 elementos por página.")
-        wait_for_page_load(driver)
-    except Exception as e:
-        print("Error al seleccionar 100:", e)
-
     # ------------------ ITERAR PÁGINAS ------------------
-    page_number = 1
     max_retries = 3
-
-    MAX_PAGES_TO_DOWNLOAD = 1
+    procesadas = 0
+    sesion_http = crear_sesion_desde_driver(driver) if exportacion_directa else None
 
     try:
-        while page_number <= MAX_PAGES_TO_DOWNLOAD:
+        for page_number in pendientes:
             print(f"Procesando página {page_number}...")
+            if page_number != pendientes[0]:
+                with medir_paso(f"IEEE: navegación a página {page_number}"):
+                    driver.get(url_pagina(page_number))
             retry_count = 0
             page_success = False
 
+            if sesion_http:
+                wait_for_page_load(driver)
+                esperar_condicion(driver, EC.presence_of_element_located((By.CLASS_NAME, "List-results-items")), 15)
+                n_resultados = len(driver.find_elements(By.CLASS_NAME, "List-results-items"))
+                with medir_paso(f"IEEE: exportación directa (página {page_number})"):
+                    nuevos = exportar_ieee(sesion_http, driver, BASE_URL, download_folder, page_number)
+                if nuevos:
+                    print(f"Página {page_number}: descargado {', '.join(nuevos)} (exportación directa)")
+                    registrar_pagina(download_folder, checkpoint, page_number, nuevos, n_resultados)
+                    procesadas += 1
+                    page_success = True
+
             while retry_count < max_retries and not page_success:
                 try:
                     # Esperar a que la página se cargue
                     wait_for_page_load(driver)
 
-                    # Seleccionar todos los resultados
-                    checkbox = WebDriverWait(driver, 15).until(
-                        EC.element_to_be_clickable((By.CLASS_NAME, "results-actions-selectall-checkbox"))
-                    )
-                    driver.execute_script("arguments[0].scrollIntoView(true);", checkbox)
-                    time.sleep(1)
-                    driver.execute_script("arguments[0].click();", checkbox)
-                    time.sleep(3)
-
-                    # Botón Export
-                    export = WebDriverWait(driver, 15).until(
-                        EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Export')]"))
-                    )
-                    export.click()
-                    time.sleep(3)
-
-                    # Pestaña Citations
-                    citations_tab = WebDriverWait(driver, 15).until(
-                        EC.element_to_be_clickable((By.XPATH, "//a[contains(text(), 'Citations')]"))
-                    )
-                    citations_tab.click()
-                    time.sleep(2)
-
-                    # BibTeX
-                    bibtex_radio = WebDriverWait(driver, 10).until(
-                        EC.element_to_be_clickable((By.XPATH, "//label[@for='download-bibtex']/input"))
-                    )
-                    if not bibtex_radio.is_selected():
-                        bibtex_radio.click()
-                    time.sleep(2)
-
-                    # Citation + Abstract
-                    add_abstract = WebDriverWait(driver, 10).until(
-                        EC.element_to_be_clickable((By.XPATH, "//label[contains(., 'Citation and Abstract')]/input"))
-                    )
-                    if not add_abstract.is_selected():
-                        add_abstract.click()
-                    time.sleep(2)
-
-                    # Download
-                    download_button = WebDriverWait(driver, 15).until(
-                        EC.element_to_be_clickable(
-                            (By.XPATH, "//div[contains(@class, 'modal-dialog')]//button[contains(text(), 'Download')]")
+                    with medir_paso(f"IEEE: selección y exportación (página {page_number})"):
+                        # Seleccionar todos los resultados
+                        checkbox = WebDriverWait(driver, 15).until(
+                            EC.element_to_be_clickable((By.CLASS_NAME, "results-actions-selectall-checkbox"))
+                        )
+                        n_resultados = len(driver.find_elements(By.CLASS_NAME, "List-results-items"))
+                        driver.execute_script("arguments[0].scrollIntoView(true);", checkbox)
+                        driver.execute_script("arguments[0].click();", checkbox)
+                        esperar_condicion(driver, lambda d: checkbox.is_selected(), 5)
+
+                        # Botón Export
+                        export = WebDriverWait(driver, 15).until(
+                            EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Export')]"))
+                        )
+                        export.click()
+
+                        # Pestaña Citations
+                        citations_tab = WebDriverWait(driver, 15).until(
+                            EC.element_to_be_clickable((By.XPATH, "//a[contains(text(), 'Citations')]"))
+                        )
+                        citations_tab.click()
+
+                        # BibTeX
+                        bibtex_radio = WebDriverWait(driver, 10).until(
+                            EC.element_to_be_clickable((By.XPATH, "//label[@for='download-bibtex']/input"))
+                        )
+                        if not bibtex_radio.is_selected():
+                            bibtex_radio.click()
+                        esperar_condicion(driver, lambda d: bibtex_radio.is_selected(), 5)
+
+                        # Citation + Abstract
+                        add_abstract = WebDriverWait(driver, 10).until(
+                            EC.element_to_be_clickable((By.XPATH, "//label[contains(., 'Citation and Abstract')]/input"))
+                        )
+                        if not add_abstract.is_selected():
+                            add_abstract.click()
+                        esperar_condicion(driver, lambda d: add_abstract.is_selected(), 5)
+
+                        # Download
+                        download_button = WebDriverWait(driver, 15).until(
+                            EC.element_to_be_clickable(
+                                (By.XPATH, "//div[contains(@class, 'modal-dialog')]//button[contains(text(), 'Download')]")
+                            )
                         )
-                    )
-                    download_button.click()
-                    print(f"Página {page_number}: descarga iniciada")
-                    time.sleep(10)  # Esperar a que inicie la descarga
+                        archivos_previos = os.listdir(download_folder)
+                        download_button.click()
+                        print(f"Página {page_number}: descarga iniciada")
+
+                    with medir_paso(f"IEEE: descarga (página {page_number})"):
+                        nuevos = esperar_descarga(download_folder, archivos_previos)
+                    if not nuevos:
+                        raise TimeoutException("la descarga no terminó")
+                    print(f"Página {page_number}: descargado {', '.join(nuevos)}")
+                    registrar_pagina(download_folder, checkpoint, page_number, nuevos, n_resultados)
+                    procesadas += 1
 
                     page_success = True
 
@@ -259,36 +254,31 @@ def scrape_IEE():
                         print(f"No se pudo procesar la página {page_number} después de {max_retries} intentos")
                         break
 
-            # Cerrar el modal
-            if page_success:
+            if not page_success:
+                print(f"La próxima ejecución continuará desde la página {page_number}.")
+                driver.quit()
+                return False
+
+            # Cerrar el modal (solo se abrió si se usó el navegador)
+            if driver.find_elements(By.XPATH, "//div[contains(@class, 'modal-dialog')]"):
                 close_modal_safely(driver)
 
             # Verificar si hay página siguiente
-            has_next, next_element = has_next_page(driver)
-
+            has_next, _ = has_next_page(driver)
             if not has_next:
+                registrar_fin(download_folder, checkpoint, page_number)
                 print("No hay más páginas disponibles. Proceso completado.")
                 break
 
-            # Ir a la siguiente página
-            try:
-                driver.execute_script("arguments[0].scrollIntoView(true);", next_element)
-                time.sleep(1)
-                next_element.click()
-                print(f"Navegando a página {page_number + 1}")
-                page_number += 1
-                wait_for_page_load(driver)
-
-            except Exception as e:
-                print(f"Error navegando a la siguiente página: {e}")
-                break
-
     except Exception as e:
         print(f"Error durante el proceso: {e}")
+        driver.quit()
+        return False
 
-    print(f"Proceso completado. Se procesaron {page_number} páginas.")
+    print(f"Proceso completado. Se procesaron {procesadas} páginas.")
     driver.quit()
+    return True
 
 
 if __name__ == "__main__":
-    scrape_IEE()
\ No newline at end of file
+    scrape_IEE()
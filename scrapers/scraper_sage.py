@@ -4,90 +4,74 @@ from dotenv import load_dotenv
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support.ui import Select
 from selenium.webdriver.support import expected_conditions as EC
+from navegador import (crear_opciones_chrome, medir_paso, esperar_pagina_cargada, esperar_condicion,
+                       esperar_descarga, iniciar_sesion, DIR_DESCARGAS)
+from checkpoint import cargar_checkpoint, registrar_pagina, registrar_fin, paginas_pendientes
+from exportacion_directa import crear_sesion_desde_driver, exportar_sage
 
 # Cargar variables de entorno
 load_dotenv()
 
 # Configurar carpeta de descargas
-DOWNLOAD_FOLDER = os.path.join(os.path.dirname(__file__), "..", "downloads/sage")
+DOWNLOAD_FOLDER = os.path.join(DIR_DESCARGAS, "sage")
 if not os.path.exists(DOWNLOAD_FOLDER):
     os.makedirs(DOWNLOAD_FOLDER)
 
-# Configurar opciones de Chrome
-chrome_options = Options()
-chrome_options.add_experimental_option("prefs", {
-    "download.default_directory": os.path.abspath(DOWNLOAD_FOLDER),
-    "download.prompt_for_download": False,
-    "download.directory_upgrade": True,
-    "safebrowsing.enabled": True
-})
-chrome_options.add_argument("--disable-gpu")
-chrome_options.add_argument("--no-sandbox")
+# URL base (a través del proxy CRAI); se puede cambiar para apuntar a páginas de prueba locales
+BASE_URL = os.getenv("SAGE_BASE_URL", "https://journals-sagepub-com.crai.referencistas.com")
 
+# Páginas de 100 resultados que se descargan si no se indica otro rango
+MAX_PAGES_TO_DOWNLOAD = 1
 
-def scrape_sage():
-    """Extrae artículos de SAGE, descarga citas en formato BibTeX y recorre varias páginas."""
+
+def scrape_sage(headless=False, download_folder=DOWNLOAD_FOLDER, paginas=None, reiniciar=False,
+                exportacion_directa=True):
+    """
+    Extrae artículos de SAGE y descarga sus citas en BibTeX para las páginas indicadas
+    (inicio, fin), omitiendo las ya exportadas según el checkpoint. Con exportacion_directa
+    las citas se piden por HTTP y el diálogo Export queda como respaldo. Devuelve True si terminó.
+    """
 
     EMAIL = os.getenv("EMAIL")
     PASSWORD = os.getenv("PASSWORD")
 
-    if not EMAIL or not PASSWORD:
-        print("❌ Error: Variables de entorno EMAIL y PASSWORD no están configuradas.")
-        return
-
     SEARCH_TERM = "generative artificial intelligence"
     current_year = int(time.strftime("%Y"))
     start_year = current_year - 4 
 
-    LOGIN_URL = f"https://journals-sagepub-com.crai.referencistas.com/action/doSearch?AllField={SEARCH_TERM.replace(' ', '+')}&startPage=1&target=default&content=articlesChapters&pageSize=100&AfterYear={start_year}&BeforeYear={current_year}"
-    driver = webdriver.Chrome(options=chrome_options)
+    def url_pagina(numero):
+        # startPage empieza en 0 en el buscador de SAGE
+        return (f"{BASE_URL}/action/doSearch?AllField={SEARCH_TERM.replace(' ', '+')}&startPage={numero - 1}"
+                f"&target=default&content=articlesChapters&pageSize=100&AfterYear={start_year}&BeforeYear={current_year}")
 
-    try:
-        driver.get(LOGIN_URL)
-        time.sleep(3)
+    pagina_inicio, pagina_fin = paginas or (1, MAX_PAGES_TO_DOWNLOAD)
+    consulta = {"termino": SEARCH_TERM, "desde": start_year, "hasta": current_year}
+    checkpoint = cargar_checkpoint(download_folder, "sage", consulta, reiniciar)
+    pendientes = paginas_pendientes(checkpoint, pagina_inicio, pagina_fin)
+    if not pendientes:
+        print(f"Las páginas {pagina_inicio}-{pagina_fin} ya están descargadas (checkpoint).")
+        return True
+    print(f"Páginas pendientes: {', '.join(map(str, pendientes))}")
 
+    driver = webdriver.Chrome(options=crear_opciones_chrome(download_folder, headless))
+    fallidas = []
+
+    try:
         # ------------------ LOGIN ------------------
         try:
-            google_login_button = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.ID, "btn-google"))
-            )
-            google_login_button.click()
-            time.sleep(3)
-
-            main_window = driver.current_window_handle
-            for handle in driver.window_handles:
-                if handle != main_window:
-                    driver.switch_to.window(handle)
-                    break
-
-            email_input = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "identifierId"))
-            )
-            email_input.send_keys(EMAIL)
-            email_input.send_keys(Keys.RETURN)
-            time.sleep(2)
-
-            password_input = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.NAME, "Passwd"))
-            )
-            password_input.send_keys(PASSWORD)
-            password_input.send_keys(Keys.RETURN)
-            time.sleep(5)
-
-            if len(driver.window_handles) > 1:
-                driver.switch_to.window(main_window)
-
-            time.sleep(10)
+            with medir_paso("SAGE: carga inicial y sesión"):
+                iniciar_sesion(driver, url_pagina(pendientes[0]), EMAIL, PASSWORD, (By.CSS_SELECTOR, ".search__item"))
+                # La lista de resultados indica que la sesión quedó abierta
+                WebDriverWait(driver, 30).until(
+                    EC.presence_of_element_located((By.ID, "action-bar-select-all"))
+                )
             print("Login exitoso")
         except Exception as e:
             print(f"Error durante el inicio de sesión: {e}")
-            driver.quit()
-            return
+            return False
 
         # ------------------ ACEPTAR COOKIES ------------------
         try:
@@ -95,63 +79,94 @@ def scrape_sage():
                 EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Accept Non-Essential Cookies')]"))
             )
             aceptCookies.click()
+            esperar_condicion(driver, EC.invisibility_of_element(aceptCookies), 5)
             print("Cookies aceptadas")
-            time.sleep(2)
         except:
             print("Botón de cookies no encontrado o ya aceptado.")
 
-        MAX_PAGES_TO_DOWNLOAD = 1
-
         # ------------------ ITERAR PÁGINAS ------------------
-        for page in range(1, MAX_PAGES_TO_DOWNLOAD+1):
+        sesion_http = crear_sesion_desde_driver(driver) if exportacion_directa else None
+        for page in pendientes:
             print(f"Procesando página {page}")
 
-            time.sleep(5)
+            if page != pendientes[0]:
+                with medir_paso(f"SAGE: navegación a página {page}"):
+                    driver.get(url_pagina(page))
+            esperar_pagina_cargada(driver)
+
+            if sesion_http:
+                esperar_condicion(driver, EC.presence_of_element_located((By.CSS_SELECTOR, ".search__item")), 15)
+                with medir_paso(f"SAGE: exportación directa (página {page})"):
+                    nuevos = exportar_sage(sesion_http, driver, BASE_URL, download_folder, page)
+                if nuevos:
+                    n_resultados = len(driver.find_elements(By.CSS_SELECTOR, ".search__item"))
+                    print(f"Página {page}: descargado {', '.join(nuevos)} (exportación directa)")
+                    registrar_pagina(download_folder, checkpoint, page, nuevos, n_resultados)
+                    if not driver.find_elements(By.XPATH, "//li[contains(@class, 'page-item__arrow--next')]/a"):
+                        registrar_fin(download_folder, checkpoint, page)
+                        print("No hay más páginas disponibles.")
+                        break
+                    continue
 
             try:
-                checkbox = WebDriverWait(driver, 15).until(
-                    EC.element_to_be_clickable((By.ID, "action-bar-select-all"))
-                )
-                driver.execute_script("arguments[0].scrollIntoView();", checkbox)
-                driver.execute_script("arguments[0].click();", checkbox)
+                with medir_paso(f"SAGE: selección (página {page})"):
+                    checkbox = WebDriverWait(driver, 15).until(
+                        EC.element_to_be_clickable((By.ID, "action-bar-select-all"))
+                    )
+                    n_resultados = len(driver.find_elements(By.CSS_SELECTOR, ".search__item"))
+                    driver.execute_script("arguments[0].scrollIntoView();", checkbox)
+                    driver.execute_script("arguments[0].click();", checkbox)
+                    esperar_condicion(driver, lambda d: checkbox.is_selected(), 5)
                 print(f"Página {page}: artículos seleccionados")
-                time.sleep(3)
             except Exception as e:
                 print(f"Error al seleccionar resultados en página {page}: {e}")
+                fallidas.append(page)
                 continue
 
             try:
-                export_button = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.XPATH, "//a[contains(@class, 'export-citation')]"))
-                )
-                driver.execute_script("arguments[0].scrollIntoView();", export_button)
-                ActionChains(driver).move_to_element(export_button).click().perform()
-                print("Botón Export clickeado")
-                time.sleep(10)
+                with medir_paso(f"SAGE: diálogo de exportación (página {page})"):
+                    export_button = WebDriverWait(driver, 10).until(
+                        EC.element_to_be_clickable((By.XPATH, "//a[contains(@class, 'export-citation')]"))
+                    )
+                    driver.execute_script("arguments[0].scrollIntoView();", export_button)
+                    ActionChains(driver).move_to_element(export_button).click().perform()
+                    print("Botón Export clickeado")
+                    # El diálogo carga el selector de formato por AJAX
+                    citation_dropdown = WebDriverWait(driver, 20).until(
+                        EC.element_to_be_clickable((By.ID, "citation-format"))
+                    )
             except Exception as e:
                 print(f"Error en exportación: {e}")
+                fallidas.append(page)
                 continue
 
             try:
-                citation_dropdown = WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.ID, "citation-format"))
-                )
                 select = Select(citation_dropdown)
                 select.select_by_value("bibtex")
                 print("Formato BibTeX seleccionado")
-                time.sleep(5)
             except Exception as e:
                 print(f"Error al seleccionar BibTeX: {e}")
+                fallidas.append(page)
                 continue
 
             try:
-                WebDriverWait(driver, 15).until(
-                    EC.element_to_be_clickable((By.XPATH, "//a[contains(text(), 'Download citation')]"))
-                ).click()
-                print("Descarga iniciada")
-                time.sleep(8)
+                with medir_paso(f"SAGE: descarga (página {page})"):
+                    download_link = WebDriverWait(driver, 15).until(
+                        EC.element_to_be_clickable((By.XPATH, "//a[contains(text(), 'Download citation')]"))
+                    )
+                    archivos_previos = os.listdir(download_folder)
+                    download_link.click()
+                    print("Descarga iniciada")
+                    nuevos = esperar_descarga(download_folder, archivos_previos)
+                if not nuevos:
+                    print(f"La descarga de la página {page} no terminó a tiempo")
+                    fallidas.append(page)
+                    continue
+                print(f"Página {page}: descargado {', '.join(nuevos)}")
+                registrar_pagina(download_folder, checkpoint, page, nuevos, n_resultados)
             except Exception as e:
                 print(f"Error al hacer clic en Download: {e}")
+                fallidas.append(page)
                 continue
 
             try:
@@ -159,32 +174,27 @@ def scrape_sage():
                     EC.element_to_be_clickable((By.XPATH, "//button[contains(@alt, 'close')]"))
                 )
                 close_button.click()
+                esperar_condicion(driver, EC.invisibility_of_element(close_button), 5)
                 print("Diálogo de exportación cerrado")
-                time.sleep(2)
             except:
                 print("No se pudo cerrar el diálogo, continuando...")
 
-            if page == MAX_PAGES_TO_DOWNLOAD:
-                print(f"Límite de {MAX_PAGES_TO_DOWNLOAD} páginas alcanzado.")
-                break
-
-            try:
-                next_button = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.XPATH, "//li[contains(@class, 'page-item__arrow--next')]/a"))
-                )
-                ActionChains(driver).move_to_element(next_button).click().perform()
-                print(f"Navegando a la página {page + 1}")
-                time.sleep(5)
-            except:
+            if not driver.find_elements(By.XPATH, "//li[contains(@class, 'page-item__arrow--next')]/a"):
+                registrar_fin(download_folder, checkpoint, page)
                 print("No hay más páginas disponibles.")
                 break
 
     except Exception as e:
         print(f"Error general: {e}")
+        return False
     finally:
         print("Finalizando extractor SAGE...")
         driver.quit()
 
+    if fallidas:
+        print(f"Páginas con errores (se reintentarán en la próxima ejecución): {', '.join(map(str, fallidas))}")
+    return not fallidas
+
 
 if __name__ == "__main__":
-    scrape_sage()
\ No newline at end of file
+    scrape_sage()
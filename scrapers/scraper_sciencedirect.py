@@ -4,29 +4,29 @@ import time
 from dotenv import load_dotenv
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from navegador import (crear_opciones_chrome, medir_paso, esperar_condicion, esperar_cambio_pagina,
+                       esperar_pagina_cargada, esperar_descarga, iniciar_sesion, DIR_DESCARGAS)
+from checkpoint import cargar_checkpoint, registrar_pagina, registrar_fin, paginas_pendientes
+from exportacion_directa import crear_sesion_desde_driver, exportar_sciencedirect
 
 load_dotenv()
 
-DOWNLOAD_FOLDER = os.path.join(os.path.dirname(__file__), "..", "downloads", "science_direct")
+DOWNLOAD_FOLDER = os.path.join(DIR_DESCARGAS, "science_direct")
 os.makedirs(DOWNLOAD_FOLDER, exist_ok=True)
 
-chrome_options = Options()
-chrome_options.add_experimental_option("prefs", {
-    "download.default_directory": os.path.abspath(DOWNLOAD_FOLDER),
-    "download.prompt_for_download": False,
-    "download.directory_upgrade": True,
-    "safebrowsing.enabled": True,
-})
+# URL base (a través del proxy CRAI); se puede cambiar para apuntar a páginas de prueba locales
+BASE_URL = os.getenv("SCIENCEDIRECT_BASE_URL", "https://www-sciencedirect-com.crai.referencistas.com")
 
+# Páginas de 100 resultados que se descargan si no se indica otro rango
+MAX_PAGES_TO_DOWNLOAD = 1
 
-def save_debug_artifacts(driver, name_prefix="debug"):
+
+def save_debug_artifacts(driver, name_prefix="debug", download_folder=DOWNLOAD_FOLDER):
     """Solo guarda el HTML snippet para debug críticos únicamente"""
-    html_path = os.path.join(DOWNLOAD_FOLDER, f"{name_prefix}_html_snippet.txt")
+    html_path = os.path.join(download_folder, f"{name_prefix}_html_snippet.txt")
     try:
         html = driver.page_source
         with open(html_path, "w", encoding="utf-8") as f:
@@ -68,58 +68,6 @@ def click_element_fallbacks(driver, elem, desc="element"):
                 return False, "failed clicks"
 
 
-def change_results_per_page(driver, results_count=100):
-    """Cambia el número de resultados por página"""
-    try:
-        print(f"Intentando cambiar a {results_count} resultados por página...")
-
-        # Buscar el dropdown o botón para cambiar resultados por página
-        selectors = [
-            f"//span[contains(@class, 'anchor-text') and contains(text(), '{results_count}')]",
-            f"button[aria-label*='{results_count}']",
-            f"a[aria-label*='{results_count}']",
-            f"//option[contains(text(), '{results_count}')]",
-            ".results-per-page-selector",
-            ".page-size-selector",
-            "[data-testid*='page-size']"
-        ]
-
-        for selector in selectors:
-            try:
-                if selector.startswith("//"):
-                    elem = driver.find_element(By.XPATH, selector)
-                else:
-                    elem = driver.find_element(By.CSS_SELECTOR, selector)
-
-                if elem.is_displayed() and elem.is_enabled():
-                    print(f"Encontrado selector de resultados con: {selector}")
-
-                    # Hacer scroll y click
-                    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", elem)
-                    time.sleep(1)
-
-                    ok, how = click_element_fallbacks(driver, elem, f"results_{results_count}")
-                    if ok:
-                        print(f"Cambiado a {results_count} resultados por página")
-
-                        # Esperar a que se recargue la página con más resultados
-                        time.sleep(5)
-                        WebDriverWait(driver, 15).until(
-                            EC.presence_of_element_located((By.TAG_NAME, "body"))
-                        )
-                        time.sleep(3)
-                        return True
-            except Exception:
-                continue
-
-        print(f"No se pudo cambiar a {results_count} resultados por página, continuando...")
-        return False
-
-    except Exception as e:
-        print(f"Error cambiando resultados por página: {e}")
-        return False
-
-
 def get_current_page_number(driver):
     """Obtiene el número de la página actual con múltiples métodos"""
     try:
@@ -233,70 +181,11 @@ def is_next_button_disabled(driver):
         return False
 
 
-def go_to_next_page(driver):
-    """Intenta navegar a la siguiente página"""
-    try:
-        # Primero verificar si estamos en la última página
-        if is_next_button_disabled(driver):
-            return False
-
-        # Intentar diferentes selectores para el botón "Next"
-        next_selectors = [
-            "//span[contains(@class, 'anchor-text') and contains(text(), 'next')]",
-            "//span[contains(@class, 'anchor-text') and contains(text(), 'Next')]",
-            "button[aria-label*='Next']",
-            "button[aria-label*='Siguiente']",
-            ".pagination-next",
-            ".next-page",
-            "a[aria-label*='Next']",
-            "a[aria-label*='Siguiente']",
-            "//button[contains(text(), 'Next')]",
-            "//button[contains(text(), 'Siguiente')]",
-            "//a[contains(text(), 'Next')]",
-            "//a[contains(text(), 'Siguiente')]"
-        ]
-
-        for selector in next_selectors:
-            try:
-                if selector.startswith("//"):
-                    next_btn = driver.find_element(By.XPATH, selector)
-                else:
-                    next_btn = driver.find_element(By.CSS_SELECTOR, selector)
-
-                if next_btn.is_enabled() and next_btn.is_displayed():
-                    print(f"Encontrado botón siguiente con selector: {selector}")
-
-                    # Scroll al botón
-                    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", next_btn)
-                    time.sleep(1)
-
-                    ok, how = click_element_fallbacks(driver, next_btn, "next_button")
-                    if ok:
-                        print(f"Navegando a siguiente página usando: {selector}")
-
-                        # Esperar a que cargue la nueva página
-                        WebDriverWait(driver, 15).until(
-                            EC.presence_of_element_located((By.TAG_NAME, "body"))
-                        )
-                        time.sleep(5)  # Esperar más tiempo para que cargue completamente
-
-                        return True
-            except Exception:
-                continue
-
-        print("No se pudo encontrar el botón de siguiente página")
-        return False
-
-    except Exception:
-        return False
-
-
 def select_all_articles(driver):
     """Selecciona todos los artículos de la página actual con múltiples métodos"""
     try:
         # Primero eliminar overlays que puedan estar tapando el checkbox
         remove_common_overlays(driver)
-        time.sleep(1)
 
         # Método 1: Checkbox principal por ID (con wait)
         try:
@@ -304,13 +193,12 @@ def select_all_articles(driver):
                 EC.element_to_be_clickable((By.ID, "select-all-results"))
             )
             driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", checkbox)
-            time.sleep(1)
 
             # Verificar si ya está seleccionado
             if not checkbox.is_selected():
                 driver.execute_script("arguments[0].click();", checkbox)
                 print("Checkbox de selección clickeado (por ID)")
-                time.sleep(2)
+                esperar_condicion(driver, lambda d: checkbox.is_selected(), 5)
 
                 # Verificar que se seleccionó correctamente
                 if checkbox.is_selected():
@@ -330,12 +218,11 @@ def select_all_articles(driver):
             for checkbox in select_all_checkboxes:
                 try:
                     driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", checkbox)
-                    time.sleep(1)
 
                     if not checkbox.is_selected():
                         driver.execute_script("arguments[0].click();", checkbox)
                         print("Checkbox de selección clickeado (por aria-label/title)")
-                        time.sleep(2)
+                        esperar_condicion(driver, lambda d: checkbox.is_selected(), 5)
                         return True
                 except:
                     continue
@@ -357,12 +244,11 @@ def select_all_articles(driver):
             try:
                 checkbox = driver.find_element(By.CSS_SELECTOR, selector)
                 driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", checkbox)
-                time.sleep(1)
 
                 if not checkbox.is_selected():
                     driver.execute_script("arguments[0].click();", checkbox)
                     print(f"Checkbox de selección clickeado (selector: {selector})")
-                    time.sleep(2)
+                    esperar_condicion(driver, lambda d: checkbox.is_selected(), 5)
                     return True
             except:
                 continue
@@ -375,7 +261,6 @@ def select_all_articles(driver):
                 try:
                     # Buscar el checkbox asociado o hacer click directo
                     driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", elem)
-                    time.sleep(1)
 
                     # Intentar encontrar un checkbox cercano
                     parent = elem.find_element(By.XPATH, "..")
@@ -386,13 +271,12 @@ def select_all_articles(driver):
                             if not cb.is_selected():
                                 driver.execute_script("arguments[0].click();", cb)
                                 print("Checkbox encontrado cerca de texto 'Select all'")
-                                time.sleep(2)
+                                esperar_condicion(driver, lambda d: cb.is_selected(), 5)
                                 return True
                     else:
                         # Click directo en el elemento de texto
                         driver.execute_script("arguments[0].click();", elem)
                         print("Elemento de texto 'Select all' clickeado directamente")
-                        time.sleep(2)
                         return True
                 except:
                     continue
@@ -405,14 +289,13 @@ def select_all_articles(driver):
         return False
 
 
-def download_current_page(driver, page_number):
-    """Descarga los artículos de la página actual"""
+def download_current_page(driver, page_number, download_folder=DOWNLOAD_FOLDER):
+    """Descarga los artículos de la página actual. Devuelve los archivos descargados ([] si falló)"""
     try:
         print(f"Iniciando descarga para página {page_number}...")
 
         # Eliminar overlays por si tapan el botón
         remove_common_overlays(driver)
-        time.sleep(2)
 
         # --- Seleccionar todos los artículos ---
         if not select_all_articles(driver):
@@ -447,15 +330,14 @@ def download_current_page(driver, page_number):
 
             desc = cand.tag_name + " / " + (cand.get_attribute("class") or "")[:120]
             driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", cand)
-            time.sleep(0.5)
 
             ok, how = click_element_fallbacks(driver, cand, desc)
             print(f"  intento {idx + 1}: {desc} -> {ok} ({how})")
-            time.sleep(2)
 
             # Verificar si apareció el menú de BibTeX
             try:
-                bib = driver.find_elements(By.XPATH, "//span[contains(text(), 'Export citation to BibTeX')]")
+                bib = esperar_condicion(driver, EC.presence_of_element_located(
+                    (By.XPATH, "//span[contains(text(), 'Export citation to BibTeX')]")), 3)
                 if bib:
                     export_clicked = True
                     print("Menú Export abierto (se detectó la opción BibTeX).")
@@ -465,7 +347,7 @@ def download_current_page(driver, page_number):
 
         if not export_clicked:
             print("No logré abrir el menú Export automáticamente.")
-            return False
+            return []
 
         # --- Click en Export citation to BibTeX ---
         try:
@@ -473,8 +355,8 @@ def download_current_page(driver, page_number):
                 EC.element_to_be_clickable((By.XPATH, "//span[contains(text(), 'Export citation to BibTeX')]"))
             )
             driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", bib_span)
-            time.sleep(1)
 
+            archivos_previos = os.listdir(download_folder)
             ok, how = click_element_fallbacks(driver, bib_span, "bibtex_span")
             print(f"Intento click BibTeX -> {ok} via {how}")
             if not ok:
@@ -484,20 +366,29 @@ def download_current_page(driver, page_number):
 
             # Esperar a que se complete la descarga
             print("Esperando a que se complete la descarga...")
-            time.sleep(10)
-
-            return True
+            with medir_paso(f"ScienceDirect: descarga (página {page_number})"):
+                nuevos = esperar_descarga(download_folder, archivos_previos)
+            if not nuevos:
+                return []
+            print(f"Descargado: {', '.join(nuevos)}")
+            return nuevos
 
         except Exception as e:
             print(f"Error al clicar BibTeX: {e}")
-            return False
+            return []
 
     except Exception as e:
         print(f"Error en descarga de página {page_number}: {e}")
-        return False
+        return []
 
 
-def science_test_debug():
+def science_test_debug(headless=False, download_folder=DOWNLOAD_FOLDER, paginas=None, reiniciar=False,
+                       exportacion_directa=True):
+    """
+    Descarga de ScienceDirect los resultados en BibTeX de las páginas indicadas (inicio, fin),
+    omitiendo las ya exportadas según el checkpoint. Con exportacion_directa el BibTeX se
+    pide por HTTP y el flujo del navegador queda como respaldo. Devuelve True si terminó.
+    """
     EMAIL = os.getenv("EMAIL")
     PASSWORD = os.getenv("PASSWORD")
 
@@ -505,97 +396,95 @@ def science_test_debug():
     start_year = current_year - 4
 
     SEARCH_TERM = "generative artificial intelligence"
-    LOGIN_URL = f"https://www-sciencedirect-com.crai.referencistas.com/search?qs={SEARCH_TERM.replace(' ', '%20')}&date={start_year}-{current_year}&show=100"
-    
-    driver = webdriver.Chrome(options=chrome_options)
-    driver.get(LOGIN_URL)
-    time.sleep(5)
 
-    try:
-        # --- LOGIN ---
-        google_login_button = WebDriverWait(driver, 15).until(
-            EC.element_to_be_clickable((By.ID, "btn-google"))
-        )
-        google_login_button.click()
-        time.sleep(4)
-
-        main_window = driver.current_window_handle
-        for handle in driver.window_handles:
-            if handle != main_window:
-                driver.switch_to.window(handle)
-                break
+    def url_pagina(numero):
+        # ScienceDirect pagina con offset (resultados saltados), 100 por página
+        return (f"{BASE_URL}/search?qs={SEARCH_TERM.replace(' ', '%20')}&date={start_year}-{current_year}"
+                f"&show=100&offset={(numero - 1) * 100}")
 
-        email_input = WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.ID, "identifierId")))
-        email_input.send_keys(EMAIL)
-        email_input.send_keys(Keys.RETURN)
-        time.sleep(3)
+    pagina_inicio, pagina_fin = paginas or (1, MAX_PAGES_TO_DOWNLOAD)
+    consulta = {"termino": SEARCH_TERM, "desde": start_year, "hasta": current_year}
+    checkpoint = cargar_checkpoint(download_folder, "sciencedirect", consulta, reiniciar)
+    pendientes = paginas_pendientes(checkpoint, pagina_inicio, pagina_fin)
+    if not pendientes:
+        print(f"Las páginas {pagina_inicio}-{pagina_fin} ya están descargadas (checkpoint).")
+        return True
+    print(f"Páginas pendientes: {', '.join(map(str, pendientes))}")
 
-        password_input = WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.NAME, "Passwd")))
-        password_input.send_keys(PASSWORD)
-        password_input.send_keys(Keys.RETURN)
-        time.sleep(10)
+    driver = webdriver.Chrome(options=crear_opciones_chrome(download_folder, headless))
+    completado = False
 
-        driver.switch_to.window(main_window)
+    try:
+        # --- LOGIN ---
+        with medir_paso("ScienceDirect: carga inicial y sesión"):
+            iniciar_sesion(driver, url_pagina(pendientes[0]), EMAIL, PASSWORD, (By.CSS_SELECTOR, "li.ResultItem"))
         print("Login completado, procediendo a descarga de todas las páginas.")
 
-        # Asegurarse de que la página ha cargado bien
-        WebDriverWait(driver, 20).until(EC.presence_of_all_elements_located((By.TAG_NAME, "body")))
-        time.sleep(3)
+        # --- 100 RESULTADOS POR PÁGINA ---
+        # Los pide la propia URL (show=100). El selector de tamaño de la página no se usa:
+        # enlaza a la lista sin el offset y haría exportar la página 1 como si fuera la pendiente.
+        if f"offset={(pendientes[0] - 1) * 100}" not in driver.current_url:
+            # El login puede terminar en otra URL: se vuelve a la primera página pendiente
+            driver.get(url_pagina(pendientes[0]))
+            esperar_pagina_cargada(driver)
 
-        # --- CAMBIAR A 100 RESULTADOS POR PÁGINA ---
-        change_results_per_page(driver, 100)
-
-        MAX_PAGES_TO_DOWNLOAD = 1
-        
         downloaded_pages = 0
-        manual_page_counter = 1
+        sesion_http = crear_sesion_desde_driver(driver) if exportacion_directa else None
 
-        while downloaded_pages < MAX_PAGES_TO_DOWNLOAD:
-            current_page = manual_page_counter
-            
+        for current_page in pendientes:
             print(f"\n{'=' * 50}")
             print(f"PROCESANDO PÁGINA {current_page}...")
             print(f"{'=' * 50}")
-            
-            if download_current_page(driver, current_page):
+
+            if current_page != pendientes[0]:
+                with medir_paso(f"ScienceDirect: navegación a página {current_page}"):
+                    resultados_previos = driver.find_elements(By.CSS_SELECTOR, "li.ResultItem")
+                    driver.get(url_pagina(current_page))
+                    if resultados_previos:
+                        esperar_cambio_pagina(driver, resultados_previos[0])
+
+            n_resultados = len(driver.find_elements(By.CSS_SELECTOR, "li.ResultItem"))
+            nuevos = []
+            if sesion_http:
+                with medir_paso(f"ScienceDirect: exportación directa (página {current_page})"):
+                    nuevos = exportar_sciencedirect(sesion_http, driver, BASE_URL, download_folder, current_page)
+            if not nuevos:
+                nuevos = download_current_page(driver, current_page, download_folder)
+            if nuevos:
                 downloaded_pages += 1
+                registrar_pagina(download_folder, checkpoint, current_page, nuevos, n_resultados)
                 print(f"Página {current_page} descargada exitosamente.")
             else:
-                print(f"Fallo al descargar la página {current_page}. Deteniendo.")
-                break
-            
-            manual_page_counter += 1
-            if downloaded_pages >= MAX_PAGES_TO_DOWNLOAD:
-                print(f"Límite de {MAX_PAGES_TO_DOWNLOAD} páginas alcanzado. Proceso completado.")
+                print(f"Fallo al descargar la página {current_page}. Deteniendo "
+                      f"(la próxima ejecución continuará desde aquí).")
                 break
 
-            print("Intentando navegar a la siguiente página...")
-            if not go_to_next_page(driver):
+            if is_next_button_disabled(driver):
+                registrar_fin(download_folder, checkpoint, current_page)
                 print("No hay más páginas disponibles. Proceso completado.")
                 break
-            
-            time.sleep(3)
 
         print(f"\nPROCESO COMPLETADO")
         print(f"Total de páginas descargadas: {downloaded_pages}")
 
-        final_files = os.listdir(DOWNLOAD_FOLDER)
+        final_files = os.listdir(download_folder)
         bib_final = [f for f in final_files if f.endswith('.bib') or 'bibtex' in f.lower()]
-        other_files = [f for f in final_files if f not in bib_final]
         print(f"Total de archivos BibTeX descargados: {len(bib_final)}")
         if bib_final:
             print("Archivos BibTeX:")
             for bib_file in sorted(bib_final):
                 print(f"   - {bib_file}")
+        completado = not paginas_pendientes(checkpoint, pagina_inicio, pagina_fin)
 
     except Exception as e:
         print(f"Error inesperado en test debug: {e}")
-        save_debug_artifacts(driver, "unexpected_error")
+        save_debug_artifacts(driver, "unexpected_error", download_folder)
     finally:
         try:
             driver.quit()
         except:
             pass
+    return completado
 
 if __name__ == "__main__":
-    science_test_debug()
\ No newline at end of file
+    science_test_debug()
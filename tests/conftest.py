@@ -0,0 +1,52 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+# Mismas rutas de importación que main.py
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(RAIZ, "domain"))
+sys.path.append(os.path.join(RAIZ, "scrapers"))
+
+from servidores import en_hilo  # noqa: E402
+
+
+@pytest.fixture
+def servidor_openalex():
+    """OpenAlex/ROR falso con las obras de obras_prueba (y 116 generadas, para los lotes)."""
+    from openalex_falso import crear_servidor_openalex, obras_prueba
+    obras, _ = obras_prueba(n_generadas=116)
+    with en_hilo(crear_servidor_openalex(obras)) as servidor:
+        yield servidor
+
+
+@pytest.fixture
+def cache_paises(tmp_path):
+    from cache_paises import CachePaises
+    cache = CachePaises(ruta=str(tmp_path / "cache.sqlite"))
+    yield cache
+    cache.cerrar()
+
+
+@pytest.fixture
+def servidor_sitios(monkeypatch):
+    """Sitios falsos de IEEE, SAGE y ScienceDirect, con las URLs base de los scrapers apuntando a ellos."""
+    from sitios_falsos import crear_servidor_sitios, url_fuente, FUENTES_PRUEBA
+    with en_hilo(crear_servidor_sitios()) as servidor:
+        for fuente, (variable, _) in FUENTES_PRUEBA.items():
+            monkeypatch.setenv(variable, url_fuente(servidor, fuente))
+        yield servidor
+
+
+@pytest.fixture(scope="session")
+def chrome(tmp_path_factory):
+    """Las pruebas que abren el navegador se omiten si no hay un Chrome headless disponible."""
+    from selenium import webdriver
+    from navegador import crear_opciones_chrome
+    carpeta = str(tmp_path_factory.mktemp("chrome"))
+    try:
+        driver = webdriver.Chrome(options=crear_opciones_chrome(carpeta, headless=True))
+    except Exception as e:
+        pytest.skip(f"no se pudo abrir Chrome ({type(e).__name__})")
+    driver.quit()
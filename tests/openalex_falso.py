@@ -0,0 +1,97 @@
+# tests/openalex_falso.py
+import json
+import time
+from urllib.parse import urlsplit, unquote, parse_qs
+
+from utils import normalizar_doi
+from servidores import ManejadorPrueba, ServidorPrueba
+
+# Servidor local que imita OpenAlex y ROR para probar la resolución de países sin red.
+# Cada respuesta tarda RETARDO_S, así se nota si las consultas van en paralelo.
+RETARDO_S = 0.05
+
+# ROR id -> país (ISO alpha-2)
+ORGANIZACIONES = {"05prueba1": "ES"}
+
+
+def _obra(doi, pais=None, ror=None, autores=True):
+    instituciones = [{"country_code": pais, "ror": f"https://ror.org/{ror}" if ror else None}]
+    autorias = [{"institutions": instituciones}] if autores else []
+    return {"doi": f"https://doi.org/{doi}", "authorships": autorias}
+
+
+def obras_prueba(n_generadas=0):
+    """
+    Obras que conoce el servidor (DOI normalizado -> obra) y el país esperado por DOI.
+    Incluye país directo, país solo vía ROR, obra sin autores y n_generadas obras más.
+    """
+    obras = {
+        "10.1000/directo": _obra("10.1000/directo", pais="CO"),
+        "10.1000/via-ror": _obra("10.1000/via-ror", ror="05prueba1"),
+        "10.1000/sin-autores": _obra("10.1000/sin-autores", autores=False),
+        "10.1000/reintento": _obra("10.1000/reintento", pais="US"),
+        "10.1000/mayusculas": _obra("10.1000/mayusculas", pais="BR"),
+    }
+    esperado = {"10.1000/directo": "COL", "10.1000/via-ror": "ESP", "10.1000/sin-autores": None,
+                "10.1000/reintento": "USA", "https://doi.org/10.1000/MAYUSCULAS": "BRA",
+                "10.1000/no-existe": None}
+    paises = ["CO", "MX", "AR", "ES", "DE"]
+    iso3 = {"CO": "COL", "MX": "MEX", "AR": "ARG", "ES": "ESP", "DE": "DEU"}
+    for i in range(n_generadas):
+        doi = f"10.1000/generado.{i}"
+        obras[doi] = _obra(doi, pais=paises[i % len(paises)])
+        esperado[doi] = iso3[paises[i % len(paises)]]
+    return obras, esperado
+
+
+class ManejadorOpenAlex(ManejadorPrueba):
+    """
+    Rutas: /works/https://doi.org/<doi> y /works?filter=doi:a|b|c (OpenAlex) y
+    /ror/<id>.json (ROR). Anota 'obra', 'lote' (con dois, per_page y select) y 'ror'.
+    """
+
+    def _json(self, codigo, datos=None):
+        self._responder(codigo, json.dumps(datos or {}), "application/json")
+
+    def do_GET(self):
+        servidor = self.server
+        with servidor.candado:
+            servidor.en_curso += 1
+            servidor.max_en_curso = max(servidor.max_en_curso, servidor.en_curso)
+        try:
+            time.sleep(RETARDO_S)
+            self._consultar(urlsplit(self.path))
+        finally:
+            with servidor.candado:
+                servidor.en_curso -= 1
+
+    def _consultar(self, url):
+        servidor = self.server
+        ruta = unquote(url.path)
+        if ruta.startswith("/ror/"):
+            servidor.registrar("ror")
+            pais = ORGANIZACIONES.get(ruta[len("/ror/"):].removesuffix(".json"))
+            return self._json(200, {"country": {"country_code": pais}}) if pais else self._json(404)
+
+        if ruta.startswith("/works/"):
+            servidor.registrar("obra")
+            doi = normalizar_doi(ruta[len("/works/"):])
+            # La primera consulta de este DOI responde 429, para probar el backoff
+            if doi == "10.1000/reintento" and servidor.registrar("limitado") == 1:
+                return self._json(429)
+            obra = servidor.obras.get(doi)
+            return self._json(200, obra) if obra else self._json(404)
+
+        if ruta == "/works":
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            dois = [normalizar_doi(d) for d in params.get("filter", "").removeprefix("doi:").split("|") if d]
+            servidor.registrar("lote", {"dois": len(dois), "per_page": int(params.get("per-page", 25)),
+                                        "select": params.get("select")})
+            # Como OpenAlex: solo las obras que conoce, sin orden garantizado
+            resultados = [servidor.obras[d] for d in sorted(set(dois), reverse=True) if d in servidor.obras]
+            return self._json(200, {"meta": {"count": len(resultados)}, "results": resultados})
+        self._json(404)
+
+
+def crear_servidor_openalex(obras):
+    return ServidorPrueba(ManejadorOpenAlex, obras=obras, en_curso=0, max_en_curso=0)
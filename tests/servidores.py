@@ -0,0 +1,74 @@
+# tests/servidores.py
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Base común de los servidores HTTP falsos de las pruebas (OpenAlex/ROR y sitios de los scrapers)
+
+
+class ManejadorPrueba(BaseHTTPRequestHandler):
+    """Manejador sin log por petición, con un atajo para responder texto."""
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, codigo, cuerpo, tipo):
+        datos = cuerpo.encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+
+class ServidorPrueba(ThreadingHTTPServer):
+    """
+    Servidor en un puerto libre de 127.0.0.1 que anota cada petición como (tipo, valor),
+    para que las pruebas comprueben qué se pidió y cuántas veces.
+    Los atributos extra (p. ej. las obras o el modo de exportación) se pasan por nombre.
+    """
+    daemon_threads = True
+
+    def __init__(self, manejador, **atributos):
+        super().__init__(("127.0.0.1", 0), manejador)
+        self.candado = threading.Lock()
+        self.peticiones = []
+        for nombre, valor in atributos.items():
+            setattr(self, nombre, valor)
+
+    def registrar(self, tipo, valor=None):
+        """Anota una petición y devuelve cuántas van de ese tipo (contándola)."""
+        with self.candado:
+            self.peticiones.append((tipo, valor))
+            return sum(1 for t, _ in self.peticiones if t == tipo)
+
+    def pedidas(self, tipo):
+        """Valores anotados de las peticiones de ese tipo, en orden de llegada."""
+        with self.candado:
+            return [v for t, v in self.peticiones if t == tipo]
+
+    @property
+    def llamadas(self):
+        with self.candado:
+            return Counter(t for t, _ in self.peticiones)
+
+    def reiniciar(self):
+        with self.candado:
+            self.peticiones = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+@contextmanager
+def en_hilo(servidor):
+    """Atiende peticiones en un hilo mientras dura el bloque y luego cierra el servidor."""
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    try:
+        yield servidor
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
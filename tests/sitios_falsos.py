@@ -0,0 +1,141 @@
+# tests/sitios_falsos.py
+from urllib.parse import urlsplit, parse_qs
+
+from servidores import ManejadorPrueba, ServidorPrueba
+
+# Servidor local con páginas que imitan los resultados y la exportación BibTeX de
+# IEEE, SAGE y ScienceDirect, para probar los scrapers sin red ni proxy CRAI.
+RESULTADOS_POR_PAGINA = 5
+PAGINAS_TOTALES = 3
+
+# Fuente -> (variable de entorno de su URL base, prefijo en el servidor de prueba)
+FUENTES_PRUEBA = {
+    "ieee": ("IEEE_BASE_URL", "/ieee"),
+    "sage": ("SAGE_BASE_URL", "/sage"),
+    "sciencedirect": ("SCIENCEDIRECT_BASE_URL", "/sd"),
+}
+
+# Ruta de la página de resultados de cada fuente
+RUTAS_BUSQUEDA = {("ieee", "/search/searchresult.jsp"), ("sage", "/action/doSearch"), ("sciencedirect", "/search")}
+
+
+#Identificadores y BibTeX de cada página
+def identificadores(fuente, pagina):
+    """Ids de los resultados de una página: arnumber (IEEE), DOI (SAGE) o PII (ScienceDirect)."""
+    base = (pagina - 1) * RESULTADOS_POR_PAGINA
+    if fuente == "ieee":
+        return [str(9000000 + base + i) for i in range(RESULTADOS_POR_PAGINA)]
+    if fuente == "sage":
+        return [f"10.1177/prueba.{base + i}" for i in range(RESULTADOS_POR_PAGINA)]
+    return [f"S{base + i:016d}" for i in range(RESULTADOS_POR_PAGINA)]
+
+
+def bibtex(fuente, ids):
+    entradas = []
+    for i in ids:
+        clave = "".join(c for c in i if c.isalnum())
+        entradas.append(
+            f"@article{{{fuente}{clave},\n"
+            f"  title = {{Artículo de prueba {i} sobre generative artificial intelligence}},\n"
+            f"  author = {{Autor, Prueba and Otro, Autor}},\n"
+            f"  year = {{2024}},\n"
+            f"  abstract = {{Resumen de prueba del artículo {i}.}},\n"
+            f"}}\n"
+        )
+    return "\n".join(entradas)
+
+
+#Páginas de resultados (solo lo que usan los scrapers)
+def _html_resultados(fuente, pagina):
+    ids = identificadores(fuente, pagina)
+    ultima = pagina >= PAGINAS_TOTALES
+    if fuente == "ieee":
+        items = "".join(f'<div class="List-results-items"><h3><a href="/document/{i}/">Artículo {i}</a></h3></div>'
+                        for i in ids)
+        siguiente = "" if ultima else '<button class="stats-Pagination_arrow_next">&gt;</button>'
+        cookies = '<button class="osano-cm-accept-all" onclick="this.remove()">Accept</button>'
+        extra = ""
+    elif fuente == "sage":
+        items = "".join(f'<div class="search__item"><input type="checkbox" name="doi" value="{i}">'
+                        f'<a href="/doi/{i}">Artículo {i}</a></div>' for i in ids)
+        siguiente = "" if ultima else '<ul><li class="page-item__arrow--next"><a href="#">&gt;</a></li></ul>'
+        cookies = ('<button onclick="this.style.display=\'none\'">Accept Non-Essential Cookies</button>')
+        extra = '<input type="checkbox" id="action-bar-select-all">'
+    else:
+        items = "".join(f'<li class="ResultItem"><a href="/science/article/pii/{i}">Artículo {i}</a></li>'
+                        for i in ids)
+        siguiente = "" if ultima else '<a class="pagination-link next-link"><span class="anchor-text">next</span></a>'
+        cookies = ""
+        # Como en el sitio real, el selector de tamaño vuelve a la lista sin offset (página 1)
+        extra = '<a class="results-per-page" href="search?show=100"><span class="anchor-text">100</span></a>'
+    return (f"<!DOCTYPE html><html><head><title>{fuente} página {pagina}</title></head><body>"
+            f"{cookies}{extra}<ol>{items}</ol>{siguiente}</body></html>")
+
+
+# Página de login del proxy que se devuelve en lugar del BibTeX cuando la sesión no vale
+HTML_LOGIN = ("<!DOCTYPE html><html><head><style>@media (max-width: 600px) { body { margin: 0 } }</style>"
+              "<script>var cfg = {proxy: true};</script></head><body>"
+              "<button id='btn-google'>Ingresar con Google</button></body></html>")
+
+
+class ManejadorSitios(ManejadorPrueba):
+    """Páginas de resultados y exportación de las tres fuentes; anota (fuente, 'pagina'|'exportacion')."""
+
+    def _fuente(self, ruta):
+        for fuente, (_, prefijo) in FUENTES_PRUEBA.items():
+            if ruta.startswith(prefijo + "/"):
+                return fuente, ruta[len(prefijo):]
+        return None, ruta
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        fuente, ruta = self._fuente(url.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if (fuente, ruta) in RUTAS_BUSQUEDA:
+            if fuente == "ieee":
+                pagina = int(params.get("pageNumber", 1))
+            elif fuente == "sage":
+                pagina = int(params.get("startPage", 0)) + 1
+            else:
+                pagina = int(params.get("offset", 0)) // 100 + 1
+            self.server.registrar((fuente, "pagina"), pagina)
+            if pagina > PAGINAS_TOTALES:
+                return self._responder(200, "<html><body>Sin resultados</body></html>", "text/html; charset=utf-8")
+            return self._responder(200, _html_resultados(fuente, pagina), "text/html; charset=utf-8")
+
+        if (fuente, ruta) == ("sciencedirect", "/sdfe/arp/cite"):
+            return self._exportacion(fuente, params.get("pii", "").split(","))
+        self._responder(404, "<html><body>No encontrado</body></html>", "text/html; charset=utf-8")
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        fuente, ruta = self._fuente(url.path)
+        longitud = int(self.headers.get("Content-Length") or 0)
+        datos = parse_qs(self.rfile.read(longitud).decode("utf-8"))
+
+        if (fuente, ruta) == ("ieee", "/xpl/downloadCitations"):
+            return self._exportacion(fuente, datos.get("recordIds", [""])[0].split(","))
+        if (fuente, ruta) == ("sage", "/action/downloadCitation"):
+            return self._exportacion(fuente, datos.get("doi", []))
+        self._responder(404, "<html><body>No encontrado</body></html>", "text/html; charset=utf-8")
+
+    def _exportacion(self, fuente, ids):
+        """Responde según servidor.modo_exportacion: BibTeX, la página de login del proxy o un 500."""
+        ids = [i for i in ids if i]
+        self.server.registrar((fuente, "exportacion"), ids)
+        modo = self.server.modo_exportacion
+        if modo == "login":
+            return self._responder(200, HTML_LOGIN, "text/html; charset=utf-8")
+        if modo == "error":
+            return self._responder(500, "Internal Server Error", "text/plain")
+        self._responder(200, bibtex(fuente, ids), "application/x-bibtex; charset=utf-8")
+
+
+def crear_servidor_sitios():
+    return ServidorPrueba(ManejadorSitios, modo_exportacion="bibtex")
+
+
+def url_fuente(servidor, fuente):
+    """URL base con la que el scraper de la fuente debe hablar con el servidor de prueba."""
+    return servidor.url + FUENTES_PRUEBA[fuente][1]
@@ -0,0 +1,53 @@
+# tests/test_resolucion_paises.py
+import math
+
+from requerimiento5 import resolver_paises
+from openalex_falso import obras_prueba
+
+
+def _resolver(servidor, cache, dois, **opciones):
+    return resolver_paises(dois, cache, solicitudes_por_segundo=0, openalex_url=servidor.url,
+                           ror_url=f"{servidor.url}/ror", **opciones)
+
+
+def test_resolucion_concurrente(servidor_openalex, cache_paises):
+    """DOI por DOI (lotes de uno): país de cada DOI, reintento tras el 429, respaldo ROR y consultas en paralelo."""
+    _, esperado = obras_prueba(n_generadas=12)
+    paises = _resolver(servidor_openalex, cache_paises, list(esperado), max_concurrencia=4, tamano_lote=1)
+
+    assert paises == esperado
+    # Una consulta por DOI más el reintento del 429
+    assert servidor_openalex.llamadas["obra"] == len(esperado) + 1
+    assert servidor_openalex.llamadas["ror"] == 1
+    assert servidor_openalex.max_en_curso > 1
+
+    # La segunda pasada sale entera de la caché
+    servidor_openalex.reiniciar()
+    assert _resolver(servidor_openalex, cache_paises, list(esperado), max_concurrencia=4, tamano_lote=1) == esperado
+    assert not servidor_openalex.llamadas
+
+
+def test_resolucion_por_lotes(servidor_openalex, cache_paises):
+    """Filtro doi:a|b|c: consultas por lote y cada obra de vuelta a su DOI, aunque llegue en otro orden."""
+    tamano_lote = 50
+    _, esperado = obras_prueba(n_generadas=116)
+    # '|' es el separador del filtro: este DOI se consulta solo
+    esperado["10.1000/con|barra"] = None
+    agrupables = [d for d in esperado if "|" not in d]
+
+    paises = _resolver(servidor_openalex, cache_paises, list(esperado), tamano_lote=tamano_lote)
+
+    assert paises == esperado
+    assert servidor_openalex.llamadas["lote"] == math.ceil(len(agrupables) / tamano_lote)
+    assert servidor_openalex.llamadas["obra"] == 1
+    assert servidor_openalex.llamadas["ror"] == 1
+    lotes = servidor_openalex.pedidas("lote")
+    # Cada lote cabe en una sola página de resultados y solo pide doi y authorships
+    assert all(l["dois"] <= tamano_lote and l["per_page"] >= l["dois"] for l in lotes)
+    assert all(l["select"] == "doi,authorships" for l in lotes)
+    # El DOI que OpenAlex no devuelve queda en caché sin país
+    assert cache_paises.get("10.1000/no-existe", "falta") is None
+
+    servidor_openalex.reiniciar()
+    assert _resolver(servidor_openalex, cache_paises, list(esperado), tamano_lote=tamano_lote) == esperado
+    assert not servidor_openalex.llamadas
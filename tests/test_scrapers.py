@@ -0,0 +1,121 @@
+# tests/test_scrapers.py
+import json
+import importlib
+
+import bibtexparser
+import pytest
+import requests
+
+import exportacion_directa
+from checkpoint import ruta_checkpoint
+from orquestador import FUENTES
+from sitios_falsos import (identificadores, url_fuente, FUENTES_PRUEBA, RESULTADOS_POR_PAGINA,
+                           PAGINAS_TOTALES)
+
+# Petición de exportación de cada fuente (método, ruta y cómo van los ids)
+PETICIONES_EXPORTACION = {
+    "ieee": ("POST", "/xpl/downloadCitations", lambda ids: {"data": {"recordIds": ",".join(ids)}}),
+    "sage": ("POST", "/action/downloadCitation", lambda ids: {"data": [("doi", d) for d in ids]}),
+    "sciencedirect": ("GET", "/sdfe/arp/cite", lambda ids: {"params": {"pii": ",".join(ids)}}),
+}
+RUTAS_RESULTADOS = {"ieee": "/search/searchresult.jsp", "sage": "/action/doSearch", "sciencedirect": "/search"}
+
+
+def _bibs(carpeta):
+    return sorted(p.name for p in carpeta.glob("*.bib"))
+
+
+def _exportadas(servidor, fuente):
+    return [tuple(ids) for ids in servidor.pedidas((fuente, "exportacion"))]
+
+
+def _ids_paginas(fuente, paginas):
+    return [tuple(identificadores(fuente, p)) for p in paginas]
+
+
+#Exportación directa por HTTP (sin navegador)
+@pytest.mark.parametrize("fuente", FUENTES_PRUEBA)
+def test_exportacion_directa_guarda_bibtex(servidor_sitios, tmp_path, fuente):
+    metodo, ruta, datos = PETICIONES_EXPORTACION[fuente]
+    ids = identificadores(fuente, 1)
+    with requests.Session() as sesion:
+        archivos = exportacion_directa._exportar(sesion, metodo, url_fuente(servidor_sitios, fuente) + ruta,
+                                                 str(tmp_path), f"{fuente}.bib", **datos(ids))
+
+    assert archivos == [f"{fuente}.bib"]
+    assert len(bibtexparser.loads((tmp_path / f"{fuente}.bib").read_text(encoding="utf-8")).entries) == len(ids)
+
+
+@pytest.mark.parametrize("modo", ["login", "error"])
+@pytest.mark.parametrize("fuente", FUENTES_PRUEBA)
+def test_exportacion_directa_descarta_lo_que_no_es_bibtex(servidor_sitios, tmp_path, fuente, modo):
+    """La página de login del proxy (200, HTML con '@' y llaves) y un 500 no se guardan: se usará el navegador."""
+    servidor_sitios.modo_exportacion = modo
+    metodo, ruta, datos = PETICIONES_EXPORTACION[fuente]
+    with requests.Session() as sesion:
+        archivos = exportacion_directa._exportar(sesion, metodo, url_fuente(servidor_sitios, fuente) + ruta,
+                                                 str(tmp_path), f"{fuente}.bib", **datos(identificadores(fuente, 1)))
+
+    assert archivos == []
+    assert not list(tmp_path.iterdir())
+
+
+#Con navegador (se omiten sin Chrome)
+@pytest.mark.parametrize("fuente", FUENTES_PRUEBA)
+def test_exportar_desde_la_pagina_de_resultados(chrome, servidor_sitios, tmp_path, fuente):
+    from selenium import webdriver
+    from navegador import crear_opciones_chrome
+    exportar = getattr(exportacion_directa, f"exportar_{fuente}")
+    base = url_fuente(servidor_sitios, fuente)
+    driver = webdriver.Chrome(options=crear_opciones_chrome(str(tmp_path), headless=True))
+    try:
+        driver.get(base + RUTAS_RESULTADOS[fuente])
+        sesion = exportacion_directa.crear_sesion_desde_driver(driver)
+        for modo, guardados in (("login", 0), ("bibtex", 1)):
+            servidor_sitios.modo_exportacion = modo
+            servidor_sitios.reiniciar()
+            assert len(exportar(sesion, driver, base, str(tmp_path), 1)) == guardados
+            assert _exportadas(servidor_sitios, fuente) == _ids_paginas(fuente, [1])
+    finally:
+        driver.quit()
+    assert len(_bibs(tmp_path)) == 1
+
+
+def test_orquestador_descarga_todas_las_fuentes(chrome, servidor_sitios, tmp_path, monkeypatch):
+    """Los tres scrapers a la vez, cada uno en su proceso (que lee DESCARGAS_DIR y las URLs al importarse)."""
+    from orquestador import ejecutar_scrapers_en_paralelo
+    monkeypatch.setenv("DESCARGAS_DIR", str(tmp_path))
+    paginas = (1, 2)
+
+    resumenes = ejecutar_scrapers_en_paralelo(headless=True, paginas=paginas)
+
+    assert [r["fuente"] for r in resumenes] == list(FUENTES)
+    for r in resumenes:
+        assert r["ok"], r["error"]
+        assert len([a for a in r["archivos_nuevos"] if a.endswith(".bib")]) == 2
+        assert _exportadas(servidor_sitios, r["fuente"]) == _ids_paginas(r["fuente"], [1, 2])
+
+
+@pytest.mark.parametrize("fuente", FUENTES)
+def test_reanudacion_con_checkpoint(chrome, servidor_sitios, tmp_path, monkeypatch, fuente):
+    """
+    Páginas 1-2, luego 1-3 (solo se exporta la 3, la última) y luego 1-5 (no se pide
+    nada: el checkpoint ya sabe dónde terminan los resultados). En ScienceDirect la
+    página lleva un selector de tamaño que vuelve a la página 1: si se usara, la 3 saldría mal.
+    """
+    nombre_modulo, nombre_funcion = FUENTES[fuente]
+    modulo = importlib.import_module(nombre_modulo)
+    monkeypatch.setattr(modulo, "BASE_URL", url_fuente(servidor_sitios, fuente))
+    scraper = getattr(modulo, nombre_funcion)
+
+    for paginas, exportadas in (((1, 2), [1, 2]), ((1, 3), [3]), ((1, 5), [])):
+        servidor_sitios.reiniciar()
+        assert scraper(headless=True, download_folder=str(tmp_path), paginas=paginas)
+        assert _exportadas(servidor_sitios, fuente) == _ids_paginas(fuente, exportadas)
+    assert not servidor_sitios.pedidas((fuente, "pagina"))
+
+    checkpoint = json.loads((tmp_path / "checkpoint.json").read_text(encoding="utf-8"))
+    assert sorted(checkpoint["paginas"]) == [str(p) for p in range(1, PAGINAS_TOTALES + 1)]
+    assert checkpoint["fin_resultados"] == PAGINAS_TOTALES
+    assert all(info["resultados"] == RESULTADOS_POR_PAGINA for info in checkpoint["paginas"].values())
+    assert len(_bibs(tmp_path)) == PAGINAS_TOTALES